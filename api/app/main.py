@@ -9,6 +9,7 @@ import os
 
 from .database import get_db, engine
 from .services.db_bootstrap import run_startup_migrations
+from .services.pagination import NEXT_CURSOR_HEADER
 from .services.metrics import (
     REQUEST_COUNT,
     REQUEST_LATENCY,
@@ -75,6 +76,14 @@ async def on_startup():
     STARTUP_DURATION.set(ready_time - _process_start_time)
     STARTUP_READY_TIMESTAMP.set(time.time())
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    # Arrêter les workers des backtests en arrière-plan et de la recherche en grille
+    from .services.backtest_jobs import shutdown_job_executor
+    from .services.adaptive_grid import shutdown_grid_executor
+    shutdown_job_executor()
+    shutdown_grid_executor()
+
 # Configuration CORS (pilotée par variables d'environnement)
 raw_origins = os.getenv("ALLOW_ORIGINS", "http://localhost:3001")
 allow_origins = [o.strip() for o in raw_origins.split(",") if o.strip()]
@@ -85,6 +94,8 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Curseur de la page suivante (/backtest/results), lu par le frontend
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Inclusion des routes
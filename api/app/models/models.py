@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, DECIMAL, TIMESTAMP, ForeignKey, BigInteger, Text, Boolean
+from sqlalchemy import Column, Integer, String, Date, DECIMAL, TIMESTAMP, ForeignKey, BigInteger, Text, Boolean, JSON, LargeBinary
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from ..database import Base
@@ -28,6 +28,16 @@ class FppsData(Base):
     created_at = Column(TIMESTAMP, server_default=func.now())
     updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
 
+class HashpriceDaily(Base):
+    """Modèle pour le revenu quotidien par TH/s, maintenu par triggers sur bitcoin_prices et fpps_data"""
+    __tablename__ = "hashprice_daily"
+
+    date = Column(Date, primary_key=True)
+    hashprice_btc = Column(DECIMAL(24, 18), nullable=False)  # BTC par TH/s par jour
+    hashprice_usd = Column(DECIMAL(20, 12), nullable=False)  # USD par TH/s par jour
+    hashprice_cad = Column(DECIMAL(20, 12), nullable=False)  # CAD par TH/s par jour
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
 class MachineTemplate(Base):
     """Modèle pour les templates de machines de mining Bitcoin"""
     __tablename__ = "machine_templates"
@@ -62,6 +72,16 @@ class MachineEfficiencyCurve(Base):
     # Relations
     machine = relationship("MachineTemplate", back_populates="efficiency_curves")
 
+class MachineEfficiencyLookup(Base):
+    """Modèle pour les points d'efficacité interpolés au millième de ratio, précalculés par template"""
+    __tablename__ = "machine_efficiency_lookup"
+
+    machine_id = Column(Integer, ForeignKey("machine_templates.id", ondelete="CASCADE"), primary_key=True)
+    adjustment_ratio = Column(DECIMAL(5, 3), primary_key=True)
+    effective_hashrate = Column(DECIMAL(15, 5), nullable=False)  # TH/s interpolé (non arrondi)
+    power_consumption = Column(Integer, nullable=False)  # Watts (puissance cible)
+    generated_at = Column(TIMESTAMP, server_default=func.now())
+
 class BacktestResult(Base):
     """Modèle pour les résultats de backtesting"""
     __tablename__ = "backtest_results"
@@ -75,6 +95,11 @@ class BacktestResult(Base):
     total_cost_usd = Column(DECIMAL(15, 2), nullable=False)
     total_revenue_usd = Column(DECIMAL(15, 2), nullable=False)
     roi_percentage = Column(DECIMAL(8, 4), nullable=False)
+    request_hash = Column(String(64))  # Clé de cache: paramètres normalisés de la requête
+    data_version = Column(String(64))  # Clé de cache: empreinte des données utilisées
+    electricity_rate_cad = Column(DECIMAL(10, 5))  # Tarif utilisé (nécessaire pour prolonger le backtest)
+    summary_state = Column(JSON)  # Accumulateur des statistiques quotidiennes (RunningSummary)
+    storage_format = Column(String(10), default="rows")  # rows (daily_simulation) ou packed (backtest_series)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
     # Relations
@@ -100,6 +125,41 @@ class DailySimulation(Base):
     # Relations
     backtest = relationship("BacktestResult", back_populates="daily_simulations")
 
+class BacktestSeries(Base):
+    """Modèle pour les simulations quotidiennes d'un backtest stockées en tableaux compacts"""
+    __tablename__ = "backtest_series"
+
+    backtest_id = Column(Integer, ForeignKey("backtest_results.id", ondelete="CASCADE"), primary_key=True)
+    days = Column(Integer, nullable=False)
+    day_gaps = Column(LargeBinary, nullable=False)  # int32: écart en jours avec le jour précédent (le premier depuis start_date)
+    power_consumed_kwh = Column(LargeBinary, nullable=False)  # float64
+    revenue_usd = Column(LargeBinary, nullable=False)  # float64
+    cost_usd = Column(LargeBinary, nullable=False)  # float64
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
+class BacktestJob(Base):
+    """Modèle pour les backtests exécutés en arrière-plan"""
+    __tablename__ = "backtest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(20), nullable=False, default="pending")  # pending, running, completed, failed, cancelled
+    machine_id = Column(Integer, ForeignKey("machine_templates.id"))
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    adjustment_ratio = Column(DECIMAL(5, 3), nullable=False)
+    electricity_rate_cad = Column(DECIMAL(10, 5), nullable=False)
+    summary_only = Column(Boolean, default=False)
+    use_cache = Column(Boolean, default=True)
+    storage_format = Column(String(10), default="rows")
+    total_days = Column(Integer)
+    processed_days = Column(Integer, default=0)
+    cancel_requested = Column(Boolean, default=False)
+    backtest_id = Column(Integer, ForeignKey("backtest_results.id"))
+    error = Column(Text)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    updated_at = Column(TIMESTAMP, server_default=func.now(), onupdate=func.now())
+
 class AppConfig(Base):
     """Modèle pour la configuration de l'application"""
     __tablename__ = "app_config"
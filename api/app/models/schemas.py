@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import date, datetime
-from typing import Optional, List
+from typing import Optional, List, Dict
 from decimal import Decimal
 
 # Schémas pour MachineTemplate
@@ -103,16 +103,27 @@ class FppsData(FppsDataBase):
     class Config:
         from_attributes = True
 
+# Schémas pour le hashprice quotidien
+class HashpriceDaily(BaseModel):
+    date: date
+    hashprice_btc: Decimal  # BTC par TH/s par jour
+    hashprice_usd: Decimal
+    hashprice_cad: Decimal
+    updated_at: Optional[datetime] = None
+
+    class Config:
+        from_attributes = True
+
 # Schémas pour BacktestResult
 class BacktestResultBase(BaseModel):
     machine_id: int
     start_date: date
     end_date: date
-    adjustment_ratio: Decimal = Field(..., ge=0.5, le=1.0)
-    total_profit_usd: Decimal = Field(..., ge=0)
+    adjustment_ratio: Decimal = Field(..., ge=0.5, le=1.5)
+    total_profit_usd: Decimal  # Peut être négatif (backtest perdant)
     total_cost_usd: Decimal = Field(..., ge=0)
     total_revenue_usd: Decimal = Field(..., ge=0)
-    roi_percentage: Decimal = Field(..., ge=0)
+    roi_percentage: Decimal
 
 class BacktestResultCreate(BacktestResultBase):
     pass
@@ -129,18 +140,18 @@ class DailySimulationBase(BaseModel):
     backtest_id: int
     date: date
     machine_id: int
-    adjustment_ratio: Decimal = Field(..., ge=0.5, le=1.0)
+    adjustment_ratio: Decimal = Field(..., ge=0.5, le=1.5)
     power_consumed_kwh: Decimal = Field(..., ge=0)
     revenue_usd: Decimal = Field(..., ge=0)
     cost_usd: Decimal = Field(..., ge=0)
-    profit_usd: Decimal = Field(..., ge=0)
-    roi_daily: Decimal = Field(..., ge=0)
+    profit_usd: Decimal  # Peut être négatif (jour non rentable)
+    roi_daily: Decimal
 
 class DailySimulationCreate(DailySimulationBase):
     pass
 
 class DailySimulation(DailySimulationBase):
-    id: int
+    id: Optional[int] = None  # Absent pour un backtest stocké au format compact
     created_at: datetime
 
     class Config:
@@ -151,13 +162,137 @@ class BacktestRequest(BaseModel):
     machine_id: int
     start_date: date
     end_date: date
-    adjustment_ratio: Decimal = Field(..., ge=0.5, le=1.0)
+    adjustment_ratio: Decimal = Field(..., ge=0.5, le=1.5)
     electricity_rate_cad: Decimal = Field(..., ge=0)  # $/kWh
+    summary_only: bool = False  # Ne pas persister les simulations quotidiennes
+    use_cache: bool = True  # Réutiliser un résultat identique calculé sur les mêmes données
+    engine: str = Field("float64", pattern="^(float64|audit)$")  # audit: recalcul Decimal et comparaison
+    storage_format: str = Field("rows", pattern="^(rows|packed)$")  # Stockage des simulations quotidiennes (packed: format compact, sur demande)
 
 class BacktestResponse(BaseModel):
     backtest_result: BacktestResult
     daily_simulations: List[DailySimulation]
     summary: dict
+    cached: bool = False
+    audit: Optional[dict] = None  # Rapport float64/Decimal (engine="audit")
+
+class BacktestAuditRequest(BacktestRequest):
+    rel_tolerance: float = Field(1e-9, ge=0)
+    abs_tolerance: float = Field(1e-6, ge=0)  # USD / kWh / %
+
+class BacktestExtendRequest(BaseModel):
+    end_date: Optional[date] = None  # Par défaut: dernier jour de l'historique de marché
+
+class BacktestExtendResponse(BaseModel):
+    backtest_result: BacktestResult
+    daily_simulations: List[DailySimulation]  # Seulement les jours ajoutés
+    summary: dict  # Sur toute la période prolongée
+    extended_days: int
+
+class BacktestSweepRequest(BaseModel):
+    machine_id: int
+    start_date: date
+    end_date: date
+    electricity_rate_cad: Decimal = Field(..., ge=0)  # $/kWh
+    adjustment_ratios: Optional[List[Decimal]] = None  # Grille explicite (prioritaire sur min/max/step)
+    ratio_min: Decimal = Field(Decimal("0.5"), ge=0.5, le=1.5)
+    ratio_max: Decimal = Field(Decimal("1.5"), ge=0.5, le=1.5)
+    ratio_step: Decimal = Field(Decimal("0.05"), ge=Decimal("0.001"))
+
+class WalkForwardRequest(BaseModel):
+    machine_id: int
+    start_date: date
+    end_date: date
+    electricity_rate_cad: Decimal = Field(..., ge=0)  # $/kWh
+    rebalance_days: int = Field(30, ge=1, le=3650)  # Ratio re-choisi tous les N jours
+    lookback_days: int = Field(90, ge=1, le=3650)  # Fenêtre glissante d'évaluation des ratios
+    adjustment_ratios: Optional[List[Decimal]] = None  # Grille explicite (prioritaire sur min/max/step)
+    ratio_min: Decimal = Field(Decimal("0.5"), ge=0.5, le=1.5)
+    ratio_max: Decimal = Field(Decimal("1.5"), ge=0.5, le=1.5)
+    ratio_step: Decimal = Field(Decimal("0.05"), ge=Decimal("0.001"))
+    include_daily: bool = False
+
+class SiteBacktestRequest(BaseModel):
+    site_id: int
+    start_date: date
+    end_date: date
+    ratio_overrides: Optional[Dict[int, Decimal]] = None  # instance_id -> ratio (0 = machine arrêtée)
+
+class AdaptiveBacktestRequest(BaseModel):
+    machine_id: Optional[int] = None  # Machine seule (avec electricity_rate_cad)...
+    site_id: Optional[int] = None  # ...ou site complet avec ses paliers
+    quantity: int = Field(1, ge=1)
+    start_date: date
+    end_date: date
+    electricity_rate_cad: Optional[Decimal] = Field(None, ge=0)  # $/kWh, mode machine
+    payout_interval_months: int = Field(1, ge=1, le=12)
+    roi_target_months: int = Field(36, ge=1)
+    machine_cost_cad: Optional[Decimal] = Field(None, gt=0)  # Par défaut: prix des templates
+    aggressive_ratio: Decimal = Field(Decimal("1.2"), ge=0.5, le=1.5)
+    moderate_ratio: Decimal = Field(Decimal("1.0"), ge=0.5, le=1.5)
+    conservative_ratio: Decimal = Field(Decimal("0.8"), ge=0.5, le=1.5)
+    baseline_ratio: Decimal = Field(Decimal("1.0"), ge=0.5, le=1.5)  # Simulation sans ajustement
+    sd_weight_4y: Decimal = Field(Decimal("0.6"), ge=0)
+    sd_weight_1y: Decimal = Field(Decimal("0.4"), ge=0)
+    include_daily: bool = True
+
+class AdaptiveGridSearchRequest(BaseModel):
+    machine_id: Optional[int] = None
+    site_id: Optional[int] = None
+    quantity: int = Field(1, ge=1)
+    start_date: date
+    end_date: date
+    electricity_rate_cad: Optional[Decimal] = Field(None, ge=0)  # $/kWh, mode machine
+    machine_cost_cad: Optional[Decimal] = Field(None, gt=0)
+    moderate_ratio: Decimal = Field(Decimal("1.0"), ge=0.5, le=1.5)
+    conservative_ratio: Decimal = Field(Decimal("0.8"), ge=0.5, le=1.5)
+    baseline_ratio: Decimal = Field(Decimal("1.0"), ge=0.5, le=1.5)
+    # Valeurs explorées (produit cartésien); le poids 1 an vaut 1 - poids 4 ans
+    sd_weights_4y: List[Decimal] = Field([Decimal("0.4"), Decimal("0.5"), Decimal("0.6"), Decimal("0.7"), Decimal("0.8")], min_length=1)
+    roi_target_months_values: List[int] = Field([24, 36, 48], min_length=1)
+    payout_interval_months_values: List[int] = Field([1, 3, 6], min_length=1)
+    aggressive_ratios: List[Decimal] = Field([Decimal("1.1"), Decimal("1.2"), Decimal("1.3")], min_length=1)
+    rank_by: str = "total_profit_usd"  # total_profit_usd, performance_ratio, effective_roi_annual_percentage, cycles_on_target
+    limit: Optional[int] = Field(None, ge=1)
+
+class MonteCarloRequest(BaseModel):
+    machine_id: Optional[int] = None
+    site_id: Optional[int] = None
+    quantity: int = Field(1, ge=1)
+    adjustment_ratio: Optional[Decimal] = Field(None, ge=0.5, le=1.5)  # Site: ratios des instances si absent
+    electricity_rate_cad: Optional[Decimal] = Field(None, ge=0)  # $/kWh, mode machine
+    machine_cost_cad: Optional[Decimal] = Field(None, gt=0)
+    history_start_date: Optional[date] = None  # Période échantillonnée (tout l'historique par défaut)
+    history_end_date: Optional[date] = None
+    horizon_days: int = Field(365, ge=1, le=3650)
+    n_paths: int = Field(10000, ge=10, le=50000)
+    block_days: int = Field(30, ge=1, le=365)
+    percentiles: List[float] = Field([5, 25, 50, 75, 95], min_length=1)
+    band_step_days: int = Field(1, ge=1)  # Échantillonnage des bandes retournées
+    seed: Optional[int] = None
+
+# Schémas pour les backtests en arrière-plan
+class BacktestJob(BaseModel):
+    id: int
+    status: str
+    machine_id: int
+    start_date: date
+    end_date: date
+    adjustment_ratio: Decimal
+    electricity_rate_cad: Decimal
+    summary_only: bool
+    use_cache: bool = True
+    storage_format: str = "rows"
+    total_days: Optional[int] = None
+    processed_days: int = 0
+    cancel_requested: bool = False
+    backtest_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
 
 # Schémas pour les statistiques
 class BacktestSummary(BaseModel):
@@ -1,163 +1,483 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
 from typing import List
 from datetime import date, timedelta
 from decimal import Decimal
-import statistics
+
+import numpy as np
 
 from ..database import get_db
 from ..models import models
-from ..models.schemas import BacktestRequest, BacktestResponse, BacktestResult, DailySimulation
+from ..models.schemas import BacktestRequest, BacktestResponse, BacktestAuditRequest, BacktestExtendRequest, BacktestExtendResponse, BacktestResult, DailySimulation, BacktestSweepRequest, BacktestJob, SiteBacktestRequest, AdaptiveBacktestRequest, AdaptiveGridSearchRequest, MonteCarloRequest, WalkForwardRequest
+from ..services.backtest_engine import lookup_efficiency_points, build_ratio_grid, compute_ratio_sweep
+from ..services.backtest_runner import BacktestDataError, load_backtest_market, execute_backtest, extend_backtest, stored_backtest_summary
+from ..services.backtest_jobs import submit_backtest_job, request_job_cancellation
+from ..services.backtest_audit import audit_backtest
+from ..services.backtest_series import load_daily_rows
+from ..services.pagination import NEXT_CURSOR_HEADER, InvalidCursor, keyset_page
+from ..services.backtest_compare import MAX_COMPARE_BACKTESTS, compare_backtests
+from ..services.backtest_export import iter_daily_simulation_rows, ndjson_lines, csv_lines
+from ..services.backtest_cache import backtest_request_hash, backtest_data_version, find_cached_backtest
+from ..services.site_backtest import run_site_backtest
+from ..services.backtest_profiles import machine_profile, site_profile, profile_daily_operation
+from ..services.backtest_engine import load_market_series
+from ..services.market_history import market_history_store
+from ..services.monte_carlo import ReturnHistory, simulate_cumulative_profit, profit_bands, final_distribution
+from ..services.adaptive_backtest import run_adaptive_backtest, prepare_adaptive_inputs
+from ..services.walk_forward import run_walk_forward
+from ..services.adaptive_grid import build_parameter_grid, run_grid_search
+from .sites import get_site_electricity_data_with_fallback
 
 router = APIRouter()
 
+def get_machine_or_404(machine_id: int, db: Session):
+    """Vérifie que le template de machine existe"""
+    machine = db.query(models.MachineTemplate).filter(models.MachineTemplate.id == machine_id).first()
+    if not machine:
+        raise HTTPException(status_code=404, detail="Machine non trouvée")
+    return machine
+
+def load_market_or_400(db: Session, start_date: date, end_date: date):
+    """Charge l'historique de marché de la période et vérifie qu'il n'est pas vide"""
+    try:
+        return load_backtest_market(db, start_date, end_date)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def resolve_profile_or_error(request, db: Session) -> dict:
+    """Construit le profil machine ou site d'une requête multi-ratios"""
+    if (request.machine_id is None) == (request.site_id is None):
+        raise HTTPException(status_code=400, detail="Indiquer soit machine_id, soit site_id")
+    
+    try:
+        if request.machine_id is not None:
+            template = get_machine_or_404(request.machine_id, db)
+            if request.electricity_rate_cad is None:
+                raise HTTPException(status_code=400, detail="electricity_rate_cad est requis pour une machine")
+            return machine_profile(template, request.quantity, request.electricity_rate_cad)
+        
+        site = db.query(models.MiningSite).filter(models.MiningSite.id == request.site_id).first()
+        if not site:
+            raise HTTPException(status_code=404, detail="Site non trouvé")
+        return site_profile(db, site, get_site_electricity_data_with_fallback(site, db))
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/backtest/run", response_model=BacktestResponse)
-async def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
+def run_backtest(request: BacktestRequest, db: Session = Depends(get_db)):
     """Lancer un backtest pour une machine avec un ratio d'ajustement"""
     
     # Vérifier que la machine existe
-    machine = db.query(models.MiningMachine).filter(models.MiningMachine.id == request.machine_id).first()
-    if not machine:
-        raise HTTPException(status_code=404, detail="Machine non trouvée")
+    get_machine_or_404(request.machine_id, db)
     
-    # Vérifier que les données nécessaires existent
-    bitcoin_prices = db.query(models.BitcoinPrice).filter(
-        models.BitcoinPrice.date >= request.start_date,
-        models.BitcoinPrice.date <= request.end_date
-    ).all()
-    
-    fpps_data = db.query(models.FppsData).filter(
-        models.FppsData.date >= request.start_date,
-        models.FppsData.date <= request.end_date
-    ).all()
+    try:
+        backtest_result, daily_simulations, summary, cached = execute_backtest(db, request)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    if not bitcoin_prices:
-        raise HTTPException(status_code=400, detail="Aucun prix Bitcoin trouvé pour cette période")
+    # Mode audit: les valeurs persistées restent celles du moteur float64
+    audit = audit_backtest(db, request) if request.engine == "audit" else None
     
-    if not fpps_data:
-        raise HTTPException(status_code=400, detail="Aucune donnée FPPS trouvée pour cette période")
+    return BacktestResponse(
+        backtest_result=backtest_result,
+        daily_simulations=daily_simulations,
+        summary=summary,
+        cached=cached,
+        audit=audit
+    )
+
+@router.post("/backtest/audit")
+def audit_backtest_route(request: BacktestAuditRequest, db: Session = Depends(get_db)):
+    """Comparer le moteur float64 à un recalcul exact en Decimal (sans rien persister)"""
+    get_machine_or_404(request.machine_id, db)
+    load_market_or_400(db, request.start_date, request.end_date)
+    return audit_backtest(db, request, request.rel_tolerance, request.abs_tolerance)
+
+@router.post("/backtest/jobs", response_model=BacktestJob)
+def submit_backtest_job_route(request: BacktestRequest, db: Session = Depends(get_db)):
+    """Lancer un backtest en arrière-plan; retourne immédiatement l'identifiant du job"""
+    get_machine_or_404(request.machine_id, db)
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
     
-    # Créer le résultat de backtest
-    backtest_result = models.BacktestResult(
+    job = models.BacktestJob(
+        status="pending",
         machine_id=request.machine_id,
         start_date=request.start_date,
         end_date=request.end_date,
         adjustment_ratio=request.adjustment_ratio,
-        total_profit_usd=Decimal('0'),
-        total_cost_usd=Decimal('0'),
-        total_revenue_usd=Decimal('0'),
-        roi_percentage=Decimal('0')
+        electricity_rate_cad=request.electricity_rate_cad,
+        summary_only=request.summary_only,
+        use_cache=request.use_cache,
+        storage_format=request.storage_format,
+        processed_days=0,
+        cancel_requested=False
     )
     
-    db.add(backtest_result)
+    # Résultat identique déjà calculé sur les mêmes données: job terminé d'emblée
+    cached = None
+    if request.use_cache:
+        cached = find_cached_backtest(
+            db,
+            backtest_request_hash(request),
+            backtest_data_version(db, request.machine_id, request.start_date, request.end_date)
+        )
+    if cached is not None:
+        job.status = "completed"
+        job.backtest_id = cached.id
+    
+    db.add(job)
     db.commit()
-    db.refresh(backtest_result)
-    
-    # Calculer les résultats quotidiens
-    daily_simulations = []
-    total_profit = Decimal('0')
-    total_cost = Decimal('0')
-    total_revenue = Decimal('0')
-    
-    current_date = request.start_date
-    while current_date <= request.end_date:
-        # Trouver les données pour cette date
-        bitcoin_price = next((p for p in bitcoin_prices if p.date == current_date), None)
-        fpps_info = next((f for f in fpps_data if f.date == current_date), None)
-        
-        if bitcoin_price and fpps_info:
-            # Récupérer l'efficacité de la machine pour ce ratio
-            efficiency_result = db.execute(
-                text("SELECT * FROM get_machine_efficiency_interpolated(:machine_id, :ratio)"),
-                {"machine_id": request.machine_id, "ratio": request.adjustment_ratio}
-            ).fetchone()
-            
-            if efficiency_result:
-                effective_hashrate, power_consumption = efficiency_result
-                
-                # Calculer les revenus (en USD)
-                daily_revenue_btc = (effective_hashrate * fpps_info.fpps_rate * 24) / fpps_info.network_difficulty
-                daily_revenue_usd = daily_revenue_btc * bitcoin_price.price_usd
-                
-                # Calculer les coûts (en USD)
-                daily_power_kwh = power_consumption * 24 / 1000  # kWh
-                daily_cost_usd = daily_power_kwh * request.electricity_rate_cad * bitcoin_price.price_cad / bitcoin_price.price_usd
-                
-                # Calculer le profit
-                daily_profit_usd = daily_revenue_usd - daily_cost_usd
-                daily_roi = (daily_profit_usd / daily_cost_usd * 100) if daily_cost_usd > 0 else Decimal('0')
-                
-                # Créer l'enregistrement quotidien
-                daily_sim = models.DailySimulation(
-                    backtest_id=backtest_result.id,
-                    date=current_date,
-                    machine_id=request.machine_id,
-                    adjustment_ratio=request.adjustment_ratio,
-                    power_consumed_kwh=daily_power_kwh,
-                    revenue_usd=daily_revenue_usd,
-                    cost_usd=daily_cost_usd,
-                    profit_usd=daily_profit_usd,
-                    roi_daily=daily_roi
-                )
-                
-                db.add(daily_sim)
-                daily_simulations.append(daily_sim)
-                
-                # Accumuler les totaux
-                total_revenue += daily_revenue_usd
-                total_cost += daily_cost_usd
-                total_profit += daily_profit_usd
-        
-        current_date += timedelta(days=1)
+    db.refresh(job)
     
-    # Mettre à jour le résultat de backtest
-    backtest_result.total_revenue_usd = total_revenue
-    backtest_result.total_cost_usd = total_cost
-    backtest_result.total_profit_usd = total_profit
-    backtest_result.roi_percentage = (total_profit / total_cost * 100) if total_cost > 0 else Decimal('0')
+    if cached is None:
+        submit_backtest_job(job.id)
+    return job
+
+@router.get("/backtest/jobs/{job_id}", response_model=BacktestJob)
+def get_backtest_job(job_id: int, db: Session = Depends(get_db)):
+    """Récupérer l'état et la progression d'un backtest en arrière-plan"""
+    job = db.query(models.BacktestJob).filter(models.BacktestJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de backtest non trouvé")
+    return job
+
+@router.post("/backtest/jobs/{job_id}/cancel", response_model=BacktestJob)
+def cancel_backtest_job(job_id: int, db: Session = Depends(get_db)):
+    """Demander l'annulation d'un backtest en arrière-plan"""
+    job = db.query(models.BacktestJob).filter(models.BacktestJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job de backtest non trouvé")
+    return request_job_cancellation(db, job)
+
+# Grille de 0.5 à 1.5 au millième: chaque ratio ajoute une colonne aux matrices jours × ratios
+MAX_SWEEP_RATIOS = 1001
+
+def resolve_ratio_grid_or_400(request) -> List[float]:
+    """Grille de ratios d'une requête: liste explicite ou bornes min/max/step"""
+    if request.adjustment_ratios:
+        if len(request.adjustment_ratios) > MAX_SWEEP_RATIOS:
+            raise HTTPException(status_code=400, detail=f"Trop de ratios ({len(request.adjustment_ratios)} > {MAX_SWEEP_RATIOS})")
+        return sorted({round(float(r), 3) for r in request.adjustment_ratios})
+    if request.ratio_max < request.ratio_min:
+        raise HTTPException(status_code=400, detail="ratio_max doit être supérieur ou égal à ratio_min")
+    ratios = build_ratio_grid(float(request.ratio_min), float(request.ratio_max), float(request.ratio_step))
+    if len(ratios) > MAX_SWEEP_RATIOS:
+        raise HTTPException(status_code=400, detail=f"Trop de ratios ({len(ratios)} > {MAX_SWEEP_RATIOS})")
+    return ratios
+
+@router.post("/backtest/sweep")
+def run_ratio_sweep(request: BacktestSweepRequest, db: Session = Depends(get_db)):
+    """Évaluer toute une grille de ratios d'ajustement en un seul passage sur l'historique"""
+    get_machine_or_404(request.machine_id, db)
+    ratios = resolve_ratio_grid_or_400(request)
     
-    db.commit()
-    db.refresh(backtest_result)
-    
-    # Calculer les statistiques
-    profits = [sim.profit_usd for sim in daily_simulations]
-    summary = {
-        "total_days": len(daily_simulations),
-        "profitable_days": len([p for p in profits if p > 0]),
-        "total_profit_usd": float(total_profit),
-        "total_cost_usd": float(total_cost),
-        "total_revenue_usd": float(total_revenue),
-        "roi_percentage": float(backtest_result.roi_percentage),
-        "avg_daily_profit": float(statistics.mean(profits)) if profits else 0,
-        "max_daily_profit": float(max(profits)) if profits else 0,
-        "min_daily_profit": float(min(profits)) if profits else 0,
-        "profit_volatility": float(statistics.stdev(profits)) if len(profits) > 1 else 0
+    market = load_market_or_400(db, request.start_date, request.end_date)
+    
+    # Une interpolation par ratio, réutilisée pour tous les jours
+    ratios, hashrates, powers = lookup_efficiency_points(db, request.machine_id, ratios)
+    if not ratios:
+        raise HTTPException(status_code=400, detail="Aucune donnée d'efficacité trouvée pour les ratios demandés")
+    
+    sweep = compute_ratio_sweep(market, hashrates, powers, request.electricity_rate_cad)
+    profit = sweep["profit_usd"]
+    total_revenue = sweep["revenue_usd"].sum(axis=0)
+    total_cost = sweep["cost_usd"].sum(axis=0)
+    total_profit = profit.sum(axis=0)
+    
+    # Meilleur ratio pour chaque jour (ligne de la matrice)
+    best_idx = profit.argmax(axis=1) if len(profit) else np.zeros(0, dtype=np.int64)
+    days_won = np.bincount(best_idx, minlength=len(ratios))
+    best_daily_profit = profit[np.arange(len(profit)), best_idx]
+    
+    results = []
+    for i, ratio in enumerate(ratios):
+        results.append({
+            "adjustment_ratio": ratio,
+            "effective_hashrate": float(hashrates[i]),
+            "power_consumption": float(powers[i]),
+            "total_revenue_usd": float(total_revenue[i]),
+            "total_cost_usd": float(total_cost[i]),
+            "total_profit_usd": float(total_profit[i]),
+            "roi_percentage": float(total_profit[i] / total_cost[i] * 100) if total_cost[i] > 0 else 0,
+            "profitable_days": int((profit[:, i] > 0).sum()),
+            "days_best": int(days_won[i])
+        })
+    
+    best_overall = int(total_profit.argmax())
+    
+    return {
+        "machine_id": request.machine_id,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "total_days": int(len(profit)),
+        "best_ratio": ratios[best_overall],
+        "best_total_profit_usd": float(total_profit[best_overall]),
+        "results": results,
+        "best_ratio_by_day": [
+            {"date": day, "adjustment_ratio": ratios[idx], "profit_usd": p}
+            for day, idx, p in zip(market.dates(sweep["mask"]), best_idx.tolist(), best_daily_profit.tolist())
+        ],
+        # Profit obtenu en choisissant a posteriori le meilleur ratio chaque jour
+        "oracle_total_profit_usd": float(best_daily_profit.sum())
     }
+
+@router.post("/backtest/walk-forward")
+def run_walk_forward_backtest(request: WalkForwardRequest, db: Session = Depends(get_db)):
+    """Re-choisir le ratio tous les N jours selon le meilleur ratio de la fenêtre glissante précédente"""
+    get_machine_or_404(request.machine_id, db)
+    ratios = resolve_ratio_grid_or_400(request)
     
-    return BacktestResponse(
-        backtest_result=backtest_result,
-        daily_simulations=daily_simulations,
-        summary=summary
+    if request.end_date < request.start_date:
+        raise HTTPException(status_code=400, detail="La date de fin doit être postérieure à la date de début")
+    
+    # La première fenêtre glissante porte sur les jours précédant start_date
+    history_start = request.start_date - timedelta(days=request.lookback_days)
+    market = load_market_or_400(db, history_start, request.end_date)
+    
+    ratios, hashrates, powers = lookup_efficiency_points(db, request.machine_id, ratios)
+    if not ratios:
+        raise HTTPException(status_code=400, detail="Aucune donnée d'efficacité trouvée pour les ratios demandés")
+    
+    result = run_walk_forward(
+        market,
+        ratios,
+        hashrates,
+        powers,
+        request.electricity_rate_cad,
+        start_offset=request.lookback_days,
+        rebalance_days=request.rebalance_days,
+        lookback_days=request.lookback_days,
+        include_daily=request.include_daily
     )
+    
+    return {
+        "machine_id": request.machine_id,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "rebalance_days": request.rebalance_days,
+        "lookback_days": request.lookback_days,
+        "ratios": ratios,
+        **result
+    }
+
+@router.post("/backtest/site/run")
+def run_site_backtest_route(request: SiteBacktestRequest, db: Session = Depends(get_db)):
+    """Backtest d'un site complet avec les paliers d'électricité du site"""
+    site = db.query(models.MiningSite).filter(models.MiningSite.id == request.site_id).first()
+    if not site:
+        raise HTTPException(status_code=404, detail="Site non trouvé")
+    
+    electricity = get_site_electricity_data_with_fallback(site, db)
+    try:
+        return run_site_backtest(db, site, request, electricity)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/backtest/adaptive")
+def run_adaptive_backtest_route(request: AdaptiveBacktestRequest, db: Session = Depends(get_db)):
+    """Backtest jour par jour avec agressivité ajustée selon la volatilité mixte 1 an / 4 ans"""
+    profile = resolve_profile_or_error(request, db)
+    try:
+        return run_adaptive_backtest(db, profile, request)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/backtest/monte-carlo")
+def run_monte_carlo(request: MonteCarloRequest, db: Session = Depends(get_db)):
+    """Bandes de percentiles du profit cumulé sur des trajectoires bootstrapées de l'historique"""
+    if any(p < 0 or p > 100 for p in request.percentiles):
+        raise HTTPException(status_code=400, detail="Les percentiles doivent être compris entre 0 et 100")
+    
+    profile = resolve_profile_or_error(request, db)
+    
+    bounds = market_history_store.bounds(db)
+    if bounds is None:
+        raise HTTPException(status_code=400, detail="Aucun historique de marché disponible")
+    history_start = request.history_start_date or bounds[0]
+    history_end = request.history_end_date or bounds[1]
+    if history_end <= history_start:
+        raise HTTPException(status_code=400, detail="La période historique doit couvrir au moins deux jours")
+    
+    try:
+        history = ReturnHistory(load_market_series(db, history_start, history_end))
+        ratio = float(request.adjustment_ratio) if request.adjustment_ratio is not None else None
+        hashrate_th, daily_cost_cad = profile_daily_operation(db, profile, ratio)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cumulative = simulate_cumulative_profit(
+        history,
+        hashrate_th,
+        daily_cost_cad,
+        request.n_paths,
+        request.horizon_days,
+        request.block_days,
+        request.seed,
+    )
+    
+    machine_cost_cad = float(request.machine_cost_cad) if request.machine_cost_cad is not None else profile["machine_cost_cad"]
+    machine_cost_usd = machine_cost_cad * history.fx_last if machine_cost_cad else None
+    
+    return {
+        "profile": {"kind": profile["kind"], "id": profile["id"], "name": profile["name"]},
+        "history_start_date": history_start,
+        "history_end_date": history_end,
+        "sampled_returns": len(history),
+        "starting_date": history.last_date,
+        "hashrate_th": hashrate_th,
+        "daily_cost_cad": daily_cost_cad,
+        "machine_cost_usd": machine_cost_usd,
+        "n_paths": request.n_paths,
+        "horizon_days": request.horizon_days,
+        "block_days": request.block_days,
+        "bands": profit_bands(cumulative, request.percentiles, request.band_step_days),
+        "final": final_distribution(cumulative, request.percentiles, machine_cost_usd)
+    }
+
+GRID_RANK_KEYS = ("total_profit_usd", "performance_ratio", "effective_roi_annual_percentage", "cycles_on_target")
+MAX_GRID_COMBINATIONS = 5000
+
+@router.post("/backtest/adaptive/grid-search")
+def run_adaptive_grid_search(request: AdaptiveGridSearchRequest, db: Session = Depends(get_db)):
+    """Explorer en parallèle les paramètres du backtest adaptatif et classer les combinaisons"""
+    if request.rank_by not in GRID_RANK_KEYS:
+        raise HTTPException(status_code=400, detail=f"rank_by doit être l'une des valeurs: {', '.join(GRID_RANK_KEYS)}")
+    if any(w < 0 or w > 1 for w in request.sd_weights_4y):
+        raise HTTPException(status_code=400, detail="Les poids SD 4 ans doivent être compris entre 0 et 1")
+    if any(m < 1 for m in request.roi_target_months_values):
+        raise HTTPException(status_code=400, detail="La période ROI doit être d'au moins 1 mois")
+    if any(m < 1 or m > 12 for m in request.payout_interval_months_values):
+        raise HTTPException(status_code=400, detail="L'intervalle de paiement doit être compris entre 1 et 12 mois")
+    if any(r < Decimal("0.5") or r > Decimal("1.5") for r in request.aggressive_ratios):
+        raise HTTPException(status_code=400, detail="Les ratios agressifs doivent être compris entre 0.5 et 1.5")
+    
+    grid = build_parameter_grid(
+        [float(w) for w in request.sd_weights_4y],
+        request.roi_target_months_values,
+        request.payout_interval_months_values,
+        [round(float(r), 3) for r in request.aggressive_ratios],
+    )
+    if len(grid) > MAX_GRID_COMBINATIONS:
+        raise HTTPException(status_code=400, detail=f"Trop de combinaisons ({len(grid)} > {MAX_GRID_COMBINATIONS})")
+    
+    profile = resolve_profile_or_error(request, db)
+    
+    # Une seule préparation (interpolations + matrices) pour toute la grille
+    base_ratios = [round(float(r), 3) for r in (request.moderate_ratio, request.conservative_ratio, request.baseline_ratio)]
+    ratios = sorted(set(base_ratios) | {params["aggressive_ratio"] for params in grid})
+    try:
+        inputs = prepare_adaptive_inputs(db, profile, request, ratios)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    base_columns = tuple(ratios.index(r) for r in base_ratios)
+    results = run_grid_search(inputs, grid, base_columns, request.rank_by)
+    
+    return {
+        "profile": {"kind": profile["kind"], "id": profile["id"], "name": profile["name"]},
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "rank_by": request.rank_by,
+        "combinations": len(grid),
+        "results": results[:request.limit] if request.limit else results
+    }
+
+@router.get("/backtest/compare")
+def compare_backtest_results(
+    ids: str = Query(..., description="Identifiants séparés par des virgules"),
+    baseline_id: int = None,
+    db: Session = Depends(get_db)
+):
+    """Comparer plusieurs backtests: séries alignées par date, profit cumulé et écart relatif"""
+    try:
+        backtest_ids = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Identifiants de backtest invalides")
+    
+    if not backtest_ids:
+        raise HTTPException(status_code=400, detail="Aucun backtest à comparer")
+    if len(backtest_ids) > MAX_COMPARE_BACKTESTS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop de backtests à comparer (maximum {MAX_COMPARE_BACKTESTS})"
+        )
+    
+    results = db.query(models.BacktestResult).filter(
+        models.BacktestResult.id.in_(backtest_ids)
+    ).all()
+    found = {result.id: result for result in results}
+    missing = [backtest_id for backtest_id in backtest_ids if backtest_id not in found]
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Résultats de backtest non trouvés: {missing}")
+    
+    if baseline_id is None:
+        baseline_id = backtest_ids[0]
+    elif baseline_id not in found:
+        raise HTTPException(status_code=400, detail="Le backtest de référence doit faire partie de la comparaison")
+    
+    return compare_backtests(db, [found[backtest_id] for backtest_id in backtest_ids], baseline_id)
 
 @router.get("/backtest/results", response_model=List[BacktestResult])
-async def get_backtest_results(
+def get_backtest_results(
+    response: Response,
     machine_id: int = None,
-    limit: int = 50,
+    adjustment_ratio: Decimal = None,
+    start_date: date = None,
+    end_date: date = None,
+    min_ratio: Decimal = None,
+    max_ratio: Decimal = None,
+    min_roi: Decimal = None,
+    max_roi: Decimal = None,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: str = None,
     db: Session = Depends(get_db)
 ):
-    """Récupérer les résultats de backtesting"""
+    """
+    Récupérer les résultats de backtesting, du plus récent au plus ancien.
+    
+    Filtres: machine, ratio exact, période (backtests compris entre
+    start_date et end_date), plage de ratio et de ROI. La page suivante
+    s'obtient en repassant le curseur reçu dans l'en-tête X-Next-Cursor
+    (absent sur la dernière page).
+    
+    Seuls machine_id et adjustment_ratio (égalités) sont couverts par les
+    index de pagination: la page se lit alors directement dans l'ordre
+    (created_at, id). Les filtres par plage (période, ratio, ROI) sont
+    appliqués aux lignes parcourues dans cet ordre; très sélectifs, ils
+    obligent à en parcourir davantage.
+    """
     query = db.query(models.BacktestResult)
     
     if machine_id:
         query = query.filter(models.BacktestResult.machine_id == machine_id)
+    if adjustment_ratio is not None:
+        query = query.filter(models.BacktestResult.adjustment_ratio == adjustment_ratio)
+    if start_date:
+        query = query.filter(models.BacktestResult.start_date >= start_date)
+    if end_date:
+        query = query.filter(models.BacktestResult.end_date <= end_date)
+    if min_ratio is not None:
+        query = query.filter(models.BacktestResult.adjustment_ratio >= min_ratio)
+    if max_ratio is not None:
+        query = query.filter(models.BacktestResult.adjustment_ratio <= max_ratio)
+    if min_roi is not None:
+        query = query.filter(models.BacktestResult.roi_percentage >= min_roi)
+    if max_roi is not None:
+        query = query.filter(models.BacktestResult.roi_percentage <= max_roi)
+    
+    try:
+        results, next_cursor = keyset_page(query, models.BacktestResult, limit, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    results = query.order_by(models.BacktestResult.created_at.desc()).limit(limit).all()
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return results
 
 @router.get("/backtest/results/{backtest_id}", response_model=BacktestResponse)
-async def get_backtest_result(backtest_id: int, db: Session = Depends(get_db)):
+def get_backtest_result(backtest_id: int, include_daily: bool = True, db: Session = Depends(get_db)):
     """Récupérer un résultat de backtesting spécifique avec ses simulations quotidiennes"""
     backtest_result = db.query(models.BacktestResult).filter(
         models.BacktestResult.id == backtest_id
@@ -166,27 +486,66 @@ async def get_backtest_result(backtest_id: int, db: Session = Depends(get_db)):
     if not backtest_result:
         raise HTTPException(status_code=404, detail="Résultat de backtest non trouvé")
     
-    daily_simulations = db.query(models.DailySimulation).filter(
-        models.DailySimulation.backtest_id == backtest_id
-    ).order_by(models.DailySimulation.date).all()
-    
-    # Calculer les statistiques
-    profits = [sim.profit_usd for sim in daily_simulations]
-    summary = {
-        "total_days": len(daily_simulations),
-        "profitable_days": len([p for p in profits if p > 0]),
-        "total_profit_usd": float(backtest_result.total_profit_usd),
-        "total_cost_usd": float(backtest_result.total_cost_usd),
-        "total_revenue_usd": float(backtest_result.total_revenue_usd),
-        "roi_percentage": float(backtest_result.roi_percentage),
-        "avg_daily_profit": float(statistics.mean(profits)) if profits else 0,
-        "max_daily_profit": float(max(profits)) if profits else 0,
-        "min_daily_profit": float(min(profits)) if profits else 0,
-        "profit_volatility": float(statistics.stdev(profits)) if len(profits) > 1 else 0
-    }
+    # Statistiques précalculées à l'écriture (include_daily=false: simple lecture par clé primaire)
+    summary = stored_backtest_summary(db, backtest_result)
+    
+    daily_simulations = load_daily_rows(db, backtest_result) if include_daily else []
     
     return BacktestResponse(
         backtest_result=backtest_result,
         daily_simulations=daily_simulations,
         summary=summary
-    ) 
\ No newline at end of file
+    )
+
+@router.get("/backtest/results/{backtest_id}/daily")
+def stream_backtest_daily(
+    backtest_id: int,
+    fmt: str = Query("ndjson", alias="format"),
+    db: Session = Depends(get_db)
+):
+    """Simulations quotidiennes d'un backtest en flux (NDJSON ou CSV), sans tout charger en mémoire"""
+    if fmt not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format non supporté (ndjson ou csv)")
+    
+    exists = db.query(models.BacktestResult.id).filter(models.BacktestResult.id == backtest_id).first()
+    if not exists:
+        raise HTTPException(status_code=404, detail="Résultat de backtest non trouvé")
+    
+    # Le flux ouvre sa propre session: celle de la requête est fermée avant la fin de l'envoi
+    rows = iter_daily_simulation_rows(backtest_id)
+    if fmt == "csv":
+        return StreamingResponse(
+            csv_lines(rows),
+            media_type="text/csv",
+            headers={"Content-Disposition": f'attachment; filename="backtest_{backtest_id}_daily.csv"'}
+        )
+    return StreamingResponse(ndjson_lines(rows), media_type="application/x-ndjson")
+
+@router.post("/backtest/results/{backtest_id}/extend", response_model=BacktestExtendResponse)
+def extend_backtest_result(backtest_id: int, request: BacktestExtendRequest = None, db: Session = Depends(get_db)):
+    """Prolonger un backtest existant avec les nouveaux jours de données, sans recalculer l'existant"""
+    backtest_result = db.query(models.BacktestResult).filter(
+        models.BacktestResult.id == backtest_id
+    ).first()
+    
+    if not backtest_result:
+        raise HTTPException(status_code=404, detail="Résultat de backtest non trouvé")
+    
+    end_date = request.end_date if request and request.end_date else None
+    if end_date is None:
+        bounds = market_history_store.bounds(db)
+        if bounds is None:
+            raise HTTPException(status_code=400, detail="Aucun historique de marché disponible")
+        end_date = bounds[1]
+    
+    try:
+        new_rows, summary, extended_days = extend_backtest(db, backtest_result, end_date)
+    except BacktestDataError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    return BacktestExtendResponse(
+        backtest_result=backtest_result,
+        daily_simulations=new_rows,
+        summary=summary,
+        extended_days=extended_days
+    )
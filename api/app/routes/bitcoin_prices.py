@@ -6,6 +6,7 @@ from datetime import date
 from ..database import get_db
 from ..models import models
 from ..models.schemas import BitcoinPrice, BitcoinPriceCreate, BitcoinPriceUpdate
+from ..services.market_history import invalidate_market_history
 
 router = APIRouter()
 
@@ -49,6 +50,7 @@ async def create_bitcoin_price(price: BitcoinPriceCreate, db: Session = Depends(
     db_price = models.BitcoinPrice(**price.dict())
     db.add(db_price)
     db.commit()
+    invalidate_market_history()
     db.refresh(db_price)
     return db_price
 
@@ -69,6 +71,7 @@ async def update_bitcoin_price(
         setattr(db_price, field, value)
     
     db.commit()
+    invalidate_market_history()
     db.refresh(db_price)
     return db_price
 
@@ -81,6 +84,7 @@ async def delete_bitcoin_price(date: date, db: Session = Depends(get_db)):
     
     db.delete(db_price)
     db.commit()
+    invalidate_market_history()
     return {"message": "Prix supprimé avec succès"}
 
 @router.get("/bitcoin-prices/count")
@@ -115,6 +119,7 @@ async def create_bitcoin_prices_bulk(prices: List[BitcoinPriceCreate], db: Sessi
     
     if created_prices:
         db.commit()
+        invalidate_market_history()
         for price in created_prices:
             db.refresh(price)
     
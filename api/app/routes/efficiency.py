@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import text
 from typing import List
@@ -7,6 +7,21 @@ from decimal import Decimal
 from ..database import get_db
 from ..models import models
 from ..models.schemas import MachineEfficiencyCurve, MachineEfficiencyCurveCreate, MachineEfficiencyCurveUpdate
+from ..services.efficiency_lookup import (
+    clear_efficiency_lookup,
+    get_lookup_point,
+    get_lookup_points,
+    regenerate_efficiency_lookup,
+    schedule_efficiency_lookup_refresh,
+)
+from ..services.efficiency_interpolation import efficiency_interpolator
+from ..services.optimal_ratio import (
+    build_profit_economics,
+    fetch_network_reward,
+    profit_row,
+    solve_optimal_ratio,
+    sweep_ratios,
+)
 
 router = APIRouter()
 
@@ -28,7 +43,11 @@ async def get_machine_efficiency_curves(machine_id: int, db: Session = Depends(g
     return curves
 
 @router.post("/efficiency/curves", response_model=MachineEfficiencyCurve)
-async def create_efficiency_curve(curve: MachineEfficiencyCurveCreate, db: Session = Depends(get_db)):
+async def create_efficiency_curve(
+    curve: MachineEfficiencyCurveCreate,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db)
+):
     """Créer une nouvelle courbe d'efficacité"""
     # Vérifier que le template existe
     machine = db.query(models.MachineTemplate).filter(
@@ -49,7 +68,9 @@ async def create_efficiency_curve(curve: MachineEfficiencyCurveCreate, db: Sessi
     
     db_curve = models.MachineEfficiencyCurve(**curve.dict())
     db.add(db_curve)
+    clear_efficiency_lookup(db, curve.machine_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, curve.machine_id)
     db.refresh(db_curve)
     return db_curve
 
@@ -57,6 +78,7 @@ async def create_efficiency_curve(curve: MachineEfficiencyCurveCreate, db: Sessi
 async def update_efficiency_curve(
     curve_id: int, 
     curve_update: MachineEfficiencyCurveUpdate, 
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Mettre à jour une courbe d'efficacité"""
@@ -72,12 +94,15 @@ async def update_efficiency_curve(
     for field, value in update_data.items():
         setattr(db_curve, field, value)
     
+    machine_id = db_curve.machine_id
+    clear_efficiency_lookup(db, machine_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, machine_id)
     db.refresh(db_curve)
     return db_curve
 
 @router.delete("/efficiency/curves/{curve_id}")
-async def delete_efficiency_curve(curve_id: int, db: Session = Depends(get_db)):
+async def delete_efficiency_curve(curve_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Supprimer une courbe d'efficacité"""
     db_curve = db.query(models.MachineEfficiencyCurve).filter(
         models.MachineEfficiencyCurve.id == curve_id
@@ -86,10 +111,23 @@ async def delete_efficiency_curve(curve_id: int, db: Session = Depends(get_db)):
     if not db_curve:
         raise HTTPException(status_code=404, detail="Courbe d'efficacité non trouvée")
     
+    machine_id = db_curve.machine_id
     db.delete(db_curve)
+    clear_efficiency_lookup(db, machine_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, machine_id)
     return {"message": "Courbe d'efficacité supprimée avec succès"}
 
+@router.post("/efficiency/machines/{machine_id}/lookup/rebuild")
+def rebuild_machine_efficiency_lookup(machine_id: int, db: Session = Depends(get_db)):
+    """Recalculer les points d'efficacité précalculés (ratios au millième) d'un template"""
+    machine = db.query(models.MachineTemplate).filter(models.MachineTemplate.id == machine_id).first()
+    if not machine:
+        raise HTTPException(status_code=404, detail="Template non trouvé")
+    
+    points = regenerate_efficiency_lookup(db, machine_id)
+    return {"status": "success", "machine_id": machine_id, "points": points}
+
 @router.get("/efficiency/machines/{machine_id}/ratio/{adjustment_ratio}")
 async def get_machine_efficiency_at_ratio(
     machine_id: int, 
@@ -105,13 +143,10 @@ async def get_machine_efficiency_at_ratio(
     if not machine:
         raise HTTPException(status_code=404, detail="Template non trouvé")
     
-    # Utiliser la fonction SQL pour l'interpolation
-    result = db.execute(
-        text("SELECT * FROM get_machine_efficiency_interpolated(:machine_id, :ratio)"),
-        {"machine_id": machine_id, "ratio": adjustment_ratio}
-    ).fetchone()
+    # Point précalculé (ou interpolé s'il manque dans la table)
+    result = get_lookup_point(db, machine_id, adjustment_ratio)
     
-    if not result:
+    if result is None:
         raise HTTPException(status_code=404, detail="Aucune donnée d'efficacité trouvée pour ce ratio")
     
     return {
@@ -147,13 +182,10 @@ async def get_machine_efficiency_at_power(
     
     adjustment_ratio = ratio_result[0]
     
-    # Utiliser la fonction SQL pour l'interpolation
-    efficiency_result = db.execute(
-        text("SELECT * FROM get_machine_efficiency_interpolated(:machine_id, :ratio)"),
-        {"machine_id": machine_id, "ratio": adjustment_ratio}
-    ).fetchone()
+    # Point précalculé (ou interpolé s'il manque dans la table)
+    efficiency_result = get_lookup_point(db, machine_id, adjustment_ratio)
     
-    if not efficiency_result:
+    if efficiency_result is None:
         raise HTTPException(status_code=404, detail="Aucune donnée d'efficacité trouvée")
     
     return {
@@ -195,11 +227,17 @@ def get_market_and_electricity_data(db: Session):
 @router.get("/efficiency/machines/{machine_id}/optimal-ratio")
 def find_optimal_adjustment_ratio(
     machine_id: int,
+    include_sweep: bool = True,
     db: Session = Depends(get_db)
 ):
     """
-    Trouve le ratio d'ajustement optimal pour maximiser les profits
-    en utilisant une approche en deux étapes : globale (0.05) puis fine (0.01)
+    Trouve le ratio d'ajustement optimal pour maximiser les profits.
+
+    L'optimum exact entre 0.5 et 1.5 est cherché parmi les débuts de palier
+    du facteur d'interpolation arrondi, les points mesurés de la courbe et la
+    limite du palier 1 (voir `optimal_ratio`). Avec include_sweep, le tableau des
+    ratios (0.05 de 0.5 à 1.5, puis 0.01 autour de l'optimum) est joint pour
+    l'affichage; l'optimum y figure toujours.
     """
     # Vérifier que le template existe
     machine = db.query(models.MachineTemplate).filter(
@@ -209,239 +247,30 @@ def find_optimal_adjustment_ratio(
     if not machine:
         raise HTTPException(status_code=404, detail="Template non trouvé")
     
-    # Récupérer les données communes
+    # Données communes et réseau récupérées une seule fois pour tous les ratios
     common_data = get_market_and_electricity_data(db)
-    bitcoin_price = common_data["bitcoin_price"]
-    fpps_rate = common_data["fpps_rate"]
-    electricity_tier1_rate = common_data["electricity_tier1_rate"]
-    electricity_tier2_rate = common_data["electricity_tier2_rate"]
-    electricity_tier1_limit = common_data["electricity_tier1_limit"]
-    
-    optimal_ratio = None
-    max_profit = float('-inf')
-    results = []
-    
-    # ÉTAPE 1: Optimisation globale avec incréments de 0.05
-    global_optimal_ratio = None
-    global_max_profit = float('-inf')
-    
-    # Tester des ratios de 0.5 à 1.5 par incréments de 0.05
-    for ratio in [round(x * 0.05, 2) for x in range(10, 31)]:  # 0.5 à 1.5
-        try:
-            # Obtenir l'efficacité pour ce ratio
-            result = db.execute(text("""
-                SELECT effective_hashrate, power_consumption 
-                FROM get_machine_efficiency_interpolated(:machine_id, :ratio)
-            """), {"machine_id": machine_id, "ratio": ratio})
-            
-            efficiency = result.fetchone()
-            if efficiency and efficiency[0] is not None:
-                hashrate = float(efficiency[0])
-                power = int(efficiency[1])
-                
-                # Calculer les revenus basés sur les accepted shares
-                daily_revenue = None
-                sats_per_hour = None
-                
-                # Vérifier si la machine a des accepted shares configurées
-                if machine.accepted_shares_24h is not None:
-                    try:
-                        # Récupérer la difficulté du réseau
-                        import requests
-                        difficulty_response = requests.get("https://blockchain.info/q/getdifficulty", timeout=10)
-                        difficulty_response.raise_for_status()
-                        network_difficulty = float(difficulty_response.text)
-                        
-                        # Récupérer la récompense de bloc
-                        block_reward_response = requests.get("https://blockchain.info/q/bcperblock", timeout=10)
-                        block_reward_response.raise_for_status()
-                        coinbase_reward = float(block_reward_response.text)
-                        
-                        # Calculer le revenu avec la formule CRC = C × S/D
-                        # Répartir les shares proportionnellement au hashrate de ce ratio
-                        machine_shares = float(machine.accepted_shares_24h) * (hashrate / float(machine.hashrate_nominal))
-                        btc_earned_24h = (coinbase_reward * machine_shares) / network_difficulty
-                        
-                        if bitcoin_price is not None:
-                            daily_revenue = btc_earned_24h * bitcoin_price
-                            # Calculer les sats/heure pour l'affichage
-                            sats_per_hour = int((btc_earned_24h * 100000000) / 24)
-                    except Exception:
-                        # En cas d'erreur, revenu non calculable
-                        daily_revenue = None
-                        sats_per_hour = None
-                else:
-                    # Pas d'accepted shares => pas de revenus calculables
-                    daily_revenue = None
-                    sats_per_hour = None
-                
-                # Calculer les coûts d'électricité avec paliers
-                daily_power_kwh = (power * 24) / 1000
-                
-                # Calculer le coût avec les paliers
-                if electricity_tier1_rate is None or electricity_tier2_rate is None or electricity_tier1_limit is None:
-                    daily_electricity_cost = None
-                else:
-                    if daily_power_kwh <= electricity_tier1_limit:
-                        daily_electricity_cost = daily_power_kwh * electricity_tier1_rate
-                    else:
-                        tier1_cost = electricity_tier1_limit * electricity_tier1_rate
-                        tier2_cost = (daily_power_kwh - electricity_tier1_limit) * electricity_tier2_rate
-                        daily_electricity_cost = tier1_cost + tier2_cost
-                
-                # Calculer le profit
-                if daily_revenue is None or daily_electricity_cost is None:
-                    daily_profit = None
-                else:
-                    daily_profit = daily_revenue - daily_electricity_cost
-                
-                # Calculer l'efficacité technique (TH/s par Watt)
-                efficiency_ratio = hashrate / power if power > 0 else 0
-                
-                result_data = {
-                    "adjustment_ratio": ratio,
-                    "effective_hashrate": hashrate,
-                    "power_consumption": power,
-                    "efficiency_th_per_watt": round(efficiency_ratio, 6),
-                    "efficiency_j_per_th": round(power / hashrate, 2) if hashrate > 0 else 0,
-                    "sats_per_hour": sats_per_hour,
-                    "daily_revenue": "N/A" if daily_revenue is None else round(daily_revenue, 2),
-                    "daily_electricity_cost": round(daily_electricity_cost, 2) if daily_electricity_cost is not None else None,
-                    "daily_profit": "N/A" if daily_profit is None else round(daily_profit, 2)
-                }
-                results.append(result_data)
-                
-                # Mettre à jour l'optimal global si ce ratio est plus profitable
-                if daily_profit > global_max_profit:
-                    global_max_profit = daily_profit
-                    global_optimal_ratio = ratio
-                    
-        except Exception as e:
-            continue
-    
-    # Si aucun ratio optimal global n'a été trouvé, utiliser le ratio avec le meilleur hashrate
-    if global_optimal_ratio is None and results:
-        # Trouver le ratio avec le meilleur hashrate
-        best_hashrate_result = max(results, key=lambda x: x['effective_hashrate'])
-        global_optimal_ratio = best_hashrate_result['adjustment_ratio']
-        global_max_profit = best_hashrate_result.get('daily_profit', None)
+    network_reward = fetch_network_reward() if machine.accepted_shares_24h is not None else None
+    economics = build_profit_economics(machine, common_data, network_reward)
     
-    # Si toujours aucun résultat, renvoyer une erreur explicite
-    if global_optimal_ratio is None:
+    power_nominal, powers, hashrates = efficiency_interpolator.curve(db, machine_id)
+    optimum = solve_optimal_ratio(power_nominal, powers, hashrates, economics)
+    if optimum is None:
         raise HTTPException(status_code=400, detail="Impossible de déterminer un ratio optimal avec les données disponibles")
     
+    optimal_ratio = optimum["adjustment_ratio"]
+    max_profit = optimum["daily_profit"]
     
-    # ÉTAPE 2: Optimisation fine avec incréments de 0.01 autour du meilleur ratio global
-    
-    # Définir la plage fine autour du ratio optimal global (±0.10)
-    fine_range = 0.10
-    fine_step = 0.01
-    
-    # Calculer les bornes de la recherche fine
-    fine_start = max(0.5, global_optimal_ratio - fine_range)
-    fine_end = min(1.5, global_optimal_ratio + fine_range)
-    
-    # Générer les ratios pour la recherche fine
-    fine_ratios = [round(fine_start + i * fine_step, 2) for i in range(int((fine_end - fine_start) / fine_step) + 1)]
-    
-    # Réinitialiser pour la recherche fine
-    optimal_ratio = global_optimal_ratio
-    max_profit = global_max_profit
-    
-    # Recherche fine
-    for ratio in fine_ratios:
-        try:
-            # Obtenir l'efficacité pour ce ratio
-            result = db.execute(text("""
-                SELECT effective_hashrate, power_consumption 
-                FROM get_machine_efficiency_interpolated(:machine_id, :ratio)
-            """), {"machine_id": machine_id, "ratio": ratio})
-            
-            efficiency = result.fetchone()
-            if efficiency and efficiency[0] is not None:
-                hashrate = float(efficiency[0])
-                power = int(efficiency[1])
-                
-                # Calculer les revenus basés sur les accepted shares
-                daily_revenue = None
-                sats_per_hour = None
-                
-                # Vérifier si la machine a des accepted shares configurées
-                if machine.accepted_shares_24h is not None:
-                    try:
-                        # Récupérer la difficulté du réseau
-                        import requests
-                        difficulty_response = requests.get("https://blockchain.info/q/getdifficulty", timeout=10)
-                        difficulty_response.raise_for_status()
-                        network_difficulty = float(difficulty_response.text)
-                        
-                        # Récupérer la récompense de bloc
-                        block_reward_response = requests.get("https://blockchain.info/q/bcperblock", timeout=10)
-                        block_reward_response.raise_for_status()
-                        coinbase_reward = float(block_reward_response.text)
-                        
-                        # Calculer le revenu avec la formule CRC = C × S/D
-                        # Répartir les shares proportionnellement au hashrate de ce ratio
-                        machine_shares = float(machine.accepted_shares_24h) * (hashrate / float(machine.hashrate_nominal))
-                        btc_earned_24h = (coinbase_reward * machine_shares) / network_difficulty
-                        
-                        if bitcoin_price is not None:
-                            daily_revenue = btc_earned_24h * bitcoin_price
-                            # Calculer les sats/heure pour l'affichage
-                            sats_per_hour = int((btc_earned_24h * 100000000) / 24)
-                    except Exception:
-                        # En cas d'erreur, revenu non calculable
-                        daily_revenue = None
-                        sats_per_hour = None
-                else:
-                    # Pas d'accepted shares => pas de revenus calculables
-                    daily_revenue = None
-                    sats_per_hour = None
-                
-                # Calculer les coûts d'électricité avec paliers
-                daily_power_kwh = (power * 24) / 1000
-                
-                # Calculer le coût avec les paliers
-                if electricity_tier1_rate is None or electricity_tier2_rate is None or electricity_tier1_limit is None:
-                    daily_electricity_cost = None
-                else:
-                    if daily_power_kwh <= electricity_tier1_limit:
-                        daily_electricity_cost = daily_power_kwh * electricity_tier1_rate
-                    else:
-                        tier1_cost = electricity_tier1_limit * electricity_tier1_rate
-                        tier2_cost = (daily_power_kwh - electricity_tier1_limit) * electricity_tier2_rate
-                        daily_electricity_cost = tier1_cost + tier2_cost
-                
-                # Calculer le profit
-                if daily_revenue is None or daily_electricity_cost is None:
-                    daily_profit = None
-                else:
-                    daily_profit = daily_revenue - daily_electricity_cost
-                
-                # Calculer l'efficacité technique (TH/s par Watt)
-                efficiency_ratio = hashrate / power if power > 0 else 0
-                
-                result_data = {
-                    "adjustment_ratio": ratio,
-                    "effective_hashrate": hashrate,
-                    "power_consumption": power,
-                    "efficiency_th_per_watt": round(efficiency_ratio, 6),
-                    "efficiency_j_per_th": round(power / hashrate, 2) if hashrate > 0 else 0,
-                    "sats_per_hour": sats_per_hour,
-                    "daily_revenue": round(daily_revenue, 2) if daily_revenue is not None else None,
-                    "daily_electricity_cost": round(daily_electricity_cost, 2) if daily_electricity_cost is not None else None,
-                    "daily_profit": round(daily_profit, 2) if daily_profit is not None else None
-                }
-                results.append(result_data)
-                
-                # Mettre à jour l'optimal si ce ratio est plus profitable
-                if daily_profit > max_profit:
-                    max_profit = daily_profit
-                    optimal_ratio = ratio
-                    
-        except Exception as e:
-            continue
-    
+    results = []
+    if include_sweep:
+        ratios = sweep_ratios(optimal_ratio)
+        points = get_lookup_points(db, machine_id, ratios)
+        results = [
+            profit_row(ratio, float(point[0]), int(point[1]), economics)
+            for ratio, point in zip(ratios, points)
+            if point is not None
+        ]
+    if not any(row["adjustment_ratio"] == optimal_ratio for row in results):
+        results.append(optimum)
     
     # Déterminer le message selon la disponibilité des shares
     if max_profit == "N/A" or max_profit is None:
@@ -454,7 +283,8 @@ def find_optimal_adjustment_ratio(
     return {
         "machine_id": machine_id,
         "optimal_ratio": optimal_ratio,
-        "max_daily_profit": "N/A" if max_profit == "N/A" else (round(max_profit, 2) if max_profit is not None else None),
+        "max_daily_profit": max_profit,
+        "optimal_result": optimum,
         "all_results": results,
         "message": message,
         "shares_warning": shares_warning
@@ -462,39 +292,33 @@ def find_optimal_adjustment_ratio(
 
 def get_available_ratios(machine_id: int, db: Session):
     """
-    Trouve les ratios minimum et maximum disponibles pour une machine
-    en testant différents ratios et en vérifiant lesquels retournent des données
+    Trouve les ratios minimum et maximum disponibles pour une machine.
+
+    Les bornes viennent des puissances minimale et maximale de la courbe
+    rapportées à la puissance nominale (descripteur en cache, voir
+    `RatioBounds`): aucun ratio n'est interpolé ni interrogé en base.
     """
-    available_ratios = []
-    
-    # Tester des ratios de 0.5 à 1.5 par incréments de 0.05
-    for ratio in [round(x * 0.05, 2) for x in range(10, 31)]:  # 0.5 à 1.5
-        try:
-            result = db.execute(text("""
-                SELECT effective_hashrate, power_consumption 
-                FROM get_machine_efficiency_interpolated(:machine_id, :ratio)
-            """), {"machine_id": machine_id, "ratio": ratio})
-            
-            efficiency = result.fetchone()
-            if efficiency and efficiency[0] is not None:
-                available_ratios.append(ratio)
-                
-        except Exception as e:
-            continue
-    
-    if available_ratios:
-        return {
-            "min_ratio": min(available_ratios),
-            "max_ratio": max(available_ratios),
-            "all_ratios": available_ratios
-        }
-    else:
+    bounds = efficiency_interpolator.ratio_bounds(db, machine_id)
+    if bounds is None:
         return {
             "min_ratio": None,
             "max_ratio": None,
-            "all_ratios": []
+            "all_ratios": [],
+            "curve_min_ratio": None,
+            "curve_max_ratio": None
         }
 
+    # Ratios de 0.5 à 1.5 par incréments de 0.05 couverts par la courbe
+    available_ratios = bounds.filter(round(x * 0.05, 2) for x in range(10, 31))
+
+    return {
+        "min_ratio": min(available_ratios) if available_ratios else None,
+        "max_ratio": max(available_ratios) if available_ratios else None,
+        "all_ratios": available_ratios,
+        "curve_min_ratio": float(bounds.min_ratio),
+        "curve_max_ratio": float(bounds.max_ratio)
+    }
+
 @router.get("/efficiency/machines/{machine_id}/ratio-analysis")
 def get_machine_ratio_analysis(
     machine_id: int,
@@ -533,16 +357,10 @@ def get_machine_ratio_analysis(
     available_ratios = get_available_ratios(machine_id, db)
     
     # Tester tous les ratios disponibles
-    for ratio in available_ratios["all_ratios"]:
+    points = get_lookup_points(db, machine_id, available_ratios["all_ratios"])
+    for ratio, efficiency in zip(available_ratios["all_ratios"], points):
         try:
-            # Obtenir l'efficacité pour ce ratio
-            result = db.execute(text("""
-                SELECT effective_hashrate, power_consumption 
-                FROM get_machine_efficiency_interpolated(:machine_id, :ratio)
-            """), {"machine_id": machine_id, "ratio": ratio})
-            
-            efficiency = result.fetchone()
-            if efficiency and efficiency[0] is not None:
+            if efficiency is not None:
                 hashrate = float(efficiency[0])
                 power = int(efficiency[1])
                 
@@ -670,16 +488,11 @@ def find_optimal_efficiency_ratio(
     results = []
     
     # Tester des ratios de 0.5 à 1.5 par incréments de 0.05
-    for ratio in [round(x * 0.05, 2) for x in range(10, 31)]:  # 0.5 à 1.5
+    ratios = [round(x * 0.05, 2) for x in range(10, 31)]  # 0.5 à 1.5
+    points = get_lookup_points(db, machine_id, ratios)
+    for ratio, efficiency in zip(ratios, points):
         try:
-            # Obtenir l'efficacité pour ce ratio
-            result = db.execute(text("""
-                SELECT effective_hashrate, power_consumption 
-                FROM get_machine_efficiency_interpolated(:machine_id, :ratio)
-            """), {"machine_id": machine_id, "ratio": ratio})
-            
-            efficiency = result.fetchone()
-            if efficiency and efficiency[0] is not None:
+            if efficiency is not None:
                 hashrate = float(efficiency[0])
                 power = int(efficiency[1])
                 
@@ -817,16 +630,11 @@ def find_optimal_sats_ratio(
     results = []
     
     # Tester des ratios de 0.5 à 1.5 par incréments de 0.05
-    for ratio in [round(x * 0.05, 2) for x in range(10, 31)]:  # 0.5 à 1.5
+    ratios = [round(x * 0.05, 2) for x in range(10, 31)]  # 0.5 à 1.5
+    points = get_lookup_points(db, machine_id, ratios)
+    for ratio, efficiency in zip(ratios, points):
         try:
-            # Obtenir l'efficacité pour ce ratio
-            result = db.execute(text("""
-                SELECT effective_hashrate, power_consumption 
-                FROM get_machine_efficiency_interpolated(:machine_id, :ratio)
-            """), {"machine_id": machine_id, "ratio": ratio})
-            
-            efficiency = result.fetchone()
-            if efficiency and efficiency[0] is not None:
+            if efficiency is not None:
                 hashrate = float(efficiency[0])
                 power = int(efficiency[1])
                 
@@ -6,6 +6,7 @@ from datetime import date
 from ..database import get_db
 from ..models import models
 from ..models.schemas import FppsData, FppsDataCreate, FppsDataUpdate
+from ..services.market_history import invalidate_market_history
 
 router = APIRouter()
 
@@ -49,6 +50,7 @@ async def create_fpps_data(data: FppsDataCreate, db: Session = Depends(get_db)):
     db_data = models.FppsData(**data.dict())
     db.add(db_data)
     db.commit()
+    invalidate_market_history()
     db.refresh(db_data)
     return db_data
 
@@ -69,6 +71,7 @@ async def update_fpps_data(
         setattr(db_data, field, value)
     
     db.commit()
+    invalidate_market_history()
     db.refresh(db_data)
     return db_data
 
@@ -81,6 +84,7 @@ async def delete_fpps_data(date: date, db: Session = Depends(get_db)):
     
     db.delete(db_data)
     db.commit()
+    invalidate_market_history()
     return {"message": "Données FPPS supprimées avec succès"}
 
 @router.get("/fpps-data/count")
@@ -115,6 +119,7 @@ async def create_fpps_data_bulk(data_list: List[FppsDataCreate], db: Session = D
     
     if created_data:
         db.commit()
+        invalidate_market_history()
         for data in created_data:
             db.refresh(data)
     
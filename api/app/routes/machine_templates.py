@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from decimal import Decimal
@@ -8,6 +8,7 @@ from ..database import get_db
 from ..models import models
 from ..models.schemas import MachineTemplate, MachineTemplateCreate, MachineTemplateUpdate
 from ..models.schemas import SiteMachineInstance, SiteMachineInstanceCreate, SiteMachineInstanceUpdate
+from ..services.efficiency_lookup import clear_efficiency_lookup, schedule_efficiency_lookup_refresh
 
 router = APIRouter()
 
@@ -49,6 +50,7 @@ async def create_machine_template(template: MachineTemplateCreate, db: Session =
 async def update_machine_template(
     template_id: int, 
     template_update: MachineTemplateUpdate, 
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Mettre à jour un template"""
@@ -61,12 +63,14 @@ async def update_machine_template(
     for field, value in update_data.items():
         setattr(db_template, field, value)
     
+    clear_efficiency_lookup(db, template_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, template_id)
     db.refresh(db_template)
     return db_template
 
 @router.delete("/machine-templates/{template_id}")
-async def delete_machine_template(template_id: int, db: Session = Depends(get_db)):
+async def delete_machine_template(template_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Supprimer un template (soft delete)"""
     db_template = db.query(models.MachineTemplate).filter(models.MachineTemplate.id == template_id).first()
     if not db_template:
@@ -74,7 +78,9 @@ async def delete_machine_template(template_id: int, db: Session = Depends(get_db
     
     # Soft delete - marquer comme inactif
     db_template.is_active = False
+    clear_efficiency_lookup(db, template_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, template_id)
     return {"message": "Template supprimé avec succès"}
 
 # Routes pour les instances de machines dans les sites
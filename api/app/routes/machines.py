@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
 from decimal import Decimal
@@ -7,6 +7,7 @@ from datetime import date
 from ..database import get_db
 from ..models import models
 from ..models.schemas import MachineTemplate, MachineTemplateCreate, MachineTemplateUpdate
+from ..services.efficiency_lookup import clear_efficiency_lookup, schedule_efficiency_lookup_refresh
 
 router = APIRouter()
 
@@ -47,6 +48,7 @@ async def create_machine(machine: MachineTemplateCreate, db: Session = Depends(g
 async def update_machine(
     machine_id: int, 
     machine_update: MachineTemplateUpdate, 
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db)
 ):
     """Mettre à jour un template de machine"""
@@ -59,12 +61,14 @@ async def update_machine(
     for field, value in update_data.items():
         setattr(db_machine, field, value)
     
+    clear_efficiency_lookup(db, machine_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, machine_id)
     db.refresh(db_machine)
     return db_machine
 
 @router.delete("/machines/{machine_id}")
-async def delete_machine(machine_id: int, db: Session = Depends(get_db)):
+async def delete_machine(machine_id: int, background_tasks: BackgroundTasks, db: Session = Depends(get_db)):
     """Supprimer un template de machine (soft delete)"""
     db_machine = db.query(models.MachineTemplate).filter(models.MachineTemplate.id == machine_id).first()
     if not db_machine:
@@ -72,7 +76,9 @@ async def delete_machine(machine_id: int, db: Session = Depends(get_db)):
     
     # Soft delete - marquer comme inactif
     db_machine.is_active = False
+    clear_efficiency_lookup(db, machine_id)
     db.commit()
+    schedule_efficiency_lookup_refresh(background_tasks, machine_id)
     return {"message": "Template supprimé avec succès"}
 
 @router.get("/machines/{machine_id}/efficiency")
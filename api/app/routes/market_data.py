@@ -3,11 +3,13 @@ from sqlalchemy.orm import Session
 import subprocess
 import json
 import re
-from typing import Dict, Any
-from datetime import datetime
+from typing import Dict, Any, List
+from datetime import datetime, date
 from ..database import get_db
 from ..models import models
+from ..models.schemas import HashpriceDaily
 from ..services.market_cache import MarketCacheService
+from ..services.hashprice import get_hashprice_series, rebuild_hashprice_daily
 from sqlalchemy import text
 
 router = APIRouter()
@@ -167,4 +169,28 @@ async def get_cache_status(db: Session = Depends(get_db)):
         }
         
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération du statut du cache: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la récupération du statut du cache: {str(e)}") 
+
+@router.get("/market/hashprice", response_model=List[HashpriceDaily])
+def get_hashprice(
+    start_date: date = None,
+    end_date: date = None,
+    limit: int = None,
+    db: Session = Depends(get_db)
+):
+    """Revenu quotidien d'un TH/s (BTC, USD, CAD), par ordre de date"""
+    return get_hashprice_series(db, start_date, end_date, limit)
+
+@router.get("/market/hashprice/latest", response_model=HashpriceDaily)
+def get_latest_hashprice(db: Session = Depends(get_db)):
+    """Dernier hashprice quotidien connu"""
+    latest = db.query(models.HashpriceDaily).order_by(models.HashpriceDaily.date.desc()).first()
+    if not latest:
+        raise HTTPException(status_code=404, detail="Aucun hashprice disponible")
+    return latest
+
+@router.post("/market/hashprice/rebuild")
+def rebuild_hashprice(db: Session = Depends(get_db)):
+    """Recalculer toute la série hashprice depuis bitcoin_prices et fpps_data"""
+    days = rebuild_hashprice_daily(db)
+    return {"status": "success", "days": days}
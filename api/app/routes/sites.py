@@ -8,9 +8,13 @@ from ..database import get_db
 from ..models import models
 from ..models.schemas import MiningSite, MiningSiteCreate, MiningSiteUpdate, SiteMachineInstance, SiteMachineInstanceCreate, SiteMachineInstanceUpdate
 from ..routes.efficiency import find_optimal_adjustment_ratio
+from ..services.efficiency_interpolation import efficiency_interpolator
 
 router = APIRouter()
 
+# Ratios proposés dans les sélecteurs manuels (filtrés par les bornes de chaque courbe)
+AVAILABLE_RATIO_CHOICES = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2, 1.25, 1.3, 1.35, 1.4, 1.45, 1.5]
+
 import os
 
 def get_site_electricity_data_with_fallback(site, db: Session):
@@ -467,6 +471,7 @@ def get_machine_optimal_data(template_id: int, db: Session):
         # Calculer l'optimal avec les données actuelles
         optimal_result = find_optimal_adjustment_ratio(
             machine_id=template_id,
+            include_sweep=False,
             db=db
         )
         
@@ -628,6 +633,7 @@ async def calculate_multi_machine_optimal_ratios(site_id: int, db: Session):
             # Optimiser cette machine individuellement (toujours calculer l'optimal)
             optimal_result = find_optimal_adjustment_ratio(
                 machine_id=machine["template_id"],
+                include_sweep=False,
                 db=db
             )
             
@@ -1313,48 +1319,36 @@ async def get_site_available_ratios(site_id: int, db: Session = Depends(get_db))
     if not machines:
         raise HTTPException(status_code=404, detail="Aucune machine trouvée pour ce site")
     
-    # Récupérer les ratios disponibles pour chaque machine
+    # Récupérer les ratios disponibles pour chaque template, à partir des
+    # bornes de sa courbe (aucune requête par ratio)
+    templates = db.query(models.MachineTemplate).filter(
+        models.MachineTemplate.id.in_({machine.template_id for machine in machines}),
+        models.MachineTemplate.is_active == True
+    ).all()
+
     available_ratios = {}
     common_ratios = None
-    
-    for machine in machines:
-        template = db.query(models.MachineTemplate).filter(
-            models.MachineTemplate.id == machine.template_id,
-            models.MachineTemplate.is_active == True
-        ).first()
-        
-        if template:
-            try:
-                # Récupérer les ratios disponibles pour cette machine
-                from ..routes.efficiency import get_machine_efficiency_at_ratio
-                
-                # Tester différents ratios pour trouver les limites
-                test_ratios = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2, 1.25, 1.3, 1.35, 1.4, 1.45, 1.5]
-                valid_ratios = []
-                
-                for ratio in test_ratios:
-                    try:
-                        efficiency_response = await get_machine_efficiency_at_ratio(template.id, ratio, db)
-                        if efficiency_response and efficiency_response.get("effective_hashrate") and efficiency_response.get("power_consumption"):
-                            valid_ratios.append(ratio)
-                    except:
-                        continue
-                
-                if valid_ratios:
-                    available_ratios[template.model] = {
-                        "min_ratio": min(valid_ratios),
-                        "max_ratio": max(valid_ratios),
-                        "valid_ratios": valid_ratios
-                    }
-                    
-                    # Calculer l'intersection avec les ratios communs
-                    if common_ratios is None:
-                        common_ratios = set(valid_ratios)
-                    else:
-                        common_ratios = common_ratios.intersection(set(valid_ratios))
-                        
-            except Exception as e:
-                continue
+
+    for template in templates:
+        bounds = efficiency_interpolator.ratio_bounds(db, template.id)
+        if bounds is None:
+            continue
+
+        valid_ratios = bounds.filter(AVAILABLE_RATIO_CHOICES)
+        if valid_ratios:
+            available_ratios[template.model] = {
+                "min_ratio": min(valid_ratios),
+                "max_ratio": max(valid_ratios),
+                "valid_ratios": valid_ratios,
+                "curve_min_ratio": float(bounds.min_ratio),
+                "curve_max_ratio": float(bounds.max_ratio)
+            }
+
+            # Calculer l'intersection avec les ratios communs
+            if common_ratios is None:
+                common_ratios = set(valid_ratios)
+            else:
+                common_ratios = common_ratios.intersection(valid_ratios)
     
     if not available_ratios:
         raise HTTPException(status_code=500, detail="Impossible de récupérer les ratios disponibles")
@@ -1413,20 +1407,10 @@ async def get_machine_available_ratios(site_id: int, instance_id: int, db: Sessi
     if not template:
         raise HTTPException(status_code=404, detail="Template de machine non trouvé")
     
-    # Tester différents ratios pour trouver les limites
-    test_ratios = [0.5, 0.6, 0.7, 0.8, 0.85, 0.9, 0.95, 1.0, 1.05, 1.1, 1.15, 1.2, 1.25, 1.3, 1.35, 1.4, 1.45, 1.5]
-    valid_ratios = []
-    
     try:
-        from ..routes.efficiency import get_machine_efficiency_at_ratio
-        
-        for ratio in test_ratios:
-            try:
-                efficiency_response = await get_machine_efficiency_at_ratio(template.id, ratio, db)
-                if efficiency_response and efficiency_response.get("effective_hashrate") and efficiency_response.get("power_consumption"):
-                    valid_ratios.append(ratio)
-            except:
-                continue
+        # Ratios couverts par la courbe du template (bornes en cache)
+        bounds = efficiency_interpolator.ratio_bounds(db, template.id)
+        valid_ratios = bounds.filter(AVAILABLE_RATIO_CHOICES) if bounds is not None else []
         
         if not valid_ratios:
             raise HTTPException(status_code=500, detail="Impossible de récupérer les ratios disponibles")
@@ -1446,6 +1430,8 @@ async def get_machine_available_ratios(site_id: int, instance_id: int, db: Sessi
             "valid_ratios": valid_ratios,
             "min_ratio": min(valid_ratios),
             "max_ratio": max(valid_ratios),
+            "curve_min_ratio": float(bounds.min_ratio),
+            "curve_max_ratio": float(bounds.max_ratio),
             "current_ratio": current_ratio,
             "current_ratio_type": current_ratio_type
         }
@@ -0,0 +1,303 @@
+"""
+Backtest à agressivité adaptative (voir docs/backtest-system-overview.md).
+
+Chaque jour, la volatilité mixte SD_final = w4·SD_4ans + w1·SD_1an des
+rendements logarithmiques du prix Bitcoin sert à estimer le profit minimal
+du cycle de paiement en cours; on choisit alors le ratio agressif, modéré ou
+conservateur. Les écarts-types glissants sont tenus à jour en O(1) par jour
+(sommes sur fenêtre), ce qui garde la simulation linéaire en nombre de jours.
+"""
+import math
+from calendar import monthrange
+from datetime import date, timedelta
+from typing import List, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .backtest_engine import summarize_profits
+from .backtest_profiles import profile_ratio_metrics
+from .backtest_runner import BacktestDataError, load_backtest_market
+from .market_history import market_history_store
+
+SD_1Y_DAYS = 365
+SD_4Y_DAYS = 1460
+
+LEVELS = ("aggressive", "moderate", "conservative")
+
+
+class RollingVolatility:
+    """Écart-type glissant (ddof=1) des `window` dernières valeurs, mis à jour en O(1)"""
+
+    def __init__(self, window: int):
+        self.window = window
+        self._buffer = [0.0] * window
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+
+    def push(self, value: float) -> None:
+        slot = self._count % self.window
+        if self._count >= self.window:
+            old = self._buffer[slot]
+            self._sum -= old
+            self._sum_sq -= old * old
+        self._buffer[slot] = value
+        self._sum += value
+        self._sum_sq += value * value
+        self._count += 1
+
+        # Recalcul exact une fois par fenêtre pour éliminer la dérive d'arrondi (coût amorti O(1))
+        if self._count % self.window == 0:
+            self._sum = math.fsum(self._buffer)
+            self._sum_sq = math.fsum(v * v for v in self._buffer)
+
+    def __len__(self) -> int:
+        return min(self._count, self.window)
+
+    def std(self) -> float:
+        n = len(self)
+        if n < 2:
+            return 0.0
+        variance = (self._sum_sq - self._sum * self._sum / n) / (n - 1)
+        return math.sqrt(variance) if variance > 0 else 0.0
+
+
+def add_months(day: date, months: int) -> date:
+    """Ajoute des mois calendaires (le jour est ramené à la fin du mois si besoin)"""
+    month_index = day.month - 1 + months
+    year = day.year + month_index // 12
+    month = month_index % 12 + 1
+    return date(year, month, min(day.day, monthrange(year, month)[1]))
+
+
+def profit_target_per_cycle(machine_cost_usd: float, roi_target_months: int, payout_interval_months: int) -> float:
+    """Profit_visé_cycle = (Coût_machines / Période_ROI_mois × 12) / (12 / Intervalle_paiement_mois)"""
+    annual_target = machine_cost_usd / roi_target_months * 12
+    return annual_target / (12 / payout_interval_months)
+
+
+def choose_level(guaranteed_profit: float, cycle_target: float) -> str:
+    """Décision d'agressivité à partir du profit minimal garanti du cycle"""
+    if guaranteed_profit > cycle_target:
+        return "aggressive"
+    if guaranteed_profit > cycle_target * 0.5:
+        return "moderate"
+    return "conservative"
+
+
+def prepare_adaptive_inputs(db: Session, profile: dict, request, ratios: List[float]) -> dict:
+    """
+    Charge tout ce dont la simulation a besoin, sans accès base ensuite.
+
+    Les matrices revenus/coûts (jours valides × ratios) sont calculées en une
+    passe vectorisée; les prix incluent 4 ans de préchauffage avant le début
+    pour que les fenêtres de volatilité soient pleines dès le premier jour.
+    """
+    market = load_backtest_market(db, request.start_date, request.end_date)
+    mask, revenue, cost = profile_ratio_metrics(db, profile, market, ratios)
+    valid_offsets = np.flatnonzero(mask)
+    if not len(valid_offsets):
+        raise BacktestDataError("Aucun jour avec prix et données FPPS sur cette période")
+
+    machine_cost_cad = float(request.machine_cost_cad) if request.machine_cost_cad is not None else profile["machine_cost_cad"]
+    if not machine_cost_cad:
+        raise BacktestDataError("Coût des machines inconnu: renseigner machine_cost_cad")
+
+    warmup_start = request.start_date - timedelta(days=SD_4Y_DAYS + 1)
+    prices = np.ascontiguousarray(market_history_store.get_columns(db, warmup_start, request.end_date)["price_usd"])
+
+    return {
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "ratios": list(ratios),
+        "valid_offsets": valid_offsets.astype(np.int64),
+        "revenue": np.ascontiguousarray(revenue),
+        "cost": np.ascontiguousarray(cost),
+        "prices": prices,
+        "warmup_days": (request.start_date - warmup_start).days,
+        "calendar_days": len(market),
+        # Coût des machines converti en USD comme les coûts d'électricité
+        "machine_cost_usd": machine_cost_cad * float(market.usd_per_cad()[valid_offsets[0]]),
+    }
+
+
+def simulate_adaptive(
+    inputs: dict,
+    columns: Tuple[int, int, int, int],
+    payout_interval_months: int,
+    roi_target_months: int,
+    weight_4y: float,
+    weight_1y: float,
+    include_daily: bool = True,
+) -> dict:
+    """
+    Boucle quotidienne de la stratégie adaptative (aucun accès base).
+
+    `columns` donne l'indice, dans les matrices de `inputs`, des ratios
+    agressif, modéré, conservateur et de référence.
+
+    Returns:
+        dict: summary, cycles et (optionnellement) daily
+    """
+    start_date = inputs["start_date"]
+    end_date = inputs["end_date"]
+    ratios = inputs["ratios"]
+    revenue = inputs["revenue"]
+    cost = inputs["cost"]
+    prices = inputs["prices"]
+    warmup_days = inputs["warmup_days"]
+    valid_offsets = inputs["valid_offsets"].tolist()
+    machine_cost_usd = inputs["machine_cost_usd"]
+    cycle_target = profit_target_per_cycle(machine_cost_usd, roi_target_months, payout_interval_months)
+
+    column_list = list(columns)
+    level_revenue = revenue[:, column_list]
+    level_cost = cost[:, column_list]
+    level_profit = level_revenue - level_cost
+    revenue_rows = level_revenue.tolist()
+    cost_rows = level_cost.tolist()
+    profit_rows = level_profit.tolist()
+    moderate_index = LEVELS.index("moderate")
+    baseline_index = len(LEVELS)
+
+    sd_1y = RollingVolatility(SD_1Y_DAYS)
+    sd_4y = RollingVolatility(SD_4Y_DAYS)
+    last_price = None
+
+    def push_price(offset: int) -> None:
+        nonlocal last_price
+        price = float(prices[offset])
+        if math.isnan(price) or price <= 0:
+            return
+        if last_price is not None:
+            log_return = math.log(price / last_price)
+            sd_1y.push(log_return)
+            sd_4y.push(log_return)
+        last_price = price
+
+    cycle_number = 1
+    cycle_start = start_date
+    cycle_end = add_months(start_date, payout_interval_months)
+    capital = 0.0
+    baseline_capital = 0.0
+    reference = None  # (revenu, coût) modérés du dernier jour simulé
+
+    daily: List[dict] = []
+    cycles: List[dict] = []
+    chosen = np.empty(len(valid_offsets), dtype=np.int64)
+    level_counts = {level: 0 for level in LEVELS}
+
+    def close_cycle(end: date) -> None:
+        cycles.append({
+            "start_date": cycle_start,
+            "end_date": end,
+            "profit_usd": capital,
+            "baseline_profit_usd": baseline_capital,
+            "target_profit_usd": cycle_target,
+            "target_reached": capital >= cycle_target,
+        })
+
+    start_ordinal = start_date.toordinal()
+    next_offset = 0
+    for i, offset in enumerate(valid_offsets):
+        # Rendements jusqu'à la veille: la décision n'utilise pas le prix du jour
+        while next_offset < warmup_days + offset:
+            push_price(next_offset)
+            next_offset += 1
+
+        day = date.fromordinal(start_ordinal + offset)
+        while day >= cycle_end:
+            close_cycle(cycle_end - timedelta(days=1))
+            cycle_number += 1
+            cycle_start, cycle_end = cycle_end, add_months(start_date, cycle_number * payout_interval_months)
+            capital = 0.0
+            baseline_capital = 0.0
+
+        sd_final = weight_4y * sd_4y.std() + weight_1y * sd_1y.std()
+
+        if reference is None:
+            level_position = moderate_index
+            min_cycle_profit = None
+        else:
+            # Borne basse du profit restant: revenu choqué de -1σ sur l'horizon du cycle
+            horizon = (cycle_end - day).days
+            ref_revenue, ref_cost = reference
+            shock = math.exp(-sd_final * math.sqrt(horizon))
+            min_cycle_profit = horizon * (ref_revenue * shock - ref_cost)
+            level_position = LEVELS.index(choose_level(capital + min_cycle_profit, cycle_target))
+
+        day_profit = profit_rows[i][level_position]
+        capital += day_profit
+        baseline_capital += profit_rows[i][baseline_index]
+        chosen[i] = level_position
+        level_counts[LEVELS[level_position]] += 1
+        reference = (revenue_rows[i][moderate_index], cost_rows[i][moderate_index])
+
+        if include_daily:
+            daily.append({
+                "date": day,
+                "level": LEVELS[level_position],
+                "adjustment_ratio": ratios[columns[level_position]],
+                "sd_1y": sd_1y.std(),
+                "sd_4y": sd_4y.std(),
+                "sd_final": sd_final,
+                "min_cycle_profit_usd": min_cycle_profit,
+                "capital_usd": capital,
+                "profit_usd": day_profit,
+                "baseline_profit_usd": profit_rows[i][baseline_index],
+            })
+
+    close_cycle(min(cycle_end - timedelta(days=1), end_date))
+
+    rows = np.arange(len(valid_offsets))
+    adaptive_profits = level_profit[rows, chosen]
+    adaptive_total = float(adaptive_profits.sum())
+    baseline_total = float(level_profit[:, baseline_index].sum())
+    years = inputs["calendar_days"] / 365.25
+
+    summary = summarize_profits(
+        adaptive_profits,
+        float(level_revenue[rows, chosen].sum()),
+        float(level_cost[rows, chosen].sum()),
+    )
+    summary.update({
+        "baseline_total_profit_usd": baseline_total,
+        "performance_ratio": adaptive_total / baseline_total if baseline_total else None,
+        "machine_cost_usd": machine_cost_usd,
+        "target_profit_per_cycle_usd": cycle_target,
+        "effective_roi_annual_percentage": adaptive_total / machine_cost_usd * 100 / years if years > 0 else 0,
+        "target_roi_annual_percentage": 12 / roi_target_months * 100,
+        "level_days": level_counts,
+        "cycles_on_target": sum(1 for cycle in cycles if cycle["target_reached"]),
+    })
+
+    return {"summary": summary, "cycles": cycles, "daily": daily}
+
+
+def run_adaptive_backtest(db: Session, profile: dict, request) -> dict:
+    """Simule jour par jour un profil (machine ou site) à agressivité adaptative"""
+    ratios = [
+        round(float(request.aggressive_ratio), 3),
+        round(float(request.moderate_ratio), 3),
+        round(float(request.conservative_ratio), 3),
+        round(float(request.baseline_ratio), 3),
+    ]
+    inputs = prepare_adaptive_inputs(db, profile, request, ratios)
+    result = simulate_adaptive(
+        inputs,
+        (0, 1, 2, 3),
+        request.payout_interval_months,
+        request.roi_target_months,
+        float(request.sd_weight_4y),
+        float(request.sd_weight_1y),
+        include_daily=request.include_daily,
+    )
+
+    return {
+        "profile": {"kind": profile["kind"], "id": profile["id"], "name": profile["name"]},
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "ratios": dict(zip(LEVELS + ("baseline",), ratios)),
+        **result,
+    }
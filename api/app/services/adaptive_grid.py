@@ -0,0 +1,192 @@
+"""
+Recherche en grille des paramètres du backtest adaptatif.
+
+Les matrices revenus/coûts et l'historique de prix sont calculés une seule
+fois dans le processus de l'API puis copiés dans des segments de mémoire
+partagée; les workers du pool s'y attachent par nom au lieu de recevoir une
+copie sérialisée à chaque tâche. Seuls les paramètres des combinaisons
+circulent entre processus.
+"""
+import itertools
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .adaptive_backtest import simulate_adaptive
+
+# Tableaux de `prepare_adaptive_inputs` placés en mémoire partagée
+SHARED_ARRAYS = ("valid_offsets", "revenue", "cost", "prices")
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _worker_count() -> int:
+    return int(os.getenv("BACKTEST_GRID_WORKERS", str(os.cpu_count() or 2)))
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_grid_executor() -> None:
+    """Arrête le pool de la recherche en grille (appelé à l'arrêt de l'API)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def build_parameter_grid(
+    sd_weights_4y: List[float],
+    roi_target_months: List[int],
+    payout_interval_months: List[int],
+    aggressive_ratios: List[float],
+) -> List[dict]:
+    """Produit cartésien des paramètres (le poids 1 an vaut 1 - poids 4 ans)"""
+    return [
+        {
+            "sd_weight_4y": w4,
+            "sd_weight_1y": round(1 - w4, 6),
+            "roi_target_months": roi,
+            "payout_interval_months": interval,
+            "aggressive_ratio": aggressive,
+        }
+        for w4, roi, interval, aggressive in itertools.product(
+            sorted(set(sd_weights_4y)),
+            sorted(set(roi_target_months)),
+            sorted(set(payout_interval_months)),
+            sorted(set(aggressive_ratios)),
+        )
+    ]
+
+
+def _share_inputs(inputs: dict) -> Tuple[List[shared_memory.SharedMemory], dict]:
+    """Copie les tableaux en mémoire partagée; retourne les segments et leur description"""
+    segments = []
+    descriptor = {key: value for key, value in inputs.items() if key not in SHARED_ARRAYS}
+    descriptor["shared"] = {}
+    try:
+        for key in SHARED_ARRAYS:
+            array = inputs[key]
+            segment = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            segments.append(segment)
+            np.ndarray(array.shape, dtype=array.dtype, buffer=segment.buf)[...] = array
+            descriptor["shared"][key] = (segment.name, array.shape, array.dtype.str)
+    except BaseException:
+        _release(segments)
+        raise
+    return segments, descriptor
+
+
+def _release(segments: List[shared_memory.SharedMemory]) -> None:
+    for segment in segments:
+        segment.close()
+        segment.unlink()
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """
+    S'attache à un segment créé par le processus de l'API.
+
+    Seul le créateur supprime le segment: le worker ne le suit pas avec le
+    resource_tracker (`track=False` depuis Python 3.13). Avant 3.13, les
+    workers du pool (spawn) partagent le resource_tracker de l'API, où
+    l'enregistrement du segment est déjà fait: le réenregistrer est sans
+    effet, alors que le désenregistrer ici ferait échouer celui de `unlink`.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+    return shared_memory.SharedMemory(name=name)
+
+
+def _evaluate_batch(descriptor: dict, columns: Dict[float, int], base_columns: Tuple[int, int, int], batch: List[dict]) -> List[dict]:
+    """Tâche worker: s'attache à la mémoire partagée et simule un lot de combinaisons"""
+    segments = []
+    try:
+        inputs = {key: value for key, value in descriptor.items() if key != "shared"}
+        for key, (name, shape, dtype) in descriptor["shared"].items():
+            segment = _attach(name)
+            segments.append(segment)
+            inputs[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+
+        moderate, conservative, baseline = base_columns
+        results = []
+        for params in batch:
+            outcome = simulate_adaptive(
+                inputs,
+                (columns[params["aggressive_ratio"]], moderate, conservative, baseline),
+                params["payout_interval_months"],
+                params["roi_target_months"],
+                params["sd_weight_4y"],
+                params["sd_weight_1y"],
+                include_daily=False,
+            )
+            summary = outcome["summary"]
+            results.append({
+                **params,
+                "total_profit_usd": summary["total_profit_usd"],
+                "baseline_total_profit_usd": summary["baseline_total_profit_usd"],
+                "performance_ratio": summary["performance_ratio"],
+                "effective_roi_annual_percentage": summary["effective_roi_annual_percentage"],
+                "profit_volatility": summary["profit_volatility"],
+                "cycles": len(outcome["cycles"]),
+                "cycles_on_target": summary["cycles_on_target"],
+                "level_days": summary["level_days"],
+            })
+        return results
+    finally:
+        # Libérer les vues avant de fermer les segments
+        inputs = None
+        for segment in segments:
+            segment.close()
+
+
+def run_grid_search(inputs: dict, grid: List[dict], base_columns: Tuple[int, int, int], rank_by: str) -> List[dict]:
+    """
+    Évalue toutes les combinaisons sur le pool de processus et les classe.
+
+    `inputs` vient de `prepare_adaptive_inputs` avec tous les ratios agressifs
+    de la grille; `base_columns` donne les colonnes modérée, conservatrice et
+    de référence.
+    """
+    columns = {ratio: i for i, ratio in enumerate(inputs["ratios"])}
+    executor = _get_executor()
+
+    # Quelques lots par worker: peu d'allers-retours, charge équilibrée
+    batch_count = max(1, min(len(grid), _worker_count() * 4))
+    batches = [grid[i::batch_count] for i in range(batch_count)]
+
+    segments, descriptor = _share_inputs(inputs)
+    futures = []
+    try:
+        for batch in batches:
+            futures.append(executor.submit(_evaluate_batch, descriptor, columns, base_columns, batch))
+        results = [row for future in futures for row in future.result()]
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    finally:
+        # Les lots déjà lancés restent attachés aux segments: attendre leur fin avant unlink
+        wait(futures)
+        _release(segments)
+
+    results.sort(key=lambda row: row[rank_by] if row[rank_by] is not None else float("-inf"), reverse=True)
+    for rank, row in enumerate(results, start=1):
+        row["rank"] = rank
+    return results
@@ -0,0 +1,183 @@
+"""
+Mode audit du moteur de backtest: recalcul exact en Decimal.
+
+Le moteur par défaut travaille en float64 vectorisé. Le mode audit relit les
+valeurs Decimal d'origine (prix, FPPS, point d'efficacité retourné par la
+fonction SQL) et refait le même calcul jour par jour en arithmétique Decimal,
+puis compare les deux résultats colonne par colonne avec une tolérance
+relative et absolue configurable.
+"""
+from datetime import date
+from decimal import Decimal, localcontext
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .backtest_engine import load_market_series, compute_daily_metrics
+from .efficiency_batch import get_efficiency_points_batch
+
+AUDIT_COLUMNS = ("power_consumed_kwh", "revenue_usd", "cost_usd", "profit_usd", "roi_daily")
+
+# Précision du contexte Decimal utilisé pour le recalcul
+AUDIT_PRECISION = 40
+
+DEFAULT_REL_TOLERANCE = 1e-9
+DEFAULT_ABS_TOLERANCE = 1e-6
+
+
+class BacktestAuditMismatch(AssertionError):
+    """Écart float64/Decimal hors tolérance (le rapport complet est dans `report`)"""
+
+    def __init__(self, report: dict):
+        super().__init__(f"Écart float64/Decimal hors tolérance: {report}")
+        self.report = report
+
+
+def get_efficiency_point_exact(db: Session, machine_id: int, adjustment_ratio) -> Optional[Tuple[Decimal, Decimal]]:
+    """Point d'efficacité tel que retourné par la fonction SQL, sans conversion en float"""
+    point = get_efficiency_points_batch(db, [machine_id], [adjustment_ratio])[0]
+    if point is None:
+        return None
+    return point[0], Decimal(point[1])
+
+
+def load_market_rows_exact(db: Session, start_date: date, end_date: date) -> List[Tuple[date, Decimal, Decimal, Decimal, Decimal]]:
+    """Jours ayant un prix et des données FPPS: (date, prix USD, prix CAD, taux FPPS, difficulté)"""
+    rows = db.query(
+        models.BitcoinPrice.date,
+        models.BitcoinPrice.price_usd,
+        models.BitcoinPrice.price_cad,
+        models.FppsData.fpps_rate,
+        models.FppsData.network_difficulty,
+    ).join(
+        models.FppsData, models.FppsData.date == models.BitcoinPrice.date
+    ).filter(
+        models.BitcoinPrice.date >= start_date,
+        models.BitcoinPrice.date <= end_date,
+    ).order_by(models.BitcoinPrice.date).all()
+    return [
+        (day, Decimal(price_usd), Decimal(price_cad), Decimal(fpps_rate), Decimal(difficulty))
+        for day, price_usd, price_cad, fpps_rate, difficulty in rows
+    ]
+
+
+def compute_daily_metrics_exact(
+    market_rows: List[Tuple[date, Decimal, Decimal, Decimal, Decimal]],
+    effective_hashrate: Decimal,
+    power_consumption: Decimal,
+    electricity_rate_cad: Decimal,
+) -> Dict[str, list]:
+    """Mêmes formules que `compute_daily_metrics`, jour par jour en Decimal"""
+    rate = Decimal(electricity_rate_cad)
+    metrics = {"dates": []}
+    metrics.update({column: [] for column in AUDIT_COLUMNS})
+
+    with localcontext() as ctx:
+        ctx.prec = AUDIT_PRECISION
+        power_kwh = power_consumption * 24 / 1000
+        for day, price_usd, price_cad, fpps_rate, difficulty in market_rows:
+            revenue_btc = effective_hashrate * fpps_rate * 24 / difficulty
+            revenue_usd = revenue_btc * price_usd
+            cost_usd = power_kwh * rate * price_usd / price_cad
+            profit_usd = revenue_usd - cost_usd
+            roi_daily = profit_usd * 100 / cost_usd if cost_usd > 0 else Decimal(0)
+
+            metrics["dates"].append(day)
+            metrics["power_consumed_kwh"].append(power_kwh)
+            metrics["revenue_usd"].append(revenue_usd)
+            metrics["cost_usd"].append(cost_usd)
+            metrics["profit_usd"].append(profit_usd)
+            metrics["roi_daily"].append(roi_daily)
+
+    return metrics
+
+
+def audit_backtest(
+    db: Session,
+    request,
+    rel_tolerance: float = DEFAULT_REL_TOLERANCE,
+    abs_tolerance: float = DEFAULT_ABS_TOLERANCE,
+) -> dict:
+    """
+    Recalcule un backtest (BacktestRequest) en float64 et en Decimal et compare.
+
+    Un écart est accepté si |float - exact| <= abs_tolerance + rel_tolerance × |exact|,
+    pour chaque jour, chaque colonne et chaque total.
+    """
+    point = get_efficiency_point_exact(db, request.machine_id, request.adjustment_ratio)
+    if point is None:
+        return {"agree": False, "error": "Aucune donnée d'efficacité trouvée pour ce ratio"}
+    hashrate, power = point
+
+    market = load_market_series(db, request.start_date, request.end_date)
+    fast = compute_daily_metrics(market, float(hashrate), float(power), request.electricity_rate_cad)
+    fast_dates = market.dates(fast["mask"])
+
+    exact = compute_daily_metrics_exact(
+        load_market_rows_exact(db, request.start_date, request.end_date),
+        hashrate,
+        power,
+        request.electricity_rate_cad,
+    )
+
+    report = {
+        "engine": "float64",
+        "reference": "decimal",
+        "rel_tolerance": rel_tolerance,
+        "abs_tolerance": abs_tolerance,
+        "days_float": len(fast_dates),
+        "days_decimal": len(exact["dates"]),
+        "columns": {},
+        "totals": {},
+    }
+    agree = fast_dates == exact["dates"]
+    report["same_days"] = agree
+
+    if agree:
+        for column in AUDIT_COLUMNS:
+            reference = np.array([float(v) for v in exact[column]], dtype=np.float64)
+            diff = np.abs(fast[column] - reference)
+            allowed = abs_tolerance + rel_tolerance * np.abs(reference)
+            failures = np.flatnonzero(diff > allowed)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                rel = np.where(reference != 0, diff / np.abs(reference), 0.0)
+            report["columns"][column] = {
+                "max_abs_diff": float(diff.max()) if len(diff) else 0.0,
+                "max_rel_diff": float(rel.max()) if len(rel) else 0.0,
+                "failures": int(len(failures)),
+                "first_failure_date": fast_dates[int(failures[0])] if len(failures) else None,
+            }
+            agree = agree and not len(failures)
+
+        for column in ("revenue_usd", "cost_usd", "profit_usd"):
+            with localcontext() as ctx:
+                ctx.prec = AUDIT_PRECISION
+                exact_total = sum(exact[column], Decimal(0))
+            fast_total = float(fast[column].sum())
+            diff = abs(fast_total - float(exact_total))
+            ok = diff <= abs_tolerance + rel_tolerance * abs(float(exact_total))
+            report["totals"][column] = {
+                "float64": fast_total,
+                "decimal": str(exact_total),
+                "abs_diff": diff,
+                "agree": ok,
+            }
+            agree = agree and ok
+
+    report["agree"] = bool(agree)
+    return report
+
+
+def assert_engines_agree(
+    db: Session,
+    request,
+    rel_tolerance: float = DEFAULT_REL_TOLERANCE,
+    abs_tolerance: float = DEFAULT_ABS_TOLERANCE,
+) -> dict:
+    """Harnais de vérification: lève BacktestAuditMismatch si float64 et Decimal divergent"""
+    report = audit_backtest(db, request, rel_tolerance, abs_tolerance)
+    if not report["agree"]:
+        raise BacktestAuditMismatch(report)
+    return report
@@ -0,0 +1,87 @@
+"""
+Cache adressé par contenu des résultats de backtest.
+
+Un BacktestResult est identifié par deux empreintes SHA-256:
+- `request_hash`: paramètres normalisés de la requête;
+- `data_version`: contenu des données réellement utilisées, c'est-à-dire les
+  colonnes de marché de la période (lues dans l'historique en mémoire) et la
+  courbe d'efficacité de la machine.
+
+Une requête identique sur des données inchangées réutilise le résultat
+existant; toute modification d'un prix, d'une donnée FPPS dans la période ou
+de la courbe change `data_version` et force un nouveau calcul. Les
+modifications hors de la période n'ont aucun effet.
+"""
+import hashlib
+import json
+from datetime import date
+from decimal import Decimal
+from typing import Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .market_history import market_history_store
+
+# À incrémenter quand les formules du backtest changent (invalide tout le cache)
+ENGINE_VERSION = 2
+
+# Colonnes de marché entrant dans le calcul d'un backtest machine
+HASHED_MARKET_COLUMNS = ("price_usd", "price_cad", "fpps_rate", "network_difficulty")
+
+
+def backtest_request_hash(request) -> str:
+    """Empreinte des paramètres d'un BacktestRequest (ratio et tarif normalisés)"""
+    key = {
+        "engine": ENGINE_VERSION,
+        "machine_id": request.machine_id,
+        "start_date": request.start_date.isoformat(),
+        "end_date": request.end_date.isoformat(),
+        "adjustment_ratio": str(Decimal(request.adjustment_ratio).quantize(Decimal("0.001"))),
+        "electricity_rate_cad": str(Decimal(request.electricity_rate_cad).quantize(Decimal("0.00001"))),
+        "summary_only": bool(request.summary_only),
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+
+def backtest_data_version(db: Session, machine_id: int, start_date: date, end_date: date) -> str:
+    """
+    Empreinte des prix/FPPS de [start_date, end_date], de la courbe d'efficacité
+    et de la version des formules (un résultat d'une version antérieure ne se
+    prolonge pas).
+    """
+    digest = hashlib.sha256()
+    digest.update(f"engine:{ENGINE_VERSION}".encode())
+
+    columns = market_history_store.get_columns(db, start_date, end_date)
+    for name in HASHED_MARKET_COLUMNS:
+        digest.update(name.encode())
+        digest.update(np.ascontiguousarray(columns[name]).tobytes())
+
+    # La fonction d'interpolation dépend aussi de la puissance nominale et de l'état du template
+    template = db.query(
+        models.MachineTemplate.power_nominal, models.MachineTemplate.is_active
+    ).filter(models.MachineTemplate.id == machine_id).first()
+    digest.update(repr(tuple(template) if template else None).encode())
+
+    curve = db.query(
+        models.MachineEfficiencyCurve.power_consumption,
+        models.MachineEfficiencyCurve.effective_hashrate,
+    ).filter(
+        models.MachineEfficiencyCurve.machine_id == machine_id
+    ).order_by(
+        models.MachineEfficiencyCurve.power_consumption,
+        models.MachineEfficiencyCurve.effective_hashrate,
+    ).all()
+    digest.update(repr([(int(p), str(h)) for p, h in curve]).encode())
+
+    return digest.hexdigest()
+
+
+def find_cached_backtest(db: Session, request_hash: str, data_version: str) -> Optional[models.BacktestResult]:
+    """Dernier résultat calculé pour cette requête sur ces mêmes données"""
+    return db.query(models.BacktestResult).filter(
+        models.BacktestResult.request_hash == request_hash,
+        models.BacktestResult.data_version == data_version,
+    ).order_by(models.BacktestResult.id.desc()).first()
@@ -0,0 +1,88 @@
+"""
+Comparaison de plusieurs backtests stockés.
+
+Les séries quotidiennes de tous les backtests demandés sont lues en une seule
+requête par format de stockage, alignées sur l'union de leurs dates puis
+renvoyées sous forme de colonnes (une liste par série), avec le profit cumulé
+de chacun et son écart relatif au backtest de référence.
+"""
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .backtest_series import load_series_columns
+
+# Nombre maximum de backtests comparés en un appel
+MAX_COMPARE_BACKTESTS = 20
+
+COMPARED_COLUMNS = ("revenue_usd", "cost_usd", "profit_usd")
+
+
+def _column(values: np.ndarray) -> List[Optional[float]]:
+    """Liste JSON: NaN (jour absent) devient null"""
+    return [None if np.isnan(v) else float(v) for v in values]
+
+
+def compare_backtests(db: Session, results: List[models.BacktestResult], baseline_id: int) -> dict:
+    """
+    Aligne les séries des backtests sur l'union de leurs dates.
+
+    Un jour absent d'un backtest vaut null dans ses colonnes quotidiennes et ne
+    modifie pas son profit cumulé. L'écart relatif vaut
+    (cumul - cumul_référence) / |cumul_référence|, null quand la référence est nulle.
+    """
+    ids = [result.id for result in results]
+    series = load_series_columns(db, results)
+
+    all_ordinals = np.unique(np.concatenate(
+        [entry["ordinals"] for entry in series.values()] or [np.empty(0, dtype=np.int64)]
+    ))
+    n_days = len(all_ordinals)
+
+    cumulative = {}
+    columns = {}
+    for backtest_id in ids:
+        entry = series.get(backtest_id)
+        aligned = {column: np.full(n_days, np.nan) for column in COMPARED_COLUMNS}
+        if entry is not None:
+            positions = np.searchsorted(all_ordinals, entry["ordinals"])
+            for column in COMPARED_COLUMNS:
+                aligned[column][positions] = entry[column]
+        cumulative[backtest_id] = np.cumsum(np.nan_to_num(aligned["profit_usd"]))
+        columns[backtest_id] = aligned
+
+    base = cumulative[baseline_id]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        base_abs = np.abs(base)
+        relative = {
+            backtest_id: np.where(base_abs > 0, (values - base) / base_abs, np.nan)
+            for backtest_id, values in cumulative.items()
+        }
+
+    return {
+        "baseline_id": baseline_id,
+        "dates": [date.fromordinal(int(o)).isoformat() for o in all_ordinals],
+        "backtests": [
+            {
+                "id": result.id,
+                "machine_id": result.machine_id,
+                "start_date": result.start_date,
+                "end_date": result.end_date,
+                "adjustment_ratio": float(result.adjustment_ratio),
+                "total_profit_usd": float(result.total_profit_usd or 0),
+                "days": len(series[result.id]["ordinals"]) if result.id in series else 0,
+            }
+            for result in results
+        ],
+        "series": {
+            str(backtest_id): {
+                **{column: _column(values) for column, values in columns[backtest_id].items()},
+                "cumulative_profit_usd": cumulative[backtest_id].tolist(),
+                "relative_difference": _column(relative[backtest_id]),
+            }
+            for backtest_id in ids
+        },
+    }
@@ -0,0 +1,249 @@
+"""
+Moteur de backtest vectorisé.
+
+Les historiques de prix Bitcoin et FPPS sont chargés une seule fois dans des
+tableaux NumPy alignés sur l'ordinal du jour. Revenus, coûts, profits et ROI
+sont ensuite calculés en opérations sur tableaux entiers, sans boucle par jour.
+"""
+from datetime import date, timedelta
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .backtest_stats import RunningSummary
+from .efficiency_lookup import get_lookup_point, get_lookup_points
+from .market_history import market_history_store
+
+
+class MarketSeries:
+    """Historique de marché aligné jour par jour sur [start_date, end_date]
+
+    Chaque tableau a une case par jour calendaire; les jours sans donnée
+    contiennent NaN et sont exclus par le masque `valid`.
+    """
+
+    def __init__(
+        self,
+        start_date: date,
+        price_usd: np.ndarray,
+        price_cad: np.ndarray,
+        fpps_rate: np.ndarray,
+        network_difficulty: np.ndarray,
+    ):
+        self.start_date = start_date
+        self.price_usd = price_usd
+        self.price_cad = price_cad
+        self.fpps_rate = fpps_rate
+        self.network_difficulty = network_difficulty
+        # Un jour est exploitable seulement si le prix ET les données FPPS existent
+        self.valid = ~(
+            np.isnan(price_usd) | np.isnan(price_cad) | np.isnan(fpps_rate) | np.isnan(network_difficulty)
+        )
+
+    def __len__(self) -> int:
+        return len(self.price_usd)
+
+    @property
+    def end_date(self) -> date:
+        return self.start_date + timedelta(days=len(self) - 1)
+
+    def dates(self, mask: Optional[np.ndarray] = None) -> List[date]:
+        """Dates calendaires correspondant aux cases (optionnellement filtrées par un masque)"""
+        offsets = np.arange(len(self)) if mask is None else np.flatnonzero(mask)
+        start_ordinal = self.start_date.toordinal()
+        return [date.fromordinal(start_ordinal + int(o)) for o in offsets]
+
+    def revenue_btc_per_th(self) -> np.ndarray:
+        """Revenu quotidien en BTC pour 1 TH/s (même formule que le backtest historique)"""
+        return self.fpps_rate * 24 / self.network_difficulty
+
+    def usd_per_cad(self) -> np.ndarray:
+        """Taux de change du jour: valeur en USD d'un dollar canadien (facteur des coûts CAD → USD)"""
+        return self.price_usd / self.price_cad
+
+
+def load_market_series(db: Session, start_date: date, end_date: date) -> MarketSeries:
+    """Extrait la période [start_date, end_date] de l'historique de marché en mémoire"""
+    columns = market_history_store.get_columns(db, start_date, end_date)
+    return MarketSeries(
+        start_date,
+        columns["price_usd"],
+        columns["price_cad"],
+        columns["fpps_rate"],
+        columns["network_difficulty"],
+    )
+
+
+def get_efficiency_point(db: Session, machine_id: int, adjustment_ratio) -> Optional[Tuple[float, float]]:
+    """Retourne (hashrate TH/s, puissance W) interpolés pour un ratio, ou None si hors courbe"""
+    point = get_lookup_point(db, machine_id, adjustment_ratio)
+    if point is None:
+        return None
+    return float(point[0]), float(point[1])
+
+
+def build_ratio_grid(ratio_min: float, ratio_max: float, ratio_step: float) -> List[float]:
+    """Grille de ratios inclusive [ratio_min, ratio_max] arrondie au millième"""
+    count = int(math.floor((ratio_max - ratio_min) / ratio_step + 1e-9)) + 1
+    return [round(ratio_min + i * ratio_step, 3) for i in range(max(count, 0))]
+
+
+def lookup_efficiency_points(db: Session, machine_id: int, ratios: List[float]) -> Tuple[List[float], np.ndarray, np.ndarray]:
+    """
+    Points d'efficacité de tous les ratios, lus en une fois (table précalculée).
+
+    Returns:
+        tuple: (ratios couverts par la courbe, hashrates TH/s, puissances W)
+    """
+    kept_ratios = []
+    hashrates = []
+    powers = []
+    for ratio, point in zip(ratios, get_lookup_points(db, machine_id, ratios)):
+        if point is None:
+            continue
+        kept_ratios.append(ratio)
+        hashrates.append(float(point[0]))
+        powers.append(float(point[1]))
+    return kept_ratios, np.asarray(hashrates, dtype=np.float64), np.asarray(powers, dtype=np.float64)
+
+
+def compute_daily_metrics(
+    market: MarketSeries,
+    effective_hashrate: float,
+    power_consumption: float,
+    electricity_rate_cad: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Calcule les métriques quotidiennes pour un point d'efficacité constant.
+
+    Returns:
+        dict: tableaux restreints aux jours valides (`mask` donne leur position
+        dans la série complète)
+    """
+    mask = market.valid
+    revenue_btc = effective_hashrate * market.revenue_btc_per_th()[mask]
+    revenue_usd = revenue_btc * market.price_usd[mask]
+
+    daily_power_kwh = power_consumption * 24 / 1000
+    power_kwh = np.full(revenue_usd.shape, daily_power_kwh, dtype=np.float64)
+    cost_usd = power_kwh * float(electricity_rate_cad) * market.usd_per_cad()[mask]
+
+    profit_usd = revenue_usd - cost_usd
+    roi_daily = np.zeros_like(profit_usd)
+    np.divide(profit_usd * 100, cost_usd, out=roi_daily, where=cost_usd > 0)
+
+    return {
+        "mask": mask,
+        "power_consumed_kwh": power_kwh,
+        "revenue_usd": revenue_usd,
+        "cost_usd": cost_usd,
+        "profit_usd": profit_usd,
+        "roi_daily": roi_daily,
+    }
+
+
+def compute_ratio_sweep(
+    market: MarketSeries,
+    hashrates: np.ndarray,
+    powers: np.ndarray,
+    electricity_rate_cad: float,
+) -> Dict[str, np.ndarray]:
+    """
+    Calcule en une passe les matrices jours × ratios (revenu, coût, profit).
+
+    Les colonnes suivent l'ordre de `hashrates`/`powers`; seules les lignes des
+    jours valides sont conservées (`mask`).
+    """
+    mask = market.valid
+    revenue_usd_per_th = (market.revenue_btc_per_th() * market.price_usd)[mask]
+    cost_factor = market.usd_per_cad()[mask] * float(electricity_rate_cad)
+
+    revenue_usd = revenue_usd_per_th[:, None] * hashrates[None, :]
+    cost_usd = cost_factor[:, None] * (powers * 24 / 1000)[None, :]
+
+    return {
+        "mask": mask,
+        "revenue_usd": revenue_usd,
+        "cost_usd": cost_usd,
+        "profit_usd": revenue_usd - cost_usd,
+    }
+
+
+def allocate_tier1_kwh(daily_kwh: np.ndarray, tier1_limit_kwh: float) -> np.ndarray:
+    """
+    Répartit le budget quotidien du premier palier entre les machines.
+
+    Les colonnes de `daily_kwh` (dernier axe) doivent être triées de la
+    machine la plus efficace à la moins efficace: chacune reçoit ce qui reste
+    du budget après les précédentes. Fonctionne pour un seul jour (M,) comme
+    pour une matrice jours × machines (D, M).
+    """
+    consumed_before = np.cumsum(daily_kwh, axis=-1) - daily_kwh
+    return np.clip(float(tier1_limit_kwh) - consumed_before, 0, daily_kwh)
+
+
+def compute_site_daily_metrics(
+    market: MarketSeries,
+    hashrates: np.ndarray,
+    powers: np.ndarray,
+    tier1_rate: float,
+    tier2_rate: Optional[float] = None,
+    tier1_limit_kwh: Optional[float] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Calcule les matrices jours × machines d'un site avec tarif à deux paliers.
+
+    `hashrates`/`powers` donnent une colonne par machine (quantité incluse),
+    soit constants (M,), soit par jour (D, M) sur toute la série. Chaque jour,
+    le premier palier est attribué aux machines les plus efficaces (J/TH) en
+    premier, comme dans le calcul de coût du site. Sans limite de palier,
+    toute la consommation est facturée au tarif du premier palier.
+    """
+    mask = market.valid
+    n_days = int(mask.sum())
+    hashrates = np.asarray(hashrates, dtype=np.float64)
+    powers = np.asarray(powers, dtype=np.float64)
+    if hashrates.ndim == 2:
+        hashrates = hashrates[mask]
+        powers = powers[mask]
+    hashrates = np.broadcast_to(hashrates, (n_days, hashrates.shape[-1]))
+    powers = np.broadcast_to(powers, (n_days, powers.shape[-1]))
+
+    revenue_usd_per_th = (market.revenue_btc_per_th() * market.price_usd)[mask]
+    revenue_usd = revenue_usd_per_th[:, None] * hashrates
+
+    power_kwh = powers * 24 / 1000
+    if tier1_limit_kwh is None:
+        tier1_kwh = power_kwh.copy()
+    else:
+        # Trier chaque jour par J/TH croissant, allouer, puis revenir à l'ordre des colonnes
+        with np.errstate(divide="ignore", invalid="ignore"):
+            j_per_th = np.where(hashrates > 0, powers / hashrates, np.inf)
+        order = np.argsort(j_per_th, axis=1, kind="stable")
+        sorted_tier1 = allocate_tier1_kwh(np.take_along_axis(power_kwh, order, axis=1), tier1_limit_kwh)
+        tier1_kwh = np.empty_like(power_kwh)
+        np.put_along_axis(tier1_kwh, order, sorted_tier1, axis=1)
+    tier2_kwh = power_kwh - tier1_kwh
+
+    second_rate = float(tier2_rate) if tier2_rate is not None else float(tier1_rate)
+    cost_cad = tier1_kwh * float(tier1_rate) + tier2_kwh * second_rate
+    cost_usd = cost_cad * market.usd_per_cad()[mask][:, None]
+
+    return {
+        "mask": mask,
+        "power_consumed_kwh": power_kwh,
+        "tier1_kwh": tier1_kwh,
+        "tier2_kwh": tier2_kwh,
+        "revenue_usd": revenue_usd,
+        "cost_usd": cost_usd,
+        "profit_usd": revenue_usd - cost_usd,
+    }
+
+
+def summarize_profits(profits: np.ndarray, total_revenue: float, total_cost: float) -> dict:
+    """Statistiques de synthèse d'une série de profits quotidiens (en une passe)"""
+    state = RunningSummary()
+    state.update(profits, total_revenue, total_cost)
+    return state.summary()
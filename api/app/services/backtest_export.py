@@ -0,0 +1,100 @@
+"""
+Export en flux des simulations quotidiennes d'un backtest.
+
+Les lignes sont lues par lots via un curseur côté serveur (`yield_per`) dans
+une session propre au flux, ou décodées depuis la série compacte, puis
+envoyées au fil de l'eau en NDJSON ou en CSV: la mémoire reste constante
+quelle que soit la durée du backtest et le client reçoit les premières lignes
+immédiatement.
+"""
+import csv
+import io
+import json
+from typing import Iterator, Tuple
+
+from sqlalchemy import select
+
+from ..database import SessionLocal
+from ..models import models
+from .backtest_series import is_packed, load_packed_columns, iter_packed_rows
+
+# Lignes lues par aller-retour avec la base
+STREAM_BATCH_SIZE = 1000
+
+DAILY_EXPORT_COLUMNS = (
+    "id",
+    "backtest_id",
+    "date",
+    "machine_id",
+    "adjustment_ratio",
+    "power_consumed_kwh",
+    "revenue_usd",
+    "cost_usd",
+    "profit_usd",
+    "roi_daily",
+    "created_at",
+)
+
+
+def iter_daily_simulation_rows(backtest_id: int, batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Tuple]:
+    """Parcourt les simulations quotidiennes d'un backtest par ordre de date, quel que soit son format"""
+    db = SessionLocal()
+    try:
+        backtest_result = db.get(models.BacktestResult, backtest_id)
+        if backtest_result is not None and is_packed(backtest_result):
+            # Série compacte: lue en un aller-retour, les lignes sont produites à la volée
+            columns = load_packed_columns(db, backtest_result)
+            if columns is not None:
+                yield from iter_packed_rows(backtest_result, columns)
+            return
+
+        stmt = select(
+            *(getattr(models.DailySimulation, column) for column in DAILY_EXPORT_COLUMNS)
+        ).where(
+            models.DailySimulation.backtest_id == backtest_id
+        ).order_by(
+            models.DailySimulation.date
+        ).execution_options(yield_per=batch_size)
+
+        for partition in db.execute(stmt).partitions():
+            yield from partition
+    finally:
+        db.close()
+
+
+def _json_value(value):
+    if value is None or isinstance(value, (int, float, str)):
+        return value
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return float(value)
+
+
+def ndjson_lines(rows: Iterator[Tuple]) -> Iterator[str]:
+    """Une ligne JSON par jour, envoyées par lots"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps({column: _json_value(value) for column, value in zip(DAILY_EXPORT_COLUMNS, row)}))
+        if len(lines) == STREAM_BATCH_SIZE:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def csv_lines(rows: Iterator[Tuple]) -> Iterator[str]:
+    """En-tête puis une ligne CSV par jour, envoyées par lots"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(DAILY_EXPORT_COLUMNS)
+
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(["" if value is None else value for value in row])
+        if count % STREAM_BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,148 @@
+"""
+Exécution des backtests longs en arrière-plan.
+
+Chaque job est enregistré dans `backtest_jobs` puis exécuté dans un pool de
+processus: l'API répond immédiatement avec l'identifiant du job, le worker
+met à jour la progression (jours traités) en base et vérifie entre chaque bloc
+si une annulation a été demandée. Le résultat final est un BacktestResult
+classique, consultable via `/backtest/results/{id}`.
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from ..models import models
+
+logger = logging.getLogger(__name__)
+
+# Nombre de jours écrits entre deux mises à jour de progression
+JOB_CHUNK_DAYS = 90
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+_futures: Dict[int, Future] = {}
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            max_workers = int(os.getenv("BACKTEST_JOB_WORKERS", "2"))
+            # "spawn": les workers ouvrent leurs propres connexions, rien n'est hérité du serveur
+            _executor = ProcessPoolExecutor(
+                max_workers=max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def shutdown_job_executor() -> None:
+    """Arrête le pool de workers (appelé à l'arrêt de l'API)"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def submit_backtest_job(job_id: int) -> None:
+    """Place un job déjà enregistré dans la file du pool de processus"""
+    future = _get_executor().submit(run_backtest_job, job_id)
+    _futures[job_id] = future
+    future.add_done_callback(lambda _: _futures.pop(job_id, None))
+
+
+def request_job_cancellation(db: Session, job: models.BacktestJob) -> models.BacktestJob:
+    """Demande l'annulation d'un job; un job encore en file est annulé immédiatement"""
+    if job.status in ("completed", "failed", "cancelled"):
+        return job
+
+    job.cancel_requested = True
+    future = _futures.get(job.id)
+    if job.status == "pending" and future is not None and future.cancel():
+        job.status = "cancelled"
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+class _JobProgress:
+    """Callback de progression: écrit l'avancement et détecte l'annulation"""
+
+    def __init__(self, status_db: Session, job: models.BacktestJob):
+        self.status_db = status_db
+        self.job = job
+
+    def __call__(self, processed_days: int, total_days: int) -> None:
+        from .backtest_runner import BacktestCancelled
+
+        self.status_db.refresh(self.job)
+        if self.job.cancel_requested:
+            raise BacktestCancelled()
+        self.job.processed_days = processed_days
+        self.job.total_days = total_days
+        self.status_db.commit()
+
+
+def run_backtest_job(job_id: int) -> None:
+    """Point d'entrée exécuté dans un processus worker"""
+    from ..database import SessionLocal
+    from ..models.schemas import BacktestRequest
+    from .backtest_runner import BacktestCancelled, execute_backtest
+    from .efficiency_interpolation import efficiency_interpolator
+    from .market_history import market_history_store
+
+    # Le worker ne reçoit pas les invalidations de l'API: repartir de la base
+    market_history_store.invalidate()
+    efficiency_interpolator.invalidate()
+
+    status_db = SessionLocal()
+    work_db = SessionLocal()
+    try:
+        job = status_db.query(models.BacktestJob).filter(models.BacktestJob.id == job_id).first()
+        if job is None:
+            return
+        if job.cancel_requested:
+            job.status = "cancelled"
+            status_db.commit()
+            return
+
+        job.status = "running"
+        status_db.commit()
+
+        request = BacktestRequest(
+            machine_id=job.machine_id,
+            start_date=job.start_date,
+            end_date=job.end_date,
+            adjustment_ratio=job.adjustment_ratio,
+            electricity_rate_cad=job.electricity_rate_cad,
+            summary_only=bool(job.summary_only),
+            use_cache=bool(job.use_cache),
+            storage_format=job.storage_format or "rows",
+        )
+
+        try:
+            backtest_result, _, _, _ = execute_backtest(
+                work_db,
+                request,
+                on_progress=_JobProgress(status_db, job),
+                chunk_days=JOB_CHUNK_DAYS,
+            )
+        except BacktestCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.exception("Échec du job de backtest %s", job_id)
+            job.status = "failed"
+            job.error = str(e)[:500]
+        else:
+            job.status = "completed"
+            job.backtest_id = backtest_result.id
+        status_db.commit()
+    finally:
+        work_db.close()
+        status_db.close()
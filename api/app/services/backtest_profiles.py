@@ -0,0 +1,135 @@
+"""
+Profils d'exploitation pour les backtests multi-ratios.
+
+Un profil décrit ce qui est simulé (une machine en N exemplaires à tarif
+fixe, ou un site complet avec ses paliers) et sait produire, pour une liste
+de ratios uniformes, les matrices jours × ratios de revenus et de coûts.
+Les moteurs adaptatifs et Monte Carlo choisissent ensuite un ratio par jour
+dans ces matrices.
+"""
+from datetime import date
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .backtest_engine import MarketSeries, get_efficiency_point, compute_site_daily_metrics
+from .backtest_runner import BacktestDataError
+from .site_backtest import resolve_site_machines
+
+
+def machine_profile(template: models.MachineTemplate, quantity: int, electricity_rate_cad) -> dict:
+    """Profil d'une machine seule, facturée au tarif fixe"""
+    return {
+        "kind": "machine",
+        "id": template.id,
+        "name": template.model,
+        "template": template,
+        "quantity": quantity,
+        "machine_cost_cad": float(template.price_cad) * quantity if template.price_cad is not None else None,
+        "electricity": {"tier1_rate": float(electricity_rate_cad), "tier2_rate": None, "tier1_limit": None},
+    }
+
+
+def site_profile(db: Session, site: models.MiningSite, electricity: dict) -> dict:
+    """Profil d'un site (instances actives), facturé avec ses paliers"""
+    if electricity.get("tier1_rate") is None:
+        raise BacktestDataError("Tarif d'électricité (palier 1) non configuré pour ce site")
+
+    machines, _, _ = resolve_site_machines(db, site)
+    if not machines:
+        raise BacktestDataError("Aucune machine active sur ce site")
+
+    machine_cost_cad = 0.0
+    for machine in machines:
+        template = db.get(models.MachineTemplate, machine["template_id"])
+        if template.price_cad is None:
+            machine_cost_cad = None
+            break
+        machine_cost_cad += float(template.price_cad) * machine["quantity"]
+
+    return {
+        "kind": "site",
+        "id": site.id,
+        "name": site.name,
+        "site": site,
+        "machine_cost_cad": machine_cost_cad,
+        "electricity": electricity,
+    }
+
+
+def profile_ratio_metrics(
+    db: Session,
+    profile: dict,
+    market: MarketSeries,
+    ratios: List[float],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Calcule revenus et coûts quotidiens du profil pour chaque ratio.
+
+    Returns:
+        tuple: (mask des jours valides, revenus USD jours × ratios,
+        coûts USD jours × ratios)
+    """
+    electricity = profile["electricity"]
+    revenue_columns = []
+    cost_columns = []
+    mask: Optional[np.ndarray] = None
+
+    for ratio in ratios:
+        if profile["kind"] == "machine":
+            point = get_efficiency_point(db, profile["id"], ratio)
+            if point is None:
+                raise BacktestDataError(f"Aucune donnée d'efficacité trouvée pour le ratio {ratio}")
+            hashrates = np.array([point[0] * profile["quantity"]])
+            powers = np.array([point[1] * profile["quantity"]])
+        else:
+            _, hashrates, powers = resolve_site_machines(db, profile["site"], uniform_ratio=ratio)
+
+        metrics = compute_site_daily_metrics(
+            market,
+            hashrates,
+            powers,
+            electricity["tier1_rate"],
+            electricity.get("tier2_rate"),
+            electricity.get("tier1_limit"),
+        )
+        mask = metrics["mask"]
+        revenue_columns.append(metrics["revenue_usd"].sum(axis=1))
+        cost_columns.append(metrics["cost_usd"].sum(axis=1))
+
+    return mask, np.column_stack(revenue_columns), np.column_stack(cost_columns)
+
+
+def profile_daily_operation(db: Session, profile: dict, ratio: Optional[float]) -> Tuple[float, float]:
+    """
+    Point de fonctionnement quotidien du profil à ratio constant.
+
+    Le calcul passe par un marché unitaire d'un jour (1 BTC/TH, prix et change
+    à 1): le revenu obtenu est alors le hashrate total et le coût, le coût
+    d'électricité en CAD, paliers compris.
+
+    Returns:
+        tuple: (hashrate total TH/s, coût d'électricité quotidien en CAD)
+    """
+    unit = np.ones(1, dtype=np.float64)
+    unit_market = MarketSeries(date.today(), unit, unit, unit, unit * 24)
+    if ratio is None and profile["kind"] == "machine":
+        ratio = 1.0
+
+    if ratio is None:
+        _, hashrates, powers = resolve_site_machines(db, profile["site"])
+        electricity = profile["electricity"]
+        metrics = compute_site_daily_metrics(
+            unit_market,
+            hashrates,
+            powers,
+            electricity["tier1_rate"],
+            electricity.get("tier2_rate"),
+            electricity.get("tier1_limit"),
+        )
+        return float(metrics["revenue_usd"].sum()), float(metrics["cost_usd"].sum())
+
+    _, revenue, cost = profile_ratio_metrics(db, profile, unit_market, [ratio])
+    return float(revenue[0, 0]), float(cost[0, 0])
@@ -0,0 +1,316 @@
+"""
+Exécution d'un backtest machine de bout en bout (calcul + persistance).
+
+Utilisé à la fois par la route synchrone `/backtest/run` et par les jobs en
+arrière-plan, qui suivent la progression via `on_progress`.
+"""
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from ..models.schemas import BacktestRequest
+from .backtest_engine import MarketSeries, load_market_series, get_efficiency_point, compute_daily_metrics
+from .backtest_store import bulk_insert_daily_simulations
+from .backtest_cache import backtest_request_hash, backtest_data_version, find_cached_backtest
+from .backtest_stats import RunningSummary
+from .backtest_series import (
+    STORAGE_PACKED,
+    is_packed,
+    save_backtest_series,
+    load_series_columns,
+    load_packed_columns,
+    load_daily_rows,
+    has_daily_series,
+    packed_daily_rows,
+)
+
+
+class BacktestDataError(ValueError):
+    """Données insuffisantes pour exécuter le backtest demandé"""
+
+
+class BacktestCancelled(Exception):
+    """Levée par un callback de progression pour interrompre le backtest"""
+
+
+def load_backtest_market(db: Session, start_date: date, end_date: date) -> MarketSeries:
+    """Charge l'historique de la période et vérifie qu'il est exploitable"""
+    if end_date < start_date:
+        raise BacktestDataError("La date de fin doit être postérieure à la date de début")
+
+    market = load_market_series(db, start_date, end_date)
+
+    if np.isnan(market.price_usd).all():
+        raise BacktestDataError("Aucun prix Bitcoin trouvé pour cette période")
+
+    if np.isnan(market.fpps_rate).all():
+        raise BacktestDataError("Aucune donnée FPPS trouvée pour cette période")
+
+    return market
+
+
+def _slice_metrics(metrics: Dict[str, np.ndarray], start: int, end: int) -> Dict[str, np.ndarray]:
+    return {name: values[start:end] for name, values in metrics.items() if name != "mask"}
+
+
+def _with_ordinals(metrics: Dict[str, np.ndarray], dates: List[date]) -> Dict[str, np.ndarray]:
+    return dict(metrics, ordinals=np.array([day.toordinal() for day in dates], dtype=np.int64))
+
+
+def _compute_backtest_metrics(db: Session, request, market: MarketSeries) -> Dict[str, np.ndarray]:
+    # Le ratio est constant sur tout le backtest: une seule interpolation
+    efficiency_point = get_efficiency_point(db, request.machine_id, request.adjustment_ratio)
+    if efficiency_point is None:
+        raise BacktestDataError("Aucune donnée d'efficacité trouvée pour ce ratio")
+    effective_hashrate, power_consumption = efficiency_point
+
+    # Calculer tous les jours en opérations vectorisées
+    return compute_daily_metrics(market, effective_hashrate, power_consumption, request.electricity_rate_cad)
+
+
+def stored_backtest_summary(db: Session, backtest_result: models.BacktestResult) -> dict:
+    """
+    Résumé stocké d'un backtest.
+
+    Un résultat sans accumulateur à jour (antérieur à son introduction) est
+    résumé une fois, depuis ses lignes quotidiennes ou par recalcul en
+    mémoire, puis l'accumulateur est enregistré.
+    """
+    state = RunningSummary.from_dict(backtest_result.summary_state)
+    if state is not None:
+        return state.summary()
+
+    state = _rebuild_summary_state(db, backtest_result)
+    backtest_result.summary_state = state.to_dict()
+    db.commit()
+    return state.summary()
+
+
+def _rebuild_summary_state(db: Session, backtest_result: models.BacktestResult) -> RunningSummary:
+    series = load_series_columns(db, [backtest_result]).get(backtest_result.id)
+    profits = series["profit_usd"] if series is not None else []
+    if not len(profits) and backtest_result.electricity_rate_cad is not None:
+        # Résultat sans lignes quotidiennes: recalcul en mémoire
+        request = BacktestRequest(
+            machine_id=backtest_result.machine_id,
+            start_date=backtest_result.start_date,
+            end_date=backtest_result.end_date,
+            adjustment_ratio=backtest_result.adjustment_ratio,
+            electricity_rate_cad=backtest_result.electricity_rate_cad,
+        )
+        market = load_backtest_market(db, request.start_date, request.end_date)
+        profits = _compute_backtest_metrics(db, request, market)["profit_usd"]
+
+    state = RunningSummary()
+    state.update(np.asarray(profits, dtype=np.float64), float(backtest_result.total_revenue_usd), float(backtest_result.total_cost_usd))
+    return state
+
+
+def load_cached_backtest(db: Session, request_hash: str, data_version: str):
+    """
+    Résultat déjà calculé pour la même requête sur les mêmes données.
+
+    Returns:
+        tuple (BacktestResult, simulations quotidiennes, résumé) ou None
+    """
+    backtest_result = find_cached_backtest(db, request_hash, data_version)
+    if backtest_result is None:
+        return None
+
+    return backtest_result, load_daily_rows(db, backtest_result), stored_backtest_summary(db, backtest_result)
+
+
+def execute_backtest(
+    db: Session,
+    request,
+    on_progress: Optional[Callable[[int, int], None]] = None,
+    chunk_days: Optional[int] = None,
+) -> Tuple[models.BacktestResult, List, dict, bool]:
+    """
+    Calcule et persiste un backtest machine (BacktestRequest).
+
+    Si `request.use_cache` est vrai et qu'un résultat existe pour la même
+    requête sur les mêmes données, il est retourné tel quel. Sinon, les
+    simulations quotidiennes sont écrites par blocs de `chunk_days` jours
+    (un seul bloc par défaut); `on_progress(jours_traités, jours_totaux)` est
+    appelé après chaque bloc et peut lever BacktestCancelled. Rien n'est
+    commité si le backtest est interrompu.
+
+    Returns:
+        tuple: (BacktestResult, lignes quotidiennes, résumé, résultat issu du cache)
+    """
+    market = load_backtest_market(db, request.start_date, request.end_date)
+
+    request_hash = backtest_request_hash(request)
+    data_version = backtest_data_version(db, request.machine_id, request.start_date, request.end_date)
+    if request.use_cache:
+        cached = load_cached_backtest(db, request_hash, data_version)
+        if cached is not None:
+            if on_progress:
+                on_progress(cached[2]["total_days"], cached[2]["total_days"])
+            return (*cached, True)
+
+    metrics = _compute_backtest_metrics(db, request, market)
+    total_revenue = float(metrics["revenue_usd"].sum())
+    total_cost = float(metrics["cost_usd"].sum())
+    total_profit = float(metrics["profit_usd"].sum())
+
+    state = RunningSummary()
+    state.update(metrics["profit_usd"], total_revenue, total_cost)
+
+    backtest_result = models.BacktestResult(
+        machine_id=request.machine_id,
+        start_date=request.start_date,
+        end_date=request.end_date,
+        adjustment_ratio=request.adjustment_ratio,
+        total_profit_usd=total_profit,
+        total_cost_usd=total_cost,
+        total_revenue_usd=total_revenue,
+        roi_percentage=(total_profit / total_cost * 100) if total_cost > 0 else 0,
+        request_hash=request_hash,
+        data_version=data_version,
+        electricity_rate_cad=request.electricity_rate_cad,
+        summary_state=state.to_dict(),
+        storage_format=request.storage_format
+    )
+
+    try:
+        db.add(backtest_result)
+        db.flush()
+
+        # Écrire les simulations quotidiennes: une série compacte, ou des lignes par INSERT
+        # multi-lignes (mode "summary_only": seuls les totaux sont conservés)
+        dates = market.dates(metrics["mask"])
+        total_days = len(dates)
+        daily_simulations = []
+        if request.summary_only:
+            if on_progress:
+                on_progress(total_days, total_days)
+        elif request.storage_format == STORAGE_PACKED:
+            save_backtest_series(db, backtest_result, dates, metrics)
+            db.refresh(backtest_result)
+            daily_simulations = packed_daily_rows(backtest_result, _with_ordinals(metrics, dates))
+            if on_progress:
+                on_progress(total_days, total_days)
+        else:
+            step = chunk_days or max(total_days, 1)
+            for start in range(0, total_days, step):
+                end = min(start + step, total_days)
+                daily_simulations.extend(bulk_insert_daily_simulations(
+                    db,
+                    backtest_result.id,
+                    request.machine_id,
+                    request.adjustment_ratio,
+                    dates[start:end],
+                    _slice_metrics(metrics, start, end),
+                ))
+                if on_progress:
+                    on_progress(end, total_days)
+
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    db.refresh(backtest_result)
+
+    return backtest_result, daily_simulations, state.summary(), False
+
+
+def extend_backtest(
+    db: Session,
+    backtest_result: models.BacktestResult,
+    end_date: date,
+) -> Tuple[List[dict], dict, int]:
+    """
+    Prolonge un backtest existant jusqu'à `end_date` sans recalculer l'existant.
+
+    Seuls les jours postérieurs à `backtest_result.end_date` sont simulés;
+    leurs lignes quotidiennes sont ajoutées (sauf pour un résultat sans
+    simulations quotidiennes), les totaux et l'accumulateur de statistiques
+    sont fusionnés, puis la fin du backtest avance jusqu'au dernier jour
+    exploitable.
+
+    Returns:
+        tuple: (nouvelles lignes quotidiennes, résumé sur toute la période,
+        nombre de jours ajoutés)
+    """
+    if backtest_result.electricity_rate_cad is None:
+        raise BacktestDataError("Tarif d'électricité inconnu pour ce résultat: relancer le backtest complet")
+
+    # Les jours déjà calculés ne sont pas refaits: ils doivent l'avoir été sur les données et formules actuelles
+    if backtest_result.data_version is not None and backtest_result.data_version != backtest_data_version(
+        db, backtest_result.machine_id, backtest_result.start_date, backtest_result.end_date
+    ):
+        raise BacktestDataError(
+            "Les données de marché, la courbe d'efficacité ou les formules du backtest ont changé depuis le calcul: "
+            "relancer le backtest complet"
+        )
+
+    request = BacktestRequest(
+        machine_id=backtest_result.machine_id,
+        start_date=backtest_result.start_date,
+        end_date=backtest_result.end_date,
+        adjustment_ratio=backtest_result.adjustment_ratio,
+        electricity_rate_cad=backtest_result.electricity_rate_cad,
+    )
+    has_daily_rows = has_daily_series(db, backtest_result)
+    request.summary_only = not has_daily_rows
+
+    state = RunningSummary.from_dict(backtest_result.summary_state)
+    if state is None:
+        # Résultat antérieur à l'accumulateur: le reconstruire une fois sur la période existante
+        state = _rebuild_summary_state(db, backtest_result)
+
+    new_start = backtest_result.end_date + timedelta(days=1)
+    if end_date < new_start:
+        return [], state.summary(), 0
+
+    market = load_market_series(db, new_start, end_date)
+    if not market.valid.any():
+        return [], state.summary(), 0
+
+    metrics = _compute_backtest_metrics(db, request, market)
+    dates = market.dates(metrics["mask"])
+    state.update(metrics["profit_usd"], float(metrics["revenue_usd"].sum()), float(metrics["cost_usd"].sum()))
+
+    try:
+        new_rows = []
+        if has_daily_rows and is_packed(backtest_result):
+            # Série compacte: les nouveaux jours sont ajoutés aux tableaux existants
+            save_backtest_series(db, backtest_result, dates, metrics, previous=load_packed_columns(db, backtest_result))
+            new_rows = packed_daily_rows(backtest_result, _with_ordinals(metrics, dates))
+        elif has_daily_rows:
+            new_rows = bulk_insert_daily_simulations(
+                db,
+                backtest_result.id,
+                backtest_result.machine_id,
+                backtest_result.adjustment_ratio,
+                dates,
+                _slice_metrics(metrics, 0, len(dates)),
+            )
+
+        summary = state.summary()
+        request.end_date = dates[-1]
+        backtest_result.end_date = dates[-1]
+        backtest_result.total_revenue_usd = summary["total_revenue_usd"]
+        backtest_result.total_cost_usd = summary["total_cost_usd"]
+        backtest_result.total_profit_usd = summary["total_profit_usd"]
+        backtest_result.roi_percentage = summary["roi_percentage"]
+        backtest_result.summary_state = state.to_dict()
+        # Le résultat correspond désormais à la requête sur la période prolongée. Un
+        # résultat sans empreinte (antérieur au cache) n'a pas pu être vérifié: il
+        # reste hors du cache.
+        if backtest_result.data_version is not None:
+            backtest_result.request_hash = backtest_request_hash(request)
+            backtest_result.data_version = backtest_data_version(db, request.machine_id, request.start_date, request.end_date)
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+    db.refresh(backtest_result)
+    return new_rows, summary, len(dates)
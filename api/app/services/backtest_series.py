@@ -0,0 +1,220 @@
+"""
+Stockage compact des simulations quotidiennes (table backtest_series).
+
+Au lieu d'une ligne `daily_simulation` par jour, un backtest au format
+"packed" conserve une seule ligne contenant ses séries en tableaux binaires
+little-endian: les écarts entre jours (int32), la consommation, le revenu et
+le coût (float64, sans perte de précision). Le profit et le ROI quotidiens
+sont dérivés à la lecture avec les mêmes formules que le moteur.
+
+Chaque tableau est stocké octets regroupés par rang (tous les octets de poids
+fort, puis les suivants...) puis compressé avec zlib: les octets d'exposant,
+presque constants d'un jour à l'autre, se compressent presque entièrement.
+La série entière se lit en un aller-retour et se décode avec
+`np.frombuffer`, sans construire d'objet par jour.
+
+Le format par défaut reste "rows"; "packed" est choisi explicitement par la
+requête (`storage_format`). Les fonctions de lecture acceptent indifféremment
+les deux formats, de sorte que l'API par lignes (résultats, flux,
+comparaison, extension) reste inchangée.
+"""
+import zlib
+from datetime import date
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .backtest_store import DAILY_METRIC_COLUMNS
+
+STORAGE_ROWS = "rows"
+STORAGE_PACKED = "packed"
+STORAGE_FORMATS = (STORAGE_ROWS, STORAGE_PACKED)
+
+PACKED_COLUMNS = ("power_consumed_kwh", "revenue_usd", "cost_usd")
+
+_GAP_DTYPE = np.dtype("<i4")
+_VALUE_DTYPE = np.dtype("<f8")
+
+
+def pack_array(values: np.ndarray, dtype: np.dtype) -> bytes:
+    """Tableau -> octets regroupés par rang (poids fort en premier), compressés"""
+    planes = np.ascontiguousarray(values, dtype=dtype).view(np.uint8).reshape(-1, dtype.itemsize)
+    return zlib.compress(planes[:, ::-1].T.tobytes())
+
+
+def unpack_array(data: bytes, dtype: np.dtype) -> np.ndarray:
+    """Inverse de `pack_array`"""
+    planes = np.frombuffer(zlib.decompress(data), dtype=np.uint8).reshape(dtype.itemsize, -1)
+    return np.ascontiguousarray(planes.T[:, ::-1]).view(dtype).ravel()
+
+
+def is_packed(backtest_result: models.BacktestResult) -> bool:
+    return backtest_result.storage_format == STORAGE_PACKED
+
+
+def _derive_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Ajoute profit et ROI quotidiens (mêmes formules que `compute_daily_metrics`)"""
+    profit_usd = columns["revenue_usd"] - columns["cost_usd"]
+    roi_daily = np.zeros_like(profit_usd)
+    np.divide(profit_usd * 100, columns["cost_usd"], out=roi_daily, where=columns["cost_usd"] > 0)
+    columns["profit_usd"] = profit_usd
+    columns["roi_daily"] = roi_daily
+    return columns
+
+
+def _decode(series: models.BacktestSeries, start_date: date) -> Dict[str, np.ndarray]:
+    gaps = unpack_array(series.day_gaps, _GAP_DTYPE).astype(np.int64)
+    columns = {"ordinals": start_date.toordinal() + np.cumsum(gaps)}
+    for column in PACKED_COLUMNS:
+        columns[column] = unpack_array(getattr(series, column), _VALUE_DTYPE)
+    return _derive_columns(columns)
+
+
+def save_backtest_series(
+    db: Session,
+    backtest_result: models.BacktestResult,
+    dates: List[date],
+    metrics: Dict[str, np.ndarray],
+    previous: Optional[Dict[str, np.ndarray]] = None,
+) -> None:
+    """
+    Écrit (ou réécrit) la série compacte d'un backtest.
+
+    `previous` contient les colonnes déjà stockées (extension): les nouveaux
+    jours leur sont ajoutés et la ligne est réécrite en une fois.
+    """
+    ordinals = np.fromiter((day.toordinal() for day in dates), dtype=np.int64, count=len(dates))
+    columns = {column: np.asarray(metrics[column], dtype=np.float64) for column in PACKED_COLUMNS}
+    if previous is not None:
+        ordinals = np.concatenate((previous["ordinals"], ordinals))
+        columns = {column: np.concatenate((previous[column], values)) for column, values in columns.items()}
+
+    gaps = np.diff(ordinals, prepend=backtest_result.start_date.toordinal())
+    values = {
+        "days": len(ordinals),
+        "day_gaps": pack_array(gaps, _GAP_DTYPE),
+        **{column: pack_array(columns[column], _VALUE_DTYPE) for column in PACKED_COLUMNS},
+    }
+
+    series = db.get(models.BacktestSeries, backtest_result.id)
+    if series is None:
+        db.add(models.BacktestSeries(backtest_id=backtest_result.id, **values))
+    else:
+        for name, value in values.items():
+            setattr(series, name, value)
+    db.flush()
+
+
+def load_series_columns(db: Session, backtest_results: List[models.BacktestResult]) -> Dict[int, Dict[str, np.ndarray]]:
+    """
+    Séries quotidiennes de plusieurs backtests, quel que soit leur format.
+
+    Une requête pour les backtests compacts et une pour ceux stockés en
+    lignes. Les backtests sans simulations quotidiennes sont absents du
+    résultat.
+
+    Returns:
+        {backtest_id: {"ordinals": jours (ordinaux), colonnes de DAILY_METRIC_COLUMNS}}
+    """
+    packed = {result.id: result for result in backtest_results if is_packed(result)}
+    row_ids = [result.id for result in backtest_results if not is_packed(result)]
+    columns = {}
+
+    if packed:
+        for series in db.query(models.BacktestSeries).filter(models.BacktestSeries.backtest_id.in_(list(packed))):
+            columns[series.backtest_id] = _decode(series, packed[series.backtest_id].start_date)
+
+    if row_ids:
+        columns.update(_load_row_columns(db, row_ids))
+
+    return columns
+
+
+def _load_row_columns(db: Session, backtest_ids: List[int]) -> Dict[int, Dict[str, np.ndarray]]:
+    stmt = select(
+        models.DailySimulation.backtest_id,
+        models.DailySimulation.date,
+        *(getattr(models.DailySimulation, column) for column in DAILY_METRIC_COLUMNS)
+    ).where(
+        models.DailySimulation.backtest_id.in_(backtest_ids)
+    ).order_by(
+        models.DailySimulation.backtest_id, models.DailySimulation.date
+    )
+    rows = db.execute(stmt).all()
+
+    columns = {}
+    if not rows:
+        return columns
+
+    owners = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    ordinals = np.fromiter((row[1].toordinal() for row in rows), dtype=np.int64, count=len(rows))
+    values = np.array([row[2:] for row in rows], dtype=np.float64)
+
+    # Les lignes sont triées par backtest: une tranche contiguë par identifiant
+    boundaries = np.flatnonzero(np.diff(owners)) + 1
+    starts = np.concatenate(([0], boundaries))
+    ends = np.concatenate((boundaries, [len(rows)]))
+    for start, end in zip(starts, ends):
+        entry = {"ordinals": ordinals[start:end]}
+        for index, column in enumerate(DAILY_METRIC_COLUMNS):
+            entry[column] = values[start:end, index]
+        columns[int(owners[start])] = entry
+    return columns
+
+
+def load_packed_columns(db: Session, backtest_result: models.BacktestResult) -> Optional[Dict[str, np.ndarray]]:
+    """Colonnes d'un backtest compact (None s'il n'a pas de série stockée)"""
+    series = db.get(models.BacktestSeries, backtest_result.id)
+    return _decode(series, backtest_result.start_date) if series is not None else None
+
+
+def has_daily_series(db: Session, backtest_result: models.BacktestResult) -> bool:
+    """Le backtest a-t-il des simulations quotidiennes stockées (dans l'un ou l'autre format)"""
+    if is_packed(backtest_result):
+        return db.query(
+            db.query(models.BacktestSeries).filter(models.BacktestSeries.backtest_id == backtest_result.id).exists()
+        ).scalar()
+    return db.query(
+        db.query(models.DailySimulation).filter(models.DailySimulation.backtest_id == backtest_result.id).exists()
+    ).scalar()
+
+
+def iter_packed_rows(backtest_result: models.BacktestResult, columns: Dict[str, np.ndarray]) -> Iterator[Tuple]:
+    """
+    Lignes équivalentes à `daily_simulation` pour une série compacte.
+
+    Tuples (id, backtest_id, date, machine_id, adjustment_ratio, colonnes
+    quotidiennes arrondies à 4 décimales comme en base, created_at); l'id est
+    None, il n'existe pas de ligne individuelle.
+    """
+    rounded = [np.round(columns[column], 4).tolist() for column in DAILY_METRIC_COLUMNS]
+    for ordinal, *values in zip(columns["ordinals"].tolist(), *rounded):
+        yield (
+            None,
+            backtest_result.id,
+            date.fromordinal(ordinal),
+            backtest_result.machine_id,
+            backtest_result.adjustment_ratio,
+            *values,
+            backtest_result.created_at,
+        )
+
+
+def packed_daily_rows(backtest_result: models.BacktestResult, columns: Optional[Dict[str, np.ndarray]]) -> List[dict]:
+    """Simulations quotidiennes d'une série compacte, au format des lignes `daily_simulation`"""
+    if columns is None:
+        return []
+    keys = ("id", "backtest_id", "date", "machine_id", "adjustment_ratio", *DAILY_METRIC_COLUMNS, "created_at")
+    return [dict(zip(keys, row)) for row in iter_packed_rows(backtest_result, columns)]
+
+
+def load_daily_rows(db: Session, backtest_result: models.BacktestResult) -> List:
+    """Simulations quotidiennes d'un backtest par ordre de date, quel que soit son format"""
+    if is_packed(backtest_result):
+        return packed_daily_rows(backtest_result, load_packed_columns(db, backtest_result))
+    return db.query(models.DailySimulation).filter(
+        models.DailySimulation.backtest_id == backtest_result.id
+    ).order_by(models.DailySimulation.date).all()
@@ -0,0 +1,134 @@
+"""
+Statistiques de synthèse d'un backtest, calculées en une seule passe.
+
+L'état (nombre de jours, moyenne et M2 de Welford, extrêmes, totaux, profit
+cumulé et son sommet, séries perdantes) est conservé avec le BacktestResult.
+Chaque bloc de jours est fusionné avec l'état existant (forme par blocs de
+Welford, Chan et al.): le résumé est calculé une fois à l'écriture, prolongé
+sans relire les jours déjà simulés, et sa lecture ne coûte plus rien.
+"""
+import math
+from typing import Optional
+
+import numpy as np
+
+# Version de la structure de l'état: un état plus ancien est reconstruit
+STATE_VERSION = 2
+
+# Le minage tourne tous les jours: annualisation du ratio de Sharpe sur 365 jours
+TRADING_DAYS_PER_YEAR = 365
+
+
+class RunningSummary:
+    """Accumulateur des profits quotidiens, mis à jour bloc par bloc dans l'ordre des dates"""
+
+    def __init__(self):
+        self.count = 0
+        self.profitable_days = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.max = None
+        self.min = None
+        self.total_revenue = 0.0
+        self.total_cost = 0.0
+        self.cumulative = 0.0
+        self.peak = 0.0
+        self.max_drawdown = 0.0
+        self.losing_streak = 0
+        self.longest_losing_streak = 0
+
+    def update(self, profits: np.ndarray, revenue: float, cost: float) -> None:
+        """Ajoute un bloc de profits quotidiens consécutifs (et ses totaux revenus/coûts)"""
+        profits = np.asarray(profits, dtype=np.float64)
+        n = len(profits)
+        self.total_revenue += float(revenue)
+        self.total_cost += float(cost)
+        if n == 0:
+            return
+
+        # Moyenne et M2 du bloc, fusionnées avec l'état (Welford par blocs)
+        batch_mean = float(profits.mean())
+        batch_m2 = float(((profits - batch_mean) ** 2).sum())
+        total = self.count + n
+        delta = batch_mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += batch_m2 + delta * delta * self.count * n / total
+        self.count = total
+
+        self.profitable_days += int((profits > 0).sum())
+        batch_max = float(profits.max())
+        batch_min = float(profits.min())
+        self.max = batch_max if self.max is None else max(self.max, batch_max)
+        self.min = batch_min if self.min is None else min(self.min, batch_min)
+
+        # Baisse maximale du profit cumulé depuis son plus haut
+        cumulative = self.cumulative + np.cumsum(profits)
+        peaks = np.maximum.accumulate(np.maximum(cumulative, self.peak))
+        self.max_drawdown = max(self.max_drawdown, float((peaks - cumulative).max()))
+        self.cumulative = float(cumulative[-1])
+        self.peak = float(peaks[-1])
+
+        # Plus longue série de jours perdants (la série en cours continue d'un bloc à l'autre)
+        winning = np.flatnonzero(profits >= 0)
+        if not len(winning):
+            self.losing_streak += n
+        else:
+            longest = self.losing_streak + int(winning[0])
+            if len(winning) > 1:
+                longest = max(longest, int((np.diff(winning) - 1).max()))
+            self.longest_losing_streak = max(self.longest_losing_streak, longest)
+            self.losing_streak = n - 1 - int(winning[-1])
+        self.longest_losing_streak = max(self.longest_losing_streak, self.losing_streak)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def summary(self) -> dict:
+        """Statistiques de synthèse (mêmes clés que `summarize_profits`)"""
+        total_profit = self.total_revenue - self.total_cost
+        std = self.std
+        return {
+            "total_days": self.count,
+            "profitable_days": self.profitable_days,
+            "total_profit_usd": total_profit,
+            "total_cost_usd": self.total_cost,
+            "total_revenue_usd": self.total_revenue,
+            "roi_percentage": (total_profit / self.total_cost * 100) if self.total_cost > 0 else 0,
+            "avg_daily_profit": self.mean if self.count else 0,
+            "max_daily_profit": self.max if self.count else 0,
+            "min_daily_profit": self.min if self.count else 0,
+            "profit_volatility": std,
+            "max_drawdown_usd": self.max_drawdown,
+            "sharpe_ratio": self.mean / std * math.sqrt(TRADING_DAYS_PER_YEAR) if std > 0 else 0,
+            "longest_losing_streak": self.longest_losing_streak
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "version": STATE_VERSION,
+            "count": self.count,
+            "profitable_days": self.profitable_days,
+            "mean": self.mean,
+            "m2": self.m2,
+            "max": self.max,
+            "min": self.min,
+            "total_revenue": self.total_revenue,
+            "total_cost": self.total_cost,
+            "cumulative": self.cumulative,
+            "peak": self.peak,
+            "max_drawdown": self.max_drawdown,
+            "losing_streak": self.losing_streak,
+            "longest_losing_streak": self.longest_losing_streak,
+        }
+
+    @classmethod
+    def from_dict(cls, state: Optional[dict]) -> Optional["RunningSummary"]:
+        """Restaure un état stocké (None si absent ou d'une version antérieure)"""
+        if not state or state.get("version") != STATE_VERSION:
+            return None
+        summary = cls()
+        for key, value in state.items():
+            if key != "version" and hasattr(summary, key):
+                setattr(summary, key, value)
+        return summary
@@ -0,0 +1,65 @@
+"""
+Persistance des résultats de backtest.
+
+Les lignes `daily_simulation` sont écrites en une seule instruction INSERT
+multi-lignes (RETURNING id, created_at) plutôt qu'un `db.add` par jour.
+"""
+from datetime import date
+from typing import Dict, List
+
+import numpy as np
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..models import models
+
+# Colonnes numériques de daily_simulation (toutes à 4 décimales)
+DAILY_METRIC_COLUMNS = ("power_consumed_kwh", "revenue_usd", "cost_usd", "profit_usd", "roi_daily")
+
+
+def bulk_insert_daily_simulations(
+    db: Session,
+    backtest_id: int,
+    machine_id: int,
+    adjustment_ratio,
+    dates: List[date],
+    metrics: Dict[str, np.ndarray],
+) -> List[dict]:
+    """
+    Insère toutes les simulations quotidiennes d'un backtest en un aller-retour.
+
+    Returns:
+        list: les lignes insérées (avec id et created_at) dans l'ordre des dates
+    """
+    if not dates:
+        return []
+
+    rows = [
+        {
+            "backtest_id": backtest_id,
+            "date": day,
+            "machine_id": machine_id,
+            "adjustment_ratio": adjustment_ratio,
+            "power_consumed_kwh": power_kwh,
+            "revenue_usd": revenue,
+            "cost_usd": cost,
+            "profit_usd": profit,
+            "roi_daily": roi,
+        }
+        for day, power_kwh, revenue, cost, profit, roi in zip(
+            dates,
+            *(np.round(metrics[column], 4).tolist() for column in DAILY_METRIC_COLUMNS)
+        )
+    ]
+
+    stmt = insert(models.DailySimulation).returning(
+        models.DailySimulation.id,
+        models.DailySimulation.created_at,
+        sort_by_parameter_order=True,
+    )
+    inserted = db.execute(stmt, rows).all()
+
+    for row, (row_id, created_at) in zip(rows, inserted):
+        row["id"] = row_id
+        row["created_at"] = created_at
+    return rows
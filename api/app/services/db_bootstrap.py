@@ -2,6 +2,10 @@ from sqlalchemy import text
 from sqlalchemy.engine import Engine
 import logging
 
+from .efficiency_batch import install_efficiency_batch_function
+from .efficiency_lookup import install_efficiency_lookup
+from .hashprice import install_hashprice_sync
+
 
 logger = logging.getLogger(__name__)
 
@@ -10,8 +14,59 @@ def run_startup_migrations(engine: Engine) -> None:
     """
     Execute minimal, idempotent startup migrations until full Alembic is wired.
     - Ensure unique constraint on site_machine_instances (site_id, template_id)
+    - Ensure backtest cache key columns on backtest_results (migration 20)
+    - Ensure backtest extension columns on backtest_results (migration 21)
+    - Ensure packed daily series storage (migration 22)
+    - Ensure keyset pagination indexes on backtest_results (migration 23)
+    - Ensure hashprice_daily maintenance triggers (migration 24)
+    - Ensure batched efficiency interpolation function (migration 25)
+    - Backfill machine_efficiency_lookup for templates without points (migration 26)
+
+    Only PostgreSQL is migrated; other dialects (SQLite stand-in used by the
+    benchmarks) rely on `create_all` alone.
     """
+    if engine.dialect.name != "postgresql":
+        logger.info("Migrations de démarrage ignorées pour le dialecte %s", engine.dialect.name)
+        return
+
     with engine.begin() as conn:
+        conn.execute(
+            text(
+                """
+                ALTER TABLE IF EXISTS backtest_results
+                ADD COLUMN IF NOT EXISTS request_hash VARCHAR(64),
+                ADD COLUMN IF NOT EXISTS data_version VARCHAR(64),
+                ADD COLUMN IF NOT EXISTS electricity_rate_cad DECIMAL(10,5),
+                ADD COLUMN IF NOT EXISTS summary_state JSON,
+                ADD COLUMN IF NOT EXISTS storage_format VARCHAR(10) DEFAULT 'rows';
+                CREATE INDEX IF NOT EXISTS idx_backtest_results_cache_key
+                ON backtest_results(request_hash, data_version);
+                CREATE INDEX IF NOT EXISTS idx_backtest_results_created
+                ON backtest_results(created_at DESC, id DESC);
+                CREATE INDEX IF NOT EXISTS idx_backtest_results_machine_created
+                ON backtest_results(machine_id, created_at DESC, id DESC);
+                CREATE INDEX IF NOT EXISTS idx_backtest_results_machine_ratio_created
+                ON backtest_results(machine_id, adjustment_ratio, created_at DESC, id DESC);
+                CREATE INDEX IF NOT EXISTS idx_backtest_results_ratio_created
+                ON backtest_results(adjustment_ratio, created_at DESC, id DESC);
+                ALTER TABLE IF EXISTS backtest_jobs
+                ADD COLUMN IF NOT EXISTS use_cache BOOLEAN DEFAULT TRUE,
+                ADD COLUMN IF NOT EXISTS storage_format VARCHAR(10) DEFAULT 'rows';
+                ALTER TABLE IF EXISTS backtest_jobs
+                ALTER COLUMN storage_format SET DEFAULT 'rows';
+                """
+            )
+        )
+
+        # Série hashprice_daily maintenue par triggers (table créée par create_all)
+        install_hashprice_sync(conn)
+
+        # Interpolation d'efficacité en lot (une requête pour N paires machine/ratio)
+        install_efficiency_batch_function(conn)
+
+        # Points d'efficacité précalculés des templates qui n'en ont pas (table créée par create_all)
+        install_efficiency_lookup(conn)
+
         # Vérifier s'il existe des doublons qui empêcheraient la contrainte UNIQUE
         duplicates = conn.execute(
             text(
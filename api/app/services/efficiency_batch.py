@@ -0,0 +1,123 @@
+"""
+Interpolation d'efficacité en lot, côté SQL.
+
+`get_machine_efficiency_interpolated` n'accepte qu'une paire (machine, ratio)
+par appel: un balayage de 21 ratios coûte 21 allers-retours. La fonction
+`get_machine_efficiency_interpolated_batch` reçoit deux tableaux alignés
+(identifiants de machines, ratios) et retourne tous les points en une seule
+requête: les paires sont dépliées avec `unnest ... WITH ORDINALITY`, puis une
+unique jointure LATERAL sur `machine_efficiency_curves` trouve les points bas
+et haut de chaque paire. Les arrondis sont ceux de la fonction scalaire
+(puissance cible `::INTEGER`, facteur `DECIMAL(5,3)`), si bien que les deux
+fonctions retournent exactement les mêmes valeurs.
+"""
+from decimal import Decimal
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from .efficiency_interpolation import interpolate_sorted, load_efficiency_inputs, sort_curve
+
+# Fonction ensembliste (identique à la migration 25)
+EFFICIENCY_BATCH_SQL = """
+CREATE OR REPLACE FUNCTION get_machine_efficiency_interpolated_batch(
+    p_machine_ids INTEGER[],
+    p_adjustment_ratios NUMERIC[]
+)
+RETURNS TABLE(
+    pair_index INTEGER,
+    machine_id INTEGER,
+    adjustment_ratio NUMERIC,
+    effective_hashrate NUMERIC,
+    power_consumption INTEGER
+) AS $$
+    SELECT
+        p.pair_index::INTEGER,
+        p.machine_id,
+        p.adjustment_ratio,
+        CASE
+            WHEN b.lower_power IS NULL OR b.upper_power IS NULL THEN NULL
+            WHEN b.lower_power = b.upper_power THEN b.lower_hashrate
+            ELSE b.lower_hashrate + (b.upper_hashrate - b.lower_hashrate)
+                * ((p.target_power - b.lower_power)::DECIMAL / (b.upper_power - b.lower_power)::DECIMAL)::DECIMAL(5,3)
+        END,
+        CASE
+            WHEN b.lower_power IS NULL OR b.upper_power IS NULL THEN NULL
+            WHEN b.lower_power = b.upper_power THEN b.lower_power
+            ELSE p.target_power
+        END
+    FROM (
+        SELECT
+            pairs.pair_index,
+            pairs.machine_id,
+            pairs.adjustment_ratio,
+            (pairs.adjustment_ratio * mt.power_nominal)::INTEGER AS target_power
+        FROM unnest(p_machine_ids, p_adjustment_ratios) WITH ORDINALITY
+            AS pairs(machine_id, adjustment_ratio, pair_index)
+        LEFT JOIN machine_templates mt ON mt.id = pairs.machine_id AND mt.is_active = true
+    ) p
+    LEFT JOIN LATERAL (
+        SELECT
+            MAX(mec.power_consumption) FILTER (WHERE mec.power_consumption <= p.target_power) AS lower_power,
+            MIN(mec.power_consumption) FILTER (WHERE mec.power_consumption >= p.target_power) AS upper_power,
+            (ARRAY_AGG(mec.effective_hashrate ORDER BY mec.power_consumption DESC)
+                FILTER (WHERE mec.power_consumption <= p.target_power))[1] AS lower_hashrate,
+            (ARRAY_AGG(mec.effective_hashrate ORDER BY mec.power_consumption ASC)
+                FILTER (WHERE mec.power_consumption >= p.target_power))[1] AS upper_hashrate
+        FROM machine_efficiency_curves mec
+        WHERE mec.machine_id = p.machine_id
+    ) b ON true
+    ORDER BY p.pair_index
+$$ LANGUAGE sql STABLE;
+"""
+
+
+def install_efficiency_batch_function(conn: Connection) -> None:
+    """Crée (ou remplace) la fonction d'interpolation en lot"""
+    conn.execute(text(EFFICIENCY_BATCH_SQL))
+
+
+def get_efficiency_points_batch(
+    db: Session,
+    machine_ids: Sequence[int],
+    ratios: Sequence,
+) -> List[Optional[Tuple[Decimal, int]]]:
+    """
+    Points (hashrate TH/s, puissance W) de chaque paire (machine_ids[i], ratios[i]).
+
+    Une seule requête SQL quel que soit le nombre de paires; None pour les
+    paires hors courbe ou dont le template est inactif. Hors PostgreSQL, le
+    même calcul est fait en Python (une lecture de courbe par machine).
+    """
+    if len(machine_ids) != len(ratios):
+        raise ValueError("machine_ids et ratios doivent avoir la même longueur")
+    if not machine_ids:
+        return []
+
+    ratios = [Decimal(str(ratio)) for ratio in ratios]
+
+    if db.get_bind().dialect.name != "postgresql":
+        curves: Dict[int, tuple] = {}
+        points = []
+        for machine_id, ratio in zip(machine_ids, ratios):
+            if machine_id not in curves:
+                power_nominal, curve = load_efficiency_inputs(db, machine_id)
+                curves[machine_id] = (power_nominal, *sort_curve(curve))
+            points.append(interpolate_sorted(*curves[machine_id], ratio))
+        return points
+
+    rows = db.execute(
+        text("""
+            SELECT effective_hashrate, power_consumption
+            FROM get_machine_efficiency_interpolated_batch(
+                CAST(:machine_ids AS INTEGER[]), CAST(:ratios AS NUMERIC[])
+            )
+        """),
+        {"machine_ids": [int(machine_id) for machine_id in machine_ids], "ratios": ratios}
+    ).fetchall()
+    return [
+        (Decimal(str(row[0])), int(row[1])) if row[0] is not None and row[1] is not None else None
+        for row in rows
+    ]
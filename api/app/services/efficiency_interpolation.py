@@ -0,0 +1,217 @@
+"""
+Interpolation de la courbe d'efficacité en Python.
+
+Reproduit exactement la fonction SQL `get_machine_efficiency_interpolated`
+(migration 09), arrondis compris:
+- puissance cible `(ratio × nominale)::INTEGER` (le DECIMAL(5,3) déclaré sur
+  le paramètre n'arrondit pas le ratio: PostgreSQL ignore ce typmod);
+- point bas: plus grande puissance <= cible, point haut: plus petite >= cible;
+- puissances égales: point exact; sinon facteur arrondi en DECIMAL(5,3)
+  (variable plpgsql) et interpolation linéaire du hashrate, non arrondi, la
+  puissance retournée étant la puissance cible;
+- template inactif/absent ou cible hors courbe: aucun point.
+
+`efficiency_interpolator` garde en mémoire, par machine, la puissance
+nominale et la courbe triée par puissance: une fois la courbe chargée, chaque
+ratio se résout par deux recherches dichotomiques, sans requête SQL. Les
+routes qui modifient `machine_efficiency_curves` ou un template (puissance
+nominale, activation) doivent appeler `invalidate_efficiency_curves()` après
+commit. Comme l'historique de marché, ce cache est propre à chaque processus.
+
+`RatioBounds` décrit la plage de ratios couverte par une courbe, déduite de
+ses puissances minimale et maximale et de la puissance nominale: savoir si
+un ratio a un point ne demande alors aucune interpolation ni requête.
+"""
+import threading
+from bisect import bisect_left, bisect_right
+from decimal import Decimal, ROUND_CEILING, ROUND_FLOOR, ROUND_HALF_UP
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .metrics import EFFICIENCY_CACHE_HITS, EFFICIENCY_CACHE_MISSES
+
+_FACTOR_QUANTUM = Decimal("0.001")
+
+
+def target_power_for_ratio(power_nominal: int, adjustment_ratio) -> int:
+    """Puissance cible `(ratio × nominale)::INTEGER` (arrondi au plus proche, demi vers le haut)"""
+    ratio = Decimal(str(adjustment_ratio))
+    return int((ratio * power_nominal).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def sort_curve(curve: Sequence[Tuple[int, Decimal]]) -> Tuple[List[int], List[Decimal]]:
+    """Points (puissance, hashrate) dans un ordre quelconque → (puissances croissantes, hashrates)"""
+    ordered = sorted(curve, key=lambda point: point[0])
+    return [int(power) for power, _ in ordered], [Decimal(str(hashrate)) for _, hashrate in ordered]
+
+
+def interpolate_sorted(
+    power_nominal: Optional[int],
+    powers: List[int],
+    hashrates: List[Decimal],
+    adjustment_ratio,
+) -> Optional[Tuple[Decimal, int]]:
+    """
+    Point (hashrate TH/s, puissance W) pour un ratio, ou None.
+
+    `powers` est trié par ordre croissant (voir `sort_curve`): les points bas
+    et haut s'obtiennent par recherche dichotomique.
+    """
+    if power_nominal is None:
+        return None
+
+    target_power = target_power_for_ratio(power_nominal, adjustment_ratio)
+
+    lower = bisect_right(powers, target_power) - 1
+    upper = bisect_left(powers, target_power)
+    if lower < 0 or upper >= len(powers):
+        return None
+
+    if powers[lower] == powers[upper]:
+        return hashrates[lower], powers[lower]
+
+    factor = (Decimal(target_power - powers[lower]) / Decimal(powers[upper] - powers[lower])).quantize(
+        _FACTOR_QUANTUM, rounding=ROUND_HALF_UP
+    )
+    hashrate = hashrates[lower] + (hashrates[upper] - hashrates[lower]) * factor
+    return hashrate, target_power
+
+
+def interpolate_efficiency(
+    power_nominal: Optional[int],
+    curve: Sequence[Tuple[int, Decimal]],
+    adjustment_ratio,
+) -> Optional[Tuple[Decimal, int]]:
+    """Comme `interpolate_sorted`, pour des points (puissance, hashrate) non triés"""
+    return interpolate_sorted(power_nominal, *sort_curve(curve), adjustment_ratio)
+
+
+class RatioBounds:
+    """
+    Plage de ratios couverte par la courbe d'un template actif.
+
+    Un ratio a un point si et seulement si sa puissance cible arrondie tombe
+    entre la plus petite et la plus grande puissance mesurée. `min_ratio` et
+    `max_ratio` sont les bornes de cette plage sur la grille du millième.
+    """
+
+    def __init__(self, power_nominal: int, min_power: int, max_power: int):
+        self.power_nominal = power_nominal
+        self.min_power = min_power
+        self.max_power = max_power
+        # Cible >= min_power  <=>  ratio × nominale >= min_power - 0.5
+        self.min_ratio = (Decimal(2 * min_power - 1) / (2 * power_nominal)).quantize(_FACTOR_QUANTUM, rounding=ROUND_CEILING)
+        # Cible <= max_power  <=>  ratio × nominale < max_power + 0.5
+        max_ratio = (Decimal(2 * max_power + 1) / (2 * power_nominal)).quantize(_FACTOR_QUANTUM, rounding=ROUND_FLOOR)
+        if not self.covers(max_ratio):
+            max_ratio -= _FACTOR_QUANTUM
+        self.max_ratio = max_ratio
+
+    def covers(self, adjustment_ratio) -> bool:
+        """Le ratio a-t-il un point sur la courbe (mêmes règles que `interpolate_sorted`)"""
+        return self.min_power <= target_power_for_ratio(self.power_nominal, adjustment_ratio) <= self.max_power
+
+    def filter(self, ratios: Iterable) -> list:
+        """Ratios couverts par la courbe, dans l'ordre donné"""
+        return [ratio for ratio in ratios if self.covers(ratio)]
+
+
+def curve_ratio_bounds(power_nominal: Optional[int], powers: List[int]) -> Optional[RatioBounds]:
+    """Bornes d'une courbe triée, ou None (template inactif, sans nominale ou sans points)"""
+    if not power_nominal or power_nominal <= 0 or not powers:
+        return None
+    bounds = RatioBounds(power_nominal, powers[0], powers[-1])
+    return bounds if bounds.min_ratio <= bounds.max_ratio else None
+
+
+def load_efficiency_inputs(db: Session, machine_id: int) -> Tuple[Optional[int], list]:
+    """Puissance nominale (template actif) et points de courbe d'une machine"""
+    power_nominal = db.query(models.MachineTemplate.power_nominal).filter(
+        models.MachineTemplate.id == machine_id,
+        models.MachineTemplate.is_active.is_(True)
+    ).scalar()
+    curve = db.query(
+        models.MachineEfficiencyCurve.power_consumption,
+        models.MachineEfficiencyCurve.effective_hashrate,
+    ).filter(models.MachineEfficiencyCurve.machine_id == machine_id).all()
+    return power_nominal, [(int(power), hashrate) for power, hashrate in curve]
+
+
+def interpolate_efficiency_from_db(db: Session, machine_id: int, adjustment_ratio) -> Optional[Tuple[Decimal, int]]:
+    """Équivalent Python de `SELECT * FROM get_machine_efficiency_interpolated(...)`"""
+    power_nominal, curve = load_efficiency_inputs(db, machine_id)
+    return interpolate_efficiency(power_nominal, curve, adjustment_ratio)
+
+
+class EfficiencyInterpolator:
+    """Courbes d'efficacité triées, chargées une fois par machine puis servies depuis la mémoire"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._curves: Dict[int, Tuple[Optional[int], List[int], List[Decimal]]] = {}
+        self._bounds: Dict[int, Optional[RatioBounds]] = {}
+        # Incrémenté à chaque invalidation
+        self._generation = 0
+
+    def invalidate(self, machine_id: Optional[int] = None) -> None:
+        """Oublie la courbe d'une machine (toutes si machine_id est None)"""
+        with self._lock:
+            self._generation += 1
+            if machine_id is None:
+                self._curves.clear()
+                self._bounds.clear()
+            else:
+                self._curves.pop(machine_id, None)
+                self._bounds.pop(machine_id, None)
+
+    def curve(self, db: Session, machine_id: int) -> Tuple[Optional[int], List[int], List[Decimal]]:
+        """(puissance nominale ou None si template inactif, puissances croissantes, hashrates)"""
+        with self._lock:
+            entry = self._curves.get(machine_id)
+            generation = self._generation
+        if entry is not None:
+            EFFICIENCY_CACHE_HITS.inc()
+            return entry
+
+        # Lecture hors du verrou: une requête lente ne bloque pas les autres machines
+        EFFICIENCY_CACHE_MISSES.inc()
+        power_nominal, curve = load_efficiency_inputs(db, machine_id)
+        entry = (power_nominal, *sort_curve(curve))
+        with self._lock:
+            # Une invalidation pendant la lecture rend la courbe lue peut-être périmée: ne pas la garder
+            if self._generation == generation:
+                entry = self._curves.setdefault(machine_id, entry)
+        return entry
+
+    def ratio_bounds(self, db: Session, machine_id: int) -> Optional[RatioBounds]:
+        """Plage de ratios couverte par la courbe d'une machine (None si aucune)"""
+        with self._lock:
+            if machine_id in self._bounds:
+                return self._bounds[machine_id]
+        entry = self.curve(db, machine_id)
+        bounds = curve_ratio_bounds(entry[0], entry[1])
+        with self._lock:
+            # Ne pas garder des bornes calculées sur une courbe invalidée entre-temps
+            if self._curves.get(machine_id) is entry:
+                self._bounds[machine_id] = bounds
+        return bounds
+
+    def point(self, db: Session, machine_id: int, adjustment_ratio) -> Optional[Tuple[Decimal, int]]:
+        """(hashrate TH/s, puissance W) pour un ratio, ou None (mêmes règles que la fonction SQL)"""
+        power_nominal, powers, hashrates = self.curve(db, machine_id)
+        return interpolate_sorted(power_nominal, powers, hashrates, adjustment_ratio)
+
+    def points(self, db: Session, machine_id: int, ratios: Sequence) -> List[Optional[Tuple[Decimal, int]]]:
+        """Points de plusieurs ratios, la courbe n'étant lue qu'une fois"""
+        power_nominal, powers, hashrates = self.curve(db, machine_id)
+        return [interpolate_sorted(power_nominal, powers, hashrates, ratio) for ratio in ratios]
+
+
+efficiency_interpolator = EfficiencyInterpolator()
+
+
+def invalidate_efficiency_curves(machine_id: Optional[int] = None) -> None:
+    """À appeler après toute écriture dans machine_efficiency_curves ou machine_templates"""
+    efficiency_interpolator.invalidate(machine_id)
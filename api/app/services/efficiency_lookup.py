@@ -0,0 +1,193 @@
+"""
+Points d'efficacité précalculés au millième de ratio (table machine_efficiency_lookup).
+
+Pour chaque template actif, tous les ratios k/1000 couverts par sa courbe sont
+interpolés une fois (mêmes règles que `get_machine_efficiency_interpolated`)
+et stockés avec leur hashrate et leur puissance. Les lectures se font ensuite
+par un seul parcours de plage sur la clé primaire (machine_id, ratio), partagé
+par tous les processus de l'API et par les workers de backtest.
+
+Quand la courbe ou le template change, les routes vident les points de la
+machine dans la même transaction que la modification, puis planifient leur
+régénération en tâche de fond (`regenerate_efficiency_lookup_task`). Tant que
+la table n'est pas régénérée, ou pour un ratio hors de la grille du millième,
+les lectures retombent sur `efficiency_interpolator`: le résultat est
+toujours exact.
+"""
+import logging
+from decimal import Decimal
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .efficiency_interpolation import (
+    efficiency_interpolator,
+    interpolate_sorted,
+    invalidate_efficiency_curves,
+    load_efficiency_inputs,
+    sort_curve,
+)
+
+logger = logging.getLogger(__name__)
+
+LOOKUP_STEP = Decimal("0.001")
+# Bornes de la grille en millièmes (ratio stocké en DECIMAL(5,3))
+MIN_RATIO_MILLI = 1
+MAX_RATIO_MILLI = 99999
+
+# Remplissage des templates sans points, via la fonction en lot (migration 25).
+# La grille couvre les ratios dont la puissance cible arrondie peut tomber
+# entre la plus petite et la plus grande puissance mesurée.
+EFFICIENCY_LOOKUP_BACKFILL_SQL = """
+WITH grid AS (
+    SELECT mt.id AS machine_id, g.k::NUMERIC / 1000 AS adjustment_ratio
+    FROM machine_templates mt
+    JOIN (
+        SELECT machine_id, MIN(power_consumption) AS min_power, MAX(power_consumption) AS max_power
+        FROM machine_efficiency_curves
+        GROUP BY machine_id
+    ) c ON c.machine_id = mt.id
+    CROSS JOIN LATERAL generate_series(
+        GREATEST(FLOOR((c.min_power - 0.5) * 1000 / mt.power_nominal)::INTEGER, 1),
+        LEAST(CEIL((c.max_power + 0.5) * 1000 / mt.power_nominal)::INTEGER, 99999)
+    ) AS g(k)
+    WHERE mt.is_active = true
+      AND mt.power_nominal > 0
+      AND NOT EXISTS (SELECT 1 FROM machine_efficiency_lookup l WHERE l.machine_id = mt.id)
+)
+INSERT INTO machine_efficiency_lookup (machine_id, adjustment_ratio, effective_hashrate, power_consumption)
+SELECT b.machine_id, b.adjustment_ratio, b.effective_hashrate, b.power_consumption
+FROM get_machine_efficiency_interpolated_batch(
+    ARRAY(SELECT machine_id FROM grid ORDER BY machine_id, adjustment_ratio),
+    ARRAY(SELECT adjustment_ratio FROM grid ORDER BY machine_id, adjustment_ratio)
+) b
+WHERE b.effective_hashrate IS NOT NULL
+ON CONFLICT (machine_id, adjustment_ratio) DO NOTHING
+"""
+
+
+def install_efficiency_lookup(conn: Connection) -> None:
+    """Génère les points des templates actifs qui n'en ont pas encore"""
+    conn.execute(text(EFFICIENCY_LOOKUP_BACKFILL_SQL))
+
+
+def lookup_ratio_range(power_nominal: int, powers: Sequence[int]) -> range:
+    """Millièmes de ratio à interpoler pour une courbe (mêmes bornes que le remplissage SQL)"""
+    low = ((2 * min(powers) - 1) * 1000) // (2 * power_nominal)
+    high = -((-(2 * max(powers) + 1) * 1000) // (2 * power_nominal))
+    return range(max(low, MIN_RATIO_MILLI), min(high, MAX_RATIO_MILLI) + 1)
+
+
+def build_lookup_rows(
+    machine_id: int,
+    power_nominal: Optional[int],
+    powers: List[int],
+    hashrates: List[Decimal],
+) -> List[dict]:
+    """Lignes de machine_efficiency_lookup pour une courbe triée (voir `sort_curve`)"""
+    if not power_nominal or power_nominal <= 0 or not powers:
+        return []
+
+    rows = []
+    for milli in lookup_ratio_range(power_nominal, powers):
+        ratio = Decimal(milli) * LOOKUP_STEP
+        point = interpolate_sorted(power_nominal, powers, hashrates, ratio)
+        if point is not None:
+            rows.append({
+                "machine_id": machine_id,
+                "adjustment_ratio": ratio,
+                "effective_hashrate": point[0],
+                "power_consumption": point[1],
+            })
+    return rows
+
+
+def clear_efficiency_lookup(db: Session, machine_id: int) -> None:
+    """Supprime les points d'une machine (sans commit: à faire dans la transaction qui modifie la courbe)"""
+    db.query(models.MachineEfficiencyLookup).filter(
+        models.MachineEfficiencyLookup.machine_id == machine_id
+    ).delete(synchronize_session=False)
+
+
+def regenerate_efficiency_lookup(db: Session, machine_id: int) -> int:
+    """Recalcule tous les points d'une machine; retourne le nombre de ratios stockés"""
+    clear_efficiency_lookup(db, machine_id)
+    power_nominal, curve = load_efficiency_inputs(db, machine_id)
+    rows = build_lookup_rows(machine_id, power_nominal, *sort_curve(curve))
+    if rows:
+        db.execute(insert(models.MachineEfficiencyLookup), rows)
+    db.commit()
+    return len(rows)
+
+
+def regenerate_efficiency_lookup_task(machine_id: int) -> None:
+    """Tâche de fond (BackgroundTasks) planifiée après une modification de courbe ou de template"""
+    from ..database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        regenerate_efficiency_lookup(db, machine_id)
+    except Exception:
+        db.rollback()
+        logger.exception("Échec de la régénération des points d'efficacité de la machine %s", machine_id)
+    finally:
+        db.close()
+
+
+def _lookup_key(ratio) -> Optional[Decimal]:
+    """Ratio exact sur la grille du millième, ou None s'il tombe entre deux points"""
+    value = Decimal(str(ratio))
+    key = value.quantize(LOOKUP_STEP)
+    return key if key == value else None
+
+
+def get_lookup_points(db: Session, machine_id: int, ratios: Sequence) -> List[Optional[Tuple[Decimal, int]]]:
+    """
+    Points (hashrate TH/s, puissance W) de plusieurs ratios d'une machine.
+
+    Un seul parcours de plage [plus petit ratio, plus grand ratio] sur la
+    table précalculée; les ratios absents (hors grille, hors courbe ou table
+    pas encore régénérée) sont interpolés par `efficiency_interpolator`.
+    """
+    keys = [_lookup_key(ratio) for ratio in ratios]
+    on_grid = [key for key in keys if key is not None]
+
+    found = {}
+    if on_grid:
+        rows = db.query(
+            models.MachineEfficiencyLookup.adjustment_ratio,
+            models.MachineEfficiencyLookup.effective_hashrate,
+            models.MachineEfficiencyLookup.power_consumption,
+        ).filter(
+            models.MachineEfficiencyLookup.machine_id == machine_id,
+            models.MachineEfficiencyLookup.adjustment_ratio.between(min(on_grid), max(on_grid)),
+        ).all()
+        found = {
+            Decimal(str(ratio)).quantize(LOOKUP_STEP): (Decimal(str(hashrate)), int(power))
+            for ratio, hashrate, power in rows
+        }
+
+    points = [found.get(key) if key is not None else None for key in keys]
+    missing = [index for index, point in enumerate(points) if point is None]
+    if missing:
+        fallback = efficiency_interpolator.points(db, machine_id, [ratios[index] for index in missing])
+        for index, point in zip(missing, fallback):
+            points[index] = point
+    return points
+
+
+def get_lookup_point(db: Session, machine_id: int, adjustment_ratio) -> Optional[Tuple[Decimal, int]]:
+    """Point d'un seul ratio (lecture par clé primaire)"""
+    return get_lookup_points(db, machine_id, [adjustment_ratio])[0]
+
+
+def schedule_efficiency_lookup_refresh(background_tasks, machine_id: int) -> None:
+    """
+    Après le commit d'une modification de courbe ou de template: oublie la
+    courbe en mémoire et planifie la régénération des points de la machine.
+    """
+    invalidate_efficiency_curves(machine_id)
+    background_tasks.add_task(regenerate_efficiency_lookup_task, machine_id)
@@ -0,0 +1,102 @@
+"""
+Série quotidienne matérialisée du hashprice (table hashprice_daily).
+
+Le revenu d'un TH/s pendant un jour, en BTC, USD et CAD, est stocké une fois
+pour toutes: fpps_rate × 24 / network_difficulty (même formule que le
+backtest), multiplié par le prix du jour. La table est maintenue par des
+triggers PostgreSQL sur bitcoin_prices et fpps_data, quel que soit l'auteur
+de l'écriture (routes, imports en lot, scripts SQL). Le revenu d'une machine
+pour un jour se réduit alors à hashrate × hashprice.
+"""
+from datetime import date
+from typing import List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from ..models import models
+
+# Fonctions et triggers de maintenance (identiques à la migration 24)
+HASHPRICE_SYNC_SQL = """
+CREATE OR REPLACE FUNCTION refresh_hashprice_daily(p_date DATE)
+RETURNS VOID AS $$
+    DELETE FROM hashprice_daily WHERE date = p_date;
+    INSERT INTO hashprice_daily (date, hashprice_btc, hashprice_usd, hashprice_cad)
+    SELECT
+        bp.date,
+        f.fpps_rate * 24 / f.network_difficulty,
+        f.fpps_rate * 24 / f.network_difficulty * bp.price_usd,
+        f.fpps_rate * 24 / f.network_difficulty * bp.price_cad
+    FROM bitcoin_prices bp
+    JOIN fpps_data f ON f.date = bp.date
+    WHERE bp.date = p_date AND f.network_difficulty > 0;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION sync_hashprice_daily()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_hashprice_daily(OLD.date);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.date <> OLD.date) THEN
+        PERFORM refresh_hashprice_daily(NEW.date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_hashprice_daily_prices ON bitcoin_prices;
+CREATE TRIGGER sync_hashprice_daily_prices AFTER INSERT OR UPDATE OR DELETE ON bitcoin_prices
+    FOR EACH ROW EXECUTE FUNCTION sync_hashprice_daily();
+
+DROP TRIGGER IF EXISTS sync_hashprice_daily_fpps ON fpps_data;
+CREATE TRIGGER sync_hashprice_daily_fpps AFTER INSERT OR UPDATE OR DELETE ON fpps_data
+    FOR EACH ROW EXECUTE FUNCTION sync_hashprice_daily();
+"""
+
+HASHPRICE_BACKFILL_SQL = """
+INSERT INTO hashprice_daily (date, hashprice_btc, hashprice_usd, hashprice_cad)
+SELECT
+    bp.date,
+    f.fpps_rate * 24 / f.network_difficulty,
+    f.fpps_rate * 24 / f.network_difficulty * bp.price_usd,
+    f.fpps_rate * 24 / f.network_difficulty * bp.price_cad
+FROM bitcoin_prices bp
+JOIN fpps_data f ON f.date = bp.date
+WHERE f.network_difficulty > 0
+ON CONFLICT (date) DO NOTHING
+"""
+
+
+def install_hashprice_sync(conn: Connection) -> None:
+    """Installe les triggers de maintenance et remplit la table si elle est vide"""
+    conn.execute(text(HASHPRICE_SYNC_SQL))
+    if conn.execute(text("SELECT NOT EXISTS (SELECT 1 FROM hashprice_daily)")).scalar():
+        conn.execute(text(HASHPRICE_BACKFILL_SQL))
+
+
+def rebuild_hashprice_daily(db: Session) -> int:
+    """Recalcule toute la série depuis bitcoin_prices et fpps_data; retourne le nombre de jours"""
+    db.execute(text("DELETE FROM hashprice_daily"))
+    db.execute(text(HASHPRICE_BACKFILL_SQL))
+    db.commit()
+    return db.query(models.HashpriceDaily).count()
+
+
+def get_hashprice_series(
+    db: Session,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    limit: Optional[int] = None,
+) -> List[models.HashpriceDaily]:
+    """Hashprice quotidien par ordre de date, sur une plage optionnelle"""
+    query = db.query(models.HashpriceDaily)
+    if start_date:
+        query = query.filter(models.HashpriceDaily.date >= start_date)
+    if end_date:
+        query = query.filter(models.HashpriceDaily.date <= end_date)
+    query = query.order_by(models.HashpriceDaily.date)
+    if limit:
+        query = query.limit(limit)
+    return query.all()
@@ -0,0 +1,126 @@
+"""
+Historique de marché en mémoire, partagé par tout le processus.
+
+Prix Bitcoin et données FPPS sont chargés paresseusement en colonnes float64
+contiguës indexées par ordinal de jour; toute recherche par plage devient une
+simple tranche de tableau. Les routes qui modifient `bitcoin_prices` ou
+`fpps_data` doivent appeler `invalidate_market_history()` après commit.
+
+Le cache est propre à chaque processus: avec plusieurs workers uvicorn, chacun
+recharge l'historique après ses propres modifications uniquement.
+"""
+import threading
+from datetime import date
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+
+PRICE_COLUMNS = ("price_usd", "price_cad")
+FPPS_COLUMNS = ("fpps_rate", "network_difficulty", "block_reward", "fees_total")
+MARKET_COLUMNS = PRICE_COLUMNS + FPPS_COLUMNS
+
+
+class MarketHistoryStore:
+    """Stockage colonnaire (date ordinale → colonnes de marché) chargé à la demande"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._loaded = False
+        self._start_ordinal = 0
+        self._columns: Dict[str, np.ndarray] = {}
+
+    @property
+    def version(self) -> int:
+        """Numéro incrémenté à chaque invalidation"""
+        return self._version
+
+    def invalidate(self) -> None:
+        """Oublie l'historique chargé; le prochain accès le relira depuis la base"""
+        with self._lock:
+            self._version += 1
+            self._loaded = False
+            self._columns = {}
+
+    def _load(self, db: Session) -> None:
+        prices = db.query(
+            models.BitcoinPrice.date, models.BitcoinPrice.price_usd, models.BitcoinPrice.price_cad
+        ).all()
+        fpps_rows = db.query(
+            models.FppsData.date,
+            models.FppsData.fpps_rate,
+            models.FppsData.network_difficulty,
+            models.FppsData.block_reward,
+            models.FppsData.fees_total,
+        ).all()
+
+        ordinals = [row[0].toordinal() for row in prices] + [row[0].toordinal() for row in fpps_rows]
+        if not ordinals:
+            self._start_ordinal = 0
+            self._columns = {name: np.zeros(0, dtype=np.float64) for name in MARKET_COLUMNS}
+            return
+
+        start_ordinal = min(ordinals)
+        n_days = max(ordinals) - start_ordinal + 1
+        columns = {name: np.full(n_days, np.nan, dtype=np.float64) for name in MARKET_COLUMNS}
+
+        for rows, names in ((prices, PRICE_COLUMNS), (fpps_rows, FPPS_COLUMNS)):
+            if not rows:
+                continue
+            idx = np.fromiter((row[0].toordinal() - start_ordinal for row in rows), dtype=np.int64, count=len(rows))
+            for position, name in enumerate(names, start=1):
+                columns[name][idx] = np.fromiter((row[position] for row in rows), dtype=np.float64, count=len(rows))
+
+        self._start_ordinal = start_ordinal
+        self._columns = columns
+
+    def _snapshot(self, db: Session) -> Tuple[int, Dict[str, np.ndarray]]:
+        """Charge l'historique si besoin et retourne (ordinal de départ, colonnes)"""
+        with self._lock:
+            if not self._loaded:
+                self._load(db)
+                self._loaded = True
+            return self._start_ordinal, self._columns
+
+    def bounds(self, db: Session) -> Optional[Tuple[date, date]]:
+        """Première et dernière date de l'historique chargé (None si vide)"""
+        start_ordinal, columns = self._snapshot(db)
+        stored_days = len(columns["price_usd"])
+        if not stored_days:
+            return None
+        return date.fromordinal(start_ordinal), date.fromordinal(start_ordinal + stored_days - 1)
+
+    def get_columns(self, db: Session, start_date: date, end_date: date) -> Dict[str, np.ndarray]:
+        """
+        Retourne les colonnes de marché sur [start_date, end_date].
+
+        Les jours hors de l'historique connu valent NaN. À l'intérieur de
+        l'historique, les tableaux retournés sont des vues (ne pas les modifier).
+        """
+        start_ordinal, columns = self._snapshot(db)
+        stored_days = len(columns["price_usd"])
+        n_days = (end_date - start_date).days + 1
+        offset = start_date.toordinal() - start_ordinal
+
+        if offset >= 0 and offset + n_days <= stored_days:
+            return {name: columns[name][offset:offset + n_days] for name in MARKET_COLUMNS}
+
+        # Plage débordant de l'historique: compléter avec NaN
+        result = {name: np.full(n_days, np.nan, dtype=np.float64) for name in MARKET_COLUMNS}
+        src_start = max(offset, 0)
+        src_end = min(offset + n_days, stored_days)
+        if src_start < src_end:
+            for name in MARKET_COLUMNS:
+                result[name][src_start - offset:src_end - offset] = columns[name][src_start:src_end]
+        return result
+
+
+market_history_store = MarketHistoryStore()
+
+
+def invalidate_market_history() -> None:
+    """À appeler après toute écriture dans bitcoin_prices ou fpps_data"""
+    market_history_store.invalidate()
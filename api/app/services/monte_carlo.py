@@ -0,0 +1,128 @@
+"""
+Simulation Monte Carlo de trajectoires de marché pour les bandes de risque.
+
+Les trajectoires sont obtenues par bootstrap par blocs des rendements
+quotidiens historiques: pour chaque jour tiré, on reprend conjointement le
+rendement logarithmique du prix BTC, celui du revenu BTC par TH (FPPS et
+difficulté) et le taux de change du même jour, ce qui conserve leurs
+corrélations. Un profil à ratio constant a un hashrate et un coût CAD fixes,
+donc le profit de toutes les trajectoires se calcule en quelques opérations
+sur des matrices trajectoires × jours, traitées par lots pour borner la mémoire.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+from .backtest_engine import MarketSeries
+from .backtest_runner import BacktestDataError
+
+# Nombre de trajectoires traitées ensemble (≈ 8 Mo par matrice float64 à 1000 jours)
+PATH_CHUNK_SIZE = 1000
+
+
+class ReturnHistory:
+    """Rendements historiques joints (prix USD, revenu BTC/TH) et change du jour"""
+
+    def __init__(self, market: MarketSeries):
+        hashprice = market.revenue_btc_per_th()
+        # Un prix ou un revenu nul (fpps_rate = 0) n'a pas de logarithme fini
+        valid = market.valid & (market.price_usd > 0) & (hashprice > 0) & np.isfinite(hashprice)
+        pairs = valid[1:] & valid[:-1]
+        if pairs.sum() < 2:
+            raise BacktestDataError("Historique insuffisant pour estimer les rendements quotidiens")
+
+        # Les jours exclus donnent des valeurs non finies, écartées par `pairs`
+        with np.errstate(divide="ignore", invalid="ignore"):
+            log_price = np.log(market.price_usd)
+            log_hashprice = np.log(hashprice)
+            # Rendement du revenu USD par TH = rendement du prix + rendement du revenu BTC/TH
+            self.log_returns = (np.diff(log_price) + np.diff(log_hashprice))[pairs]
+        fx = market.usd_per_cad()
+        self.fx = fx[1:][pairs]
+
+        last = int(np.flatnonzero(valid)[-1])
+        self.last_date = market.dates()[last]
+        self.revenue_usd_per_th = float(market.price_usd[last] * hashprice[last])
+        self.fx_last = float(fx[last])
+
+    def __len__(self) -> int:
+        return len(self.log_returns)
+
+
+def sample_block_indices(rng: np.random.Generator, n_paths: int, horizon_days: int, block_days: int, n_returns: int) -> np.ndarray:
+    """Indices de jours historiques (trajectoires × jours) tirés par blocs contigus"""
+    block_days = max(1, min(block_days, n_returns))
+    n_blocks = -(-horizon_days // block_days)
+    starts = rng.integers(0, n_returns - block_days + 1, size=(n_paths, n_blocks), dtype=np.int64)
+    indices = starts[:, :, None] + np.arange(block_days, dtype=np.int64)[None, None, :]
+    return indices.reshape(n_paths, -1)[:, :horizon_days]
+
+
+def simulate_cumulative_profit(
+    history: ReturnHistory,
+    hashrate_th: float,
+    daily_cost_cad: float,
+    n_paths: int,
+    horizon_days: int,
+    block_days: int,
+    seed: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Profit cumulé (USD) de chaque trajectoire, jour par jour.
+
+    Returns:
+        ndarray float32 de forme (n_paths, horizon_days)
+    """
+    rng = np.random.default_rng(seed)
+    cumulative = np.empty((n_paths, horizon_days), dtype=np.float32)
+    base_revenue = hashrate_th * history.revenue_usd_per_th
+
+    for start in range(0, n_paths, PATH_CHUNK_SIZE):
+        end = min(start + PATH_CHUNK_SIZE, n_paths)
+        idx = sample_block_indices(rng, end - start, horizon_days, block_days, len(history))
+
+        revenue = np.cumsum(history.log_returns[idx], axis=1)
+        np.exp(revenue, out=revenue)
+        revenue *= base_revenue
+        cost = history.fx[idx]
+        cost *= daily_cost_cad
+        revenue -= cost
+        np.cumsum(revenue, axis=1, out=revenue)
+        cumulative[start:end] = revenue
+
+    return cumulative
+
+
+def profit_bands(cumulative: np.ndarray, percentiles: List[float], step_days: int = 1) -> dict:
+    """Percentiles du profit cumulé pour chaque jour (échantillonné tous les `step_days`)"""
+    horizon_days = cumulative.shape[1]
+    days = np.arange(step_days - 1, horizon_days, step_days)
+    if days[-1] != horizon_days - 1:
+        days = np.append(days, horizon_days - 1)
+    values = np.percentile(cumulative[:, days], percentiles, axis=0)
+    return {
+        "day": (days + 1).tolist(),
+        "percentiles": {f"p{p:g}": row.astype(np.float64).tolist() for p, row in zip(percentiles, values)},
+        "mean": cumulative[:, days].mean(axis=0, dtype=np.float64).tolist(),
+    }
+
+
+def final_distribution(cumulative: np.ndarray, percentiles: List[float], machine_cost_usd: Optional[float]) -> dict:
+    """Statistiques du profit cumulé à l'horizon"""
+    final = cumulative[:, -1].astype(np.float64)
+    stats = {
+        "mean": float(final.mean()),
+        "std": float(final.std(ddof=1)) if len(final) > 1 else 0.0,
+        "min": float(final.min()),
+        "max": float(final.max()),
+        "probability_loss": float((final < 0).mean()),
+        "percentiles": {f"p{p:g}": float(v) for p, v in zip(percentiles, np.percentile(final, percentiles))},
+    }
+    if machine_cost_usd:
+        # Part des trajectoires qui remboursent les machines avant l'horizon
+        paid_back = cumulative >= machine_cost_usd
+        reached = paid_back.any(axis=1)
+        first_day = paid_back.argmax(axis=1) + 1
+        stats["probability_payback"] = float(reached.mean())
+        stats["median_payback_day"] = float(np.median(first_day[reached])) if reached.any() else None
+    return stats
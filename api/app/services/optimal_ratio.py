@@ -0,0 +1,238 @@
+"""
+Ratio d'ajustement optimal exact d'une machine, par énumération des points candidats.
+
+Le revenu quotidien d'une machine est proportionnel à son hashrate et le coût
+d'électricité croît avec la puissance (linéaire, avec un changement de pente
+à la limite du palier 1). Entre deux points mesurés, le hashrate est
+interpolé avec un facteur arrondi au millième (DECIMAL(5,3), comme
+`get_machine_efficiency_interpolated`): il progresse par paliers alors que le
+coût croît à chaque watt. Sur un palier du facteur, le revenu est constant
+et le meilleur point est donc sa plus petite puissance cible.
+
+Les ratios étant stockés en DECIMAL(5,3), l'optimum est cherché sur la
+grille du millième. Les candidats sont, pour chaque début de palier (au plus
+1001 par segment de courbe), puissance mesurée, puissance encadrant la
+limite du palier 1, le premier ratio de la grille dont la puissance cible
+l'atteint, plus les bornes de ratio: l'optimum de la grille est exactement
+l'un d'eux. Chacun est évalué avec l'interpolation exacte de la fonction SQL.
+"""
+import math
+from decimal import Decimal, ROUND_HALF_UP
+from typing import List, Optional, Sequence, Tuple
+
+from .efficiency_interpolation import interpolate_sorted
+
+# Bornes des ratios explorés par les optimiseurs
+OPTIMAL_RATIO_MIN = Decimal("0.5")
+OPTIMAL_RATIO_MAX = Decimal("1.5")
+
+# Pas du facteur d'interpolation et des ratios (DECIMAL(5,3))
+FACTOR_STEPS = 1000
+RATIO_STEP = Decimal("0.001")
+
+# Tableau d'affichage: grille globale de 0.05, puis grille fine de 0.01 à ±0.10 de l'optimum
+SWEEP_COARSE_STEP = Decimal("0.05")
+SWEEP_FINE_STEP = Decimal("0.01")
+SWEEP_FINE_RANGE = Decimal("0.10")
+
+
+def fetch_network_reward() -> Optional[Tuple[float, float]]:
+    """(difficulté du réseau, récompense de bloc en BTC) depuis blockchain.info, ou None"""
+    try:
+        import requests
+        difficulty_response = requests.get("https://blockchain.info/q/getdifficulty", timeout=10)
+        difficulty_response.raise_for_status()
+        block_reward_response = requests.get("https://blockchain.info/q/bcperblock", timeout=10)
+        block_reward_response.raise_for_status()
+        return float(difficulty_response.text), float(block_reward_response.text)
+    except Exception:
+        return None
+
+
+def build_profit_economics(machine, market_data: dict, network_reward: Optional[Tuple[float, float]]) -> dict:
+    """
+    Paramètres du profit quotidien d'une machine.
+
+    `btc_per_th_day` suit la formule CRC = C × S/D, les accepted shares étant
+    réparties proportionnellement au hashrate (None si non calculable).
+    """
+    btc_per_th_day = None
+    if (
+        machine.accepted_shares_24h is not None
+        and network_reward is not None
+        and machine.hashrate_nominal
+        and network_reward[0] > 0
+    ):
+        network_difficulty, coinbase_reward = network_reward
+        btc_per_th_day = coinbase_reward * float(machine.accepted_shares_24h) / float(machine.hashrate_nominal) / network_difficulty
+
+    return {
+        "btc_per_th_day": btc_per_th_day,
+        "bitcoin_price": market_data["bitcoin_price"],
+        "electricity_tier1_rate": market_data["electricity_tier1_rate"],
+        "electricity_tier2_rate": market_data["electricity_tier2_rate"],
+        "electricity_tier1_limit": market_data["electricity_tier1_limit"],
+    }
+
+
+def daily_revenue(hashrate: float, economics: dict) -> Optional[float]:
+    if economics["btc_per_th_day"] is None or economics["bitcoin_price"] is None:
+        return None
+    return economics["btc_per_th_day"] * hashrate * economics["bitcoin_price"]
+
+
+def daily_electricity_cost(power: float, economics: dict) -> Optional[float]:
+    """Coût quotidien avec paliers (None si la configuration est incomplète)"""
+    tier1_rate = economics["electricity_tier1_rate"]
+    tier2_rate = economics["electricity_tier2_rate"]
+    tier1_limit = economics["electricity_tier1_limit"]
+    if tier1_rate is None or tier2_rate is None or tier1_limit is None:
+        return None
+
+    daily_power_kwh = (power * 24) / 1000
+    if daily_power_kwh <= tier1_limit:
+        return daily_power_kwh * tier1_rate
+    return tier1_limit * tier1_rate + (daily_power_kwh - tier1_limit) * tier2_rate
+
+
+def daily_profit(hashrate: float, power: float, economics: dict) -> Optional[float]:
+    revenue = daily_revenue(hashrate, economics)
+    cost = daily_electricity_cost(power, economics)
+    if revenue is None or cost is None:
+        return None
+    return revenue - cost
+
+
+def profit_row(ratio: float, hashrate: float, power: int, economics: dict) -> dict:
+    """Ligne du tableau des ratios (même format que les autres optimiseurs)"""
+    revenue = daily_revenue(hashrate, economics)
+    cost = daily_electricity_cost(power, economics)
+    profit = revenue - cost if revenue is not None and cost is not None else None
+    sats_per_hour = None
+    if revenue is not None:
+        sats_per_hour = int((economics["btc_per_th_day"] * hashrate * 100000000) / 24)
+
+    return {
+        "adjustment_ratio": ratio,
+        "effective_hashrate": hashrate,
+        "power_consumption": power,
+        "efficiency_th_per_watt": round(hashrate / power, 6) if power > 0 else 0,
+        "efficiency_j_per_th": round(power / hashrate, 2) if hashrate > 0 else 0,
+        "sats_per_hour": sats_per_hour,
+        "daily_revenue": "N/A" if revenue is None else round(revenue, 2),
+        "daily_electricity_cost": round(cost, 2) if cost is not None else None,
+        "daily_profit": "N/A" if profit is None else round(profit, 2),
+    }
+
+
+def grid_ratio_for_power(power: int, power_nominal: int) -> Decimal:
+    """
+    Plus petit ratio de la grille du millième dont la puissance cible arrondie
+    atteint `power` (ratio × nominale >= power - 0.5).
+
+    Les ratios sont stockés en DECIMAL(5,3) (instances de site, résultats de
+    backtest, table précalculée): un ratio plus fin serait arrondi à
+    l'enregistrement et désignerait un autre point.
+    """
+    milli = -((-(2 * power - 1) * 1000) // (2 * power_nominal))  # plafond exact
+    return Decimal(milli) * RATIO_STEP
+
+
+def factor_step_powers(powers: Sequence[int]) -> set:
+    """
+    Plus petite puissance cible (entière) de chaque palier du facteur arrondi,
+    pour chaque segment de la courbe triée.
+
+    Le facteur arrondi vaut q/1000 dès que (cible - bas) / (haut - bas) >=
+    (q - 0.5)/1000 (arrondi demi vers le haut).
+    """
+    candidate_powers = set()
+    for low, high in zip(powers, powers[1:]):
+        span = high - low
+        if span <= 0:
+            continue
+        if span <= FACTOR_STEPS:
+            # Chaque watt du segment a son propre facteur
+            candidate_powers.update(range(low, high + 1))
+            continue
+        for step in range(FACTOR_STEPS + 1):
+            offset = -((-span * (2 * step - 1)) // (2 * FACTOR_STEPS))  # plafond exact
+            candidate_powers.add(low + max(offset, 0))
+    return candidate_powers
+
+
+def breakpoint_ratios(
+    power_nominal: int,
+    powers: Sequence[int],
+    tier1_limit_kwh: Optional[float],
+    ratio_min: Decimal = OPTIMAL_RATIO_MIN,
+    ratio_max: Decimal = OPTIMAL_RATIO_MAX,
+) -> List[Decimal]:
+    """
+    Ratios candidats à l'optimum sur la grille du millième, triés: débuts de
+    palier du facteur d'interpolation (puissances mesurées comprises),
+    puissances entières encadrant la limite du palier 1, bornes de ratio.
+    """
+    candidate_powers = set(powers) | factor_step_powers(powers)
+    if tier1_limit_kwh is not None:
+        boundary_power = tier1_limit_kwh * 1000 / 24
+        candidate_powers.update((math.floor(boundary_power), math.ceil(boundary_power)))
+
+    # Sur la grille du millième, le meilleur point d'un palier est le premier
+    # ratio dont la puissance cible atteint son début
+    ratios = {ratio_min, ratio_max}
+    ratios.update(grid_ratio_for_power(power, power_nominal) for power in candidate_powers if power > 0)
+    return sorted(ratio for ratio in ratios if ratio_min <= ratio <= ratio_max)
+
+
+def solve_optimal_ratio(
+    power_nominal: Optional[int],
+    powers: List[int],
+    hashrates: List[Decimal],
+    economics: dict,
+    ratio_min: Decimal = OPTIMAL_RATIO_MIN,
+    ratio_max: Decimal = OPTIMAL_RATIO_MAX,
+) -> Optional[dict]:
+    """
+    Meilleure ligne (voir `profit_row`) parmi les ratios candidats, ou None
+    si la courbe ne couvre aucun ratio de [ratio_min, ratio_max].
+
+    Sans profit calculable (shares, prix ou tarifs manquants), le critère
+    devient le hashrate, comme pour la recherche par grille. À égalité, le
+    plus petit ratio l'emporte.
+    """
+    if not power_nominal or not powers:
+        return None
+
+    best = None
+    best_score = None
+    for ratio in breakpoint_ratios(power_nominal, powers, economics["electricity_tier1_limit"], ratio_min, ratio_max):
+        point = interpolate_sorted(power_nominal, powers, hashrates, ratio)
+        if point is None:
+            continue
+        hashrate, power = float(point[0]), int(point[1])
+        profit = daily_profit(hashrate, power, economics)
+        # Le profit prime; le hashrate ne départage que les points sans profit
+        score = (profit is not None, profit if profit is not None else hashrate)
+        if best_score is None or score > best_score:
+            best_score = score
+            best = profit_row(float(ratio), hashrate, power, economics)
+    return best
+
+
+def sweep_ratios(optimal_ratio: float, ratio_min: Decimal = OPTIMAL_RATIO_MIN, ratio_max: Decimal = OPTIMAL_RATIO_MAX) -> List[float]:
+    """Ratios du tableau d'affichage: grille globale puis grille fine autour de l'optimum, sans doublon"""
+    coarse_count = int((ratio_max - ratio_min) / SWEEP_COARSE_STEP) + 1
+    ratios = [ratio_min + i * SWEEP_COARSE_STEP for i in range(coarse_count)]
+
+    center = Decimal(str(optimal_ratio)).quantize(SWEEP_FINE_STEP, rounding=ROUND_HALF_UP)
+    fine_start = max(ratio_min, center - SWEEP_FINE_RANGE)
+    fine_end = min(ratio_max, center + SWEEP_FINE_RANGE)
+    fine_count = int((fine_end - fine_start) / SWEEP_FINE_STEP) + 1
+    seen = set(ratios)
+    for i in range(fine_count):
+        ratio = fine_start + i * SWEEP_FINE_STEP
+        if ratio not in seen:
+            seen.add(ratio)
+            ratios.append(ratio)
+    return [float(ratio) for ratio in ratios]
@@ -0,0 +1,53 @@
+"""
+Pagination par clé (keyset) des listes triées par (created_at, id) décroissants.
+
+Le curseur encode la clé de tri du dernier élément renvoyé: la page suivante
+reprend juste après lui grâce à une comparaison de tuples servie par l'index
+composite, sans OFFSET. La latence reste la même quelle que soit la page.
+"""
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+from sqlalchemy import tuple_
+
+# En-tête HTTP portant le curseur de la page suivante
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+class InvalidCursor(ValueError):
+    """Curseur de pagination illisible"""
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{row_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor("Curseur de pagination invalide") from e
+
+
+def keyset_page(query, model, limit: int, cursor: Optional[str] = None):
+    """
+    Page de `limit` éléments les plus récents après `cursor`.
+
+    Returns:
+        tuple: (éléments, curseur de la page suivante ou None)
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, row_id))
+
+    # Un élément de plus pour savoir s'il existe une page suivante
+    items = query.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1).all()
+    if len(items) <= limit:
+        return items, None
+
+    items = items[:limit]
+    return items, encode_cursor(items[-1].created_at, items[-1].id)
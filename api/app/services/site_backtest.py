@@ -0,0 +1,172 @@
+"""
+Backtest d'un site complet (toutes ses instances de machines).
+
+Chaque instance devient une colonne de la matrice jours × machines; la
+consommation de chaque jour est facturée avec les paliers du site, le premier
+palier étant réservé aux machines les plus efficaces.
+"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from ..models import models
+from .backtest_engine import get_efficiency_point, compute_site_daily_metrics, summarize_profits
+from .backtest_runner import BacktestDataError, load_backtest_market
+
+
+def resolve_instance_ratio(instance: models.SiteMachineInstance, ratio_overrides: Optional[Dict[int, float]]) -> float:
+    """Ratio appliqué à une instance: surcharge de la requête, sinon ratio stocké, sinon nominal"""
+    if ratio_overrides and instance.id in ratio_overrides:
+        return round(float(ratio_overrides[instance.id]), 3)
+    if instance.ratio_type == 'disabled':
+        return 0.0
+    if instance.optimal_ratio is not None:
+        return round(float(instance.optimal_ratio), 3)
+    return 1.0
+
+
+def resolve_site_machines(
+    db: Session,
+    site: models.MiningSite,
+    ratio_overrides: Optional[Dict[int, float]] = None,
+    uniform_ratio: Optional[float] = None,
+) -> Tuple[List[dict], np.ndarray, np.ndarray]:
+    """
+    Construit les colonnes machines du site.
+
+    Les instances arrêtées (ratio 0) ou dont le template est inactif sont
+    ignorées; `uniform_ratio` remplace le ratio de toutes les autres. Le
+    point d'efficacité est interpolé une seule fois par couple (template,
+    ratio); sans courbe, on retombe sur le nominal × ratio comme l'affichage
+    du site.
+
+    Returns:
+        tuple: (description des machines, hashrates TH/s, puissances W) avec
+        la quantité déjà multipliée
+    """
+    instances = db.query(models.SiteMachineInstance).filter(
+        models.SiteMachineInstance.site_id == site.id
+    ).order_by(models.SiteMachineInstance.id).all()
+
+    machines = []
+    hashrates = []
+    powers = []
+    points: Dict[Tuple[int, float], Tuple[float, float, str]] = {}
+
+    for instance in instances:
+        template = instance.template
+        if template is None or not template.is_active:
+            continue
+
+        ratio = resolve_instance_ratio(instance, ratio_overrides)
+        quantity = instance.quantity or 0
+        if ratio <= 0 or quantity <= 0:
+            continue
+        if uniform_ratio is not None:
+            ratio = round(float(uniform_ratio), 3)
+
+        key = (template.id, ratio)
+        if key not in points:
+            point = get_efficiency_point(db, template.id, ratio)
+            if point is not None:
+                points[key] = (point[0], point[1], "curve")
+            else:
+                points[key] = (
+                    float(template.hashrate_nominal) * ratio,
+                    float(template.power_nominal) * ratio,
+                    "nominal",
+                )
+        unit_hashrate, unit_power, source = points[key]
+
+        machines.append({
+            "instance_id": instance.id,
+            "template_id": template.id,
+            "name": instance.custom_name or template.model,
+            "quantity": quantity,
+            "adjustment_ratio": ratio,
+            "unit_hashrate": unit_hashrate,
+            "unit_power": unit_power,
+            "efficiency_source": source,
+        })
+        hashrates.append(unit_hashrate * quantity)
+        powers.append(unit_power * quantity)
+
+    return machines, np.asarray(hashrates, dtype=np.float64), np.asarray(powers, dtype=np.float64)
+
+
+def run_site_backtest(db: Session, site: models.MiningSite, request, electricity: dict) -> dict:
+    """
+    Calcule le backtest d'un site (SiteBacktestRequest) sans le persister.
+
+    `electricity` est le dictionnaire retourné par
+    `get_site_electricity_data_with_fallback`.
+    """
+    if electricity.get("tier1_rate") is None:
+        raise BacktestDataError("Tarif d'électricité (palier 1) non configuré pour ce site")
+
+    market = load_backtest_market(db, request.start_date, request.end_date)
+
+    overrides = {int(k): float(v) for k, v in (request.ratio_overrides or {}).items()}
+    machines, hashrates, powers = resolve_site_machines(db, site, overrides)
+    if not machines:
+        raise BacktestDataError("Aucune machine active sur ce site")
+
+    metrics = compute_site_daily_metrics(
+        market,
+        hashrates,
+        powers,
+        electricity["tier1_rate"],
+        electricity.get("tier2_rate"),
+        electricity.get("tier1_limit"),
+    )
+
+    # Totaux par machine (colonnes) et par jour (lignes)
+    revenue_by_machine = metrics["revenue_usd"].sum(axis=0)
+    cost_by_machine = metrics["cost_usd"].sum(axis=0)
+    tier1_by_machine = metrics["tier1_kwh"].sum(axis=0)
+    kwh_by_machine = metrics["power_consumed_kwh"].sum(axis=0)
+    for i, machine in enumerate(machines):
+        machine.update({
+            "total_revenue_usd": float(revenue_by_machine[i]),
+            "total_cost_usd": float(cost_by_machine[i]),
+            "total_profit_usd": float(revenue_by_machine[i] - cost_by_machine[i]),
+            "tier1_share": float(tier1_by_machine[i] / kwh_by_machine[i]) if kwh_by_machine[i] > 0 else 0,
+        })
+
+    daily_revenue = metrics["revenue_usd"].sum(axis=1)
+    daily_cost = metrics["cost_usd"].sum(axis=1)
+    daily_profit = daily_revenue - daily_cost
+    daily_tier1 = metrics["tier1_kwh"].sum(axis=1)
+    daily_tier2 = metrics["tier2_kwh"].sum(axis=1)
+
+    daily = [
+        {
+            "date": day,
+            "power_consumed_kwh": t1 + t2,
+            "tier1_kwh": t1,
+            "tier2_kwh": t2,
+            "revenue_usd": rev,
+            "cost_usd": cost,
+            "profit_usd": profit,
+        }
+        for day, t1, t2, rev, cost, profit in zip(
+            market.dates(metrics["mask"]),
+            daily_tier1.tolist(),
+            daily_tier2.tolist(),
+            daily_revenue.tolist(),
+            daily_cost.tolist(),
+            daily_profit.tolist(),
+        )
+    ]
+
+    return {
+        "site_id": site.id,
+        "site_name": site.name,
+        "start_date": request.start_date,
+        "end_date": request.end_date,
+        "electricity": electricity,
+        "machines": machines,
+        "daily": daily,
+        "summary": summarize_profits(daily_profit, float(daily_revenue.sum()), float(daily_cost.sum())),
+    }
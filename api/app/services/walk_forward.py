@@ -0,0 +1,132 @@
+"""
+Backtest « walk-forward »: le ratio d'ajustement est re-choisi tous les N jours.
+
+À chaque date de rééquilibrage, le ratio retenu est celui qui aurait donné le
+meilleur profit sur la fenêtre glissante des `lookback_days` jours précédents
+(points de la courbe d'efficacité), puis il est appliqué aux N jours
+suivants.
+
+La matrice jours × ratios n'est calculée qu'une fois. Ses sommes cumulées
+(une ligne par jour calendaire) donnent le profit de n'importe quelle fenêtre
+par une simple différence de deux lignes: chaque rééquilibrage coûte O(ratios)
+au lieu d'un balayage complet de la fenêtre.
+"""
+from typing import List
+
+import numpy as np
+
+from .backtest_engine import MarketSeries, compute_ratio_sweep
+
+NOMINAL_RATIO = 1.0
+
+
+def _calendar_prefix_sums(market: MarketSeries, daily: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Sommes cumulées (jours calendaires + 1) × ratios; les jours sans données comptent pour zéro"""
+    calendar = np.zeros((len(market), daily.shape[1]), dtype=np.float64)
+    calendar[mask] = daily
+    prefix = np.zeros((len(market) + 1, daily.shape[1]), dtype=np.float64)
+    np.cumsum(calendar, axis=0, out=prefix[1:])
+    return prefix
+
+
+def run_walk_forward(
+    market: MarketSeries,
+    ratios: List[float],
+    hashrates: np.ndarray,
+    powers: np.ndarray,
+    electricity_rate_cad,
+    start_offset: int,
+    rebalance_days: int,
+    lookback_days: int,
+    include_daily: bool = False,
+) -> dict:
+    """
+    Simule la stratégie walk-forward sur les jours [start_offset, fin de `market`].
+
+    Les jours précédant `start_offset` ne servent qu'à la première fenêtre
+    glissante. Une fenêtre sans aucun jour de données conserve le ratio
+    précédent (le ratio le plus proche de 1.0 au départ).
+    """
+    sweep = compute_ratio_sweep(market, hashrates, powers, electricity_rate_cad)
+    mask = sweep["mask"]
+    profit = _calendar_prefix_sums(market, sweep["profit_usd"], mask)
+    revenue = _calendar_prefix_sums(market, sweep["revenue_usd"], mask)
+    cost = _calendar_prefix_sums(market, sweep["cost_usd"], mask)
+    valid_days = np.concatenate(([0], np.cumsum(mask)))
+
+    n_days = len(market)
+    starts = np.arange(start_offset, n_days, rebalance_days)
+    ends = np.minimum(starts + rebalance_days, n_days)
+    window_starts = np.maximum(starts - lookback_days, 0)
+
+    # Profit de chaque ratio sur la fenêtre précédant chaque rééquilibrage
+    trailing = profit[starts] - profit[window_starts]
+    trailing_days = valid_days[starts] - valid_days[window_starts]
+    choices = trailing.argmax(axis=1)
+
+    fallback = int(np.abs(np.asarray(ratios) - NOMINAL_RATIO).argmin())
+    for k in np.flatnonzero(trailing_days == 0):
+        choices[k] = choices[k - 1] if k > 0 else fallback
+
+    periods_index = np.arange(len(starts))
+    period_profit = profit[ends, choices] - profit[starts, choices]
+    period_revenue = revenue[ends, choices] - revenue[starts, choices]
+    period_cost = cost[ends, choices] - cost[starts, choices]
+    period_days = valid_days[ends] - valid_days[starts]
+
+    dates = market.dates()
+    periods = [
+        {
+            "start_date": dates[start],
+            "end_date": dates[end],
+            "adjustment_ratio": ratios[choice],
+            "trailing_days": int(days_back),
+            "trailing_profit_usd": float(trailing[k, choice]),
+            "days": int(days),
+            "revenue_usd": float(rev),
+            "cost_usd": float(cst),
+            "profit_usd": float(prf),
+        }
+        for k, start, end, choice, days_back, days, rev, cst, prf in zip(
+            periods_index, starts, ends - 1, choices, trailing_days, period_days,
+            period_revenue, period_cost, period_profit
+        )
+    ]
+
+    total_revenue = float(period_revenue.sum())
+    total_cost = float(period_cost.sum())
+    total_profit = float(period_profit.sum())
+
+    # Références: chaque ratio fixe sur la même période
+    static_profit = profit[n_days] - profit[start_offset]
+    best_static = int(static_profit.argmax())
+
+    result = {
+        "total_days": int(valid_days[n_days] - valid_days[start_offset]),
+        "rebalances": len(periods),
+        "ratio_changes": int((np.diff(choices) != 0).sum()),
+        "total_revenue_usd": total_revenue,
+        "total_cost_usd": total_cost,
+        "total_profit_usd": total_profit,
+        "roi_percentage": (total_profit / total_cost * 100) if total_cost > 0 else 0,
+        "best_static_ratio": ratios[best_static],
+        "best_static_profit_usd": float(static_profit[best_static]),
+        "nominal_ratio": ratios[fallback],
+        "nominal_profit_usd": float(static_profit[fallback]),
+        "periods": periods,
+    }
+
+    if include_daily:
+        # Ratio appliqué et profit de chaque jour de données
+        day_choices = np.repeat(choices, ends - starts)
+        day_offsets = np.arange(start_offset, n_days)
+        keep = mask[day_offsets]
+        day_offsets = day_offsets[keep]
+        day_choices = day_choices[keep]
+        daily_profit = sweep["profit_usd"][valid_days[day_offsets], day_choices]
+        result["daily"] = [
+            {"date": dates[offset], "adjustment_ratio": ratios[choice], "profit_usd": p}
+            for offset, choice, p in zip(day_offsets.tolist(), day_choices.tolist(), daily_profit.tolist())
+        ]
+
+    return result
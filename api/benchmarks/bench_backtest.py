@@ -0,0 +1,293 @@
+"""
+Benchmarks de bout en bout du moteur de backtest.
+
+Une base jetable est remplie avec un historique synthétique (voir
+`synthetic_history`), puis chaque scénario appelle les routes de l'API via
+le client de test FastAPI sur des fenêtres de 1, 5 et 15 ans. Pour chaque
+scénario sont mesurés:
+- le temps (premier appel, historique de marché froid, puis médiane des suivants);
+- les jours simulés par seconde;
+- le nombre d'allers-retours avec la base (exécutions de curseur);
+- le pic de mémoire Python (tracemalloc, mesuré lors d'un appel séparé pour
+  ne pas fausser les temps).
+
+Usage, depuis le dossier api/:
+    python -m benchmarks.bench_backtest
+    python -m benchmarks.bench_backtest --years 1 5 --repeat 5 --json bench.json
+    python -m benchmarks.bench_backtest --database-url postgresql://user@localhost/bench
+
+Sans --database-url, une base SQLite temporaire est utilisée (l'audit
+interpole alors la courbe d'efficacité en Python plutôt qu'avec la fonction
+SQL). Avec PostgreSQL, tout est créé dans un schéma dédié, supprimé à la fin
+(sauf --keep): les tables existantes de la base ne sont pas touchées.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.engine import make_url
+
+from .synthetic_history import generate_market_history, generate_machine
+
+BENCH_SCHEMA = "bench_backtest"
+DEFAULT_YEARS = (1, 5, 15)
+MACHINE_COUNT = 3
+
+# Fonction SQL d'interpolation, installée dans le schéma de benchmark PostgreSQL
+EFFICIENCY_FUNCTION_MIGRATION = Path(__file__).resolve().parents[2] / "database" / "migrations" / "09_fix_efficiency_functions.sql"
+
+
+def prepare_database_url(database_url: Optional[str]) -> str:
+    """URL de la base de benchmark: SQLite temporaire, ou schéma dédié d'une base PostgreSQL"""
+    if not database_url:
+        path = Path(tempfile.mkdtemp(prefix="bench_backtest_")) / "bench.db"
+        return f"sqlite:///{path}"
+
+    url = make_url(database_url)
+    if url.get_backend_name() != "postgresql":
+        return database_url
+
+    admin = create_engine(url)
+    with admin.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {BENCH_SCHEMA}"))
+    admin.dispose()
+
+    # Les scripts de migration contiennent des commentaires accentués
+    url = url.update_query_dict({"options": f"-csearch_path={BENCH_SCHEMA}", "client_encoding": "utf8"})
+    return url.render_as_string(hide_password=False)
+
+
+def drop_bench_schema(database_url: str) -> None:
+    engine = create_engine(database_url)
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {BENCH_SCHEMA} CASCADE"))
+    engine.dispose()
+
+
+class RoundTripCounter:
+    """Compte les exécutions de curseur (un aller-retour chacune) sur un moteur"""
+
+    def __init__(self, engine):
+        self.count = 0
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args, **kwargs):
+        self.count += 1
+
+
+def seed_database(session_factory, engine, start_date: date, days: int, seed: int) -> List[int]:
+    """Insère l'historique synthétique et les machines; retourne les identifiants des machines"""
+    from app.models import models
+
+    prices, fpps_rows = generate_market_history(start_date, days, seed)
+    db = session_factory()
+    try:
+        db.execute(insert(models.BitcoinPrice), prices)
+        db.execute(insert(models.FppsData), fpps_rows)
+
+        machine_ids = []
+        for index in range(MACHINE_COUNT):
+            template, curve = generate_machine(index, seed)
+            machine = models.MachineTemplate(**template)
+            db.add(machine)
+            db.flush()
+            db.execute(insert(models.MachineEfficiencyCurve), [dict(point, machine_id=machine.id) for point in curve])
+            machine_ids.append(machine.id)
+        db.commit()
+    finally:
+        db.close()
+
+    if engine.dialect.name == "postgresql":
+        with engine.begin() as conn:
+            conn.exec_driver_sql(EFFICIENCY_FUNCTION_MIGRATION.read_text())
+    return machine_ids
+
+
+def _post(client, path: str, payload: dict) -> dict:
+    response = client.post(path, json=payload)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path}: {response.status_code} {response.text[:300]}")
+    return response.json()
+
+
+def _get(client, path: str, **params):
+    response = client.get(path, params=params)
+    if response.status_code != 200:
+        raise RuntimeError(f"{path}: {response.status_code} {response.text[:300]}")
+    return response
+
+
+def build_scenarios(client, machine_id: int, start: date, end: date) -> Dict[str, Callable[[], None]]:
+    """Scénarios chronométrés: chacun simule la fenêtre [start, end]"""
+    base = "/api/v1/backtest"
+    run_payload = {
+        "machine_id": machine_id,
+        "start_date": start.isoformat(),
+        "end_date": end.isoformat(),
+        "adjustment_ratio": "0.9",
+        "electricity_rate_cad": "0.07",
+        "use_cache": False,
+    }
+
+    # Résultats stockés servant aux scénarios de lecture
+    stored_ids = [
+        _post(client, f"{base}/run", dict(run_payload, adjustment_ratio=ratio))["backtest_result"]["id"]
+        for ratio in ("0.8", "0.9", "1.0", "1.1", "1.2")
+    ]
+    _post(client, f"{base}/run", dict(run_payload, use_cache=True))
+
+    return {
+        "run (packed)": lambda: _post(client, f"{base}/run", dict(run_payload, storage_format="packed")),
+        "run (rows)": lambda: _post(client, f"{base}/run", dict(run_payload, storage_format="rows")),
+        "run (summary_only)": lambda: _post(client, f"{base}/run", dict(run_payload, summary_only=True)),
+        "run (cache hit)": lambda: _post(client, f"{base}/run", dict(run_payload, use_cache=True)),
+        "results/{id}": lambda: _get(client, f"{base}/results/{stored_ids[0]}"),
+        "results/{id}/daily": lambda: _get(client, f"{base}/results/{stored_ids[0]}/daily"),
+        "compare (5)": lambda: _get(client, f"{base}/compare", ids=",".join(map(str, stored_ids))),
+        "sweep (101 ratios)": lambda: _post(client, f"{base}/sweep", {
+            "machine_id": machine_id,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "electricity_rate_cad": "0.07",
+            "ratio_step": "0.01",
+        }),
+        "walk-forward": lambda: _post(client, f"{base}/walk-forward", {
+            "machine_id": machine_id,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "electricity_rate_cad": "0.07",
+            "ratio_step": "0.01",
+        }),
+        "adaptive": lambda: _post(client, f"{base}/adaptive", {
+            "machine_id": machine_id,
+            "start_date": start.isoformat(),
+            "end_date": end.isoformat(),
+            "electricity_rate_cad": "0.07",
+            "include_daily": False,
+        }),
+        "monte-carlo (10k paths)": lambda: _post(client, f"{base}/monte-carlo", {
+            "machine_id": machine_id,
+            "adjustment_ratio": "1.0",
+            "electricity_rate_cad": "0.07",
+            "history_start_date": start.isoformat(),
+            "history_end_date": end.isoformat(),
+            "band_step_days": 30,
+            "seed": 1,
+        }),
+    }
+
+
+def measure(scenario: Callable[[], None], repeat: int, counter: RoundTripCounter, reset_market: Callable[[], None]) -> dict:
+    """Temps (froid puis médiane à chaud), allers-retours par appel et pic mémoire"""
+    reset_market()
+    t0 = time.perf_counter()
+    scenario()
+    first = time.perf_counter() - t0
+
+    timings = []
+    round_trips = 0
+    for _ in range(repeat):
+        before = counter.count
+        t0 = time.perf_counter()
+        scenario()
+        timings.append(time.perf_counter() - t0)
+        round_trips = counter.count - before
+
+    tracemalloc.start()
+    try:
+        scenario()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "first_s": first,
+        "median_s": statistics.median(timings),
+        "round_trips": round_trips,
+        "peak_mib": peak / 2 ** 20,
+    }
+
+
+def print_report(results: List[dict]) -> None:
+    header = f"{'scénario':<26}{'ans':>4}{'jours':>7}{'1er (s)':>10}{'médiane (s)':>13}{'jours/s':>12}{'A/R SQL':>9}{'pic (Mio)':>11}"
+    print(header)
+    print("-" * len(header))
+    for row in results:
+        print(
+            f"{row['scenario']:<26}{row['years']:>4}{row['days']:>7}{row['first_s']:>10.4f}"
+            f"{row['median_s']:>13.4f}{row['days_per_s']:>12.0f}{row['round_trips']:>9}{row['peak_mib']:>11.1f}"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks du moteur de backtest")
+    parser.add_argument("--database-url", help="PostgreSQL jetable (schéma dédié); SQLite temporaire par défaut")
+    parser.add_argument("--years", type=int, nargs="+", default=list(DEFAULT_YEARS))
+    parser.add_argument("--repeat", type=int, default=3, help="Appels chronométrés à chaud par scénario")
+    parser.add_argument("--scenario", action="append", help="Limiter aux scénarios dont le nom contient ce texte")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", help="Écrire les résultats dans ce fichier JSON")
+    parser.add_argument("--keep", action="store_true", help="Ne pas supprimer le schéma PostgreSQL de benchmark")
+    args = parser.parse_args(argv)
+
+    database_url = prepare_database_url(args.database_url)
+    os.environ["DATABASE_URL"] = database_url
+
+    # Import après DATABASE_URL: l'application crée ses tables à l'import
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app.database import SessionLocal, engine
+    from app.services.market_history import invalidate_market_history
+
+    history_days = (max(args.years) + 1) * 365
+    end_date = date.today() - timedelta(days=1)
+    history_start = end_date - timedelta(days=history_days - 1)
+    client = TestClient(app)
+    counter = RoundTripCounter(engine)
+    results = []
+    try:
+        machine_ids = seed_database(SessionLocal, engine, history_start, history_days, args.seed)
+        for years in sorted(args.years):
+            start = end_date - timedelta(days=365 * years - 1)
+            scenarios = build_scenarios(client, machine_ids[0], start, end_date)
+            for name, scenario in scenarios.items():
+                if args.scenario and not any(part in name for part in args.scenario):
+                    continue
+                metrics = measure(scenario, args.repeat, counter, invalidate_market_history)
+                days = (end_date - start).days + 1
+                results.append({
+                    "scenario": name,
+                    "years": years,
+                    "days": days,
+                    "days_per_s": days / metrics["median_s"] if metrics["median_s"] > 0 else 0,
+                    **metrics,
+                })
+                print(f"  {name} ({years} an(s)): {metrics['median_s']:.4f} s", file=sys.stderr)
+    finally:
+        engine.dispose()
+        if engine.dialect.name == "postgresql" and not args.keep:
+            drop_bench_schema(database_url)
+
+    print_report(results)
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "database": engine.dialect.name,
+            "history_days": history_days,
+            "repeat": args.repeat,
+            "results": results,
+        }, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
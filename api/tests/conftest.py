@@ -0,0 +1,47 @@
+"""
+Base de test commune: celle du benchmark (`benchmarks.bench_backtest`).
+
+SQLite temporaire, ou schéma dédié d'une base PostgreSQL si TEST_DATABASE_URL
+est défini. DATABASE_URL est fixé ici, avant que les modules de test
+n'importent l'application (la base est choisie à l'import de app.database).
+"""
+import os
+from datetime import date
+
+import pytest
+
+from benchmarks.bench_backtest import drop_bench_schema, prepare_database_url, seed_database
+
+DATABASE_URL = prepare_database_url(os.getenv("TEST_DATABASE_URL"))
+os.environ["DATABASE_URL"] = DATABASE_URL
+
+HISTORY_START = date(2019, 1, 1)
+HISTORY_DAYS = 2 * 365
+
+
+@pytest.fixture(scope="session")
+def synthetic_history():
+    """Historique synthétique de deux ans et machines du benchmark"""
+    from app.database import SessionLocal, engine
+    from app.models import models
+    from app.services.db_bootstrap import run_startup_migrations
+
+    # Comme au démarrage de l'API: tables, puis fonctions SQL (PostgreSQL seulement)
+    models.Base.metadata.create_all(bind=engine)
+    run_startup_migrations(engine)
+    machine_ids = seed_database(SessionLocal, engine, HISTORY_START, HISTORY_DAYS, seed=7)
+    yield {"machine_ids": machine_ids, "start_date": HISTORY_START, "days": HISTORY_DAYS}
+    engine.dispose()
+    if engine.dialect.name == "postgresql":
+        drop_bench_schema(DATABASE_URL)
+
+
+@pytest.fixture
+def db():
+    from app.database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,57 @@
+"""
+Concordance des moteurs de backtest float64 et Decimal (mode audit).
+
+Sur l'historique synthétique du benchmark (voir conftest). Les tolérances
+se règlent avec AUDIT_REL_TOLERANCE et AUDIT_ABS_TOLERANCE.
+
+Usage, depuis le dossier api/:
+    python -m pytest tests
+"""
+import os
+from datetime import timedelta
+from decimal import Decimal
+
+import pytest
+
+from app.models.schemas import BacktestRequest
+from app.services import backtest_audit
+from app.services.backtest_audit import (
+    DEFAULT_ABS_TOLERANCE,
+    DEFAULT_REL_TOLERANCE,
+    BacktestAuditMismatch,
+    assert_engines_agree,
+)
+
+REL_TOLERANCE = float(os.getenv("AUDIT_REL_TOLERANCE", DEFAULT_REL_TOLERANCE))
+ABS_TOLERANCE = float(os.getenv("AUDIT_ABS_TOLERANCE", DEFAULT_ABS_TOLERANCE))
+
+
+def _request(history: dict, machine_id: int, ratio: str, rate: str = "0.07", days: int = None) -> BacktestRequest:
+    return BacktestRequest(
+        machine_id=machine_id,
+        start_date=history["start_date"],
+        end_date=history["start_date"] + timedelta(days=(days or history["days"]) - 1),
+        adjustment_ratio=Decimal(ratio),
+        electricity_rate_cad=Decimal(rate),
+    )
+
+
+@pytest.mark.parametrize("ratio", ["0.8", "1.0", "1.2"])
+def test_engines_agree_on_synthetic_history(synthetic_history, db, ratio):
+    for machine_id in synthetic_history["machine_ids"]:
+        report = assert_engines_agree(db, _request(synthetic_history, machine_id, ratio), REL_TOLERANCE, ABS_TOLERANCE)
+        assert report["same_days"]
+        assert report["days_float"] > 0
+
+
+def test_engines_agree_without_electricity_cost(synthetic_history, db):
+    machine_id = synthetic_history["machine_ids"][0]
+    report = assert_engines_agree(db, _request(synthetic_history, machine_id, "1.0", rate="0"), REL_TOLERANCE, ABS_TOLERANCE)
+    assert report["totals"]["cost_usd"]["float64"] == 0
+
+
+def test_mismatch_raises_explicit_error(synthetic_history, db, monkeypatch):
+    monkeypatch.setattr(backtest_audit, "audit_backtest", lambda *args: {"agree": False, "columns": {}})
+    with pytest.raises(BacktestAuditMismatch) as excinfo:
+        assert_engines_agree(db, _request(synthetic_history, synthetic_history["machine_ids"][0], "1.0", days=30))
+    assert excinfo.value.report["agree"] is False
@@ -0,0 +1,58 @@
+"""
+Routes de backtest sur l'historique synthétique du benchmark (voir conftest).
+"""
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client(synthetic_history):
+    from app.main import app
+
+    return TestClient(app)
+
+
+@pytest.mark.parametrize("ratio", ["0.8", "1.0", "1.2"])
+def test_run_and_sweep_agree_for_same_ratio(client, synthetic_history, ratio):
+    machine_id = synthetic_history["machine_ids"][0]
+    period = {
+        "machine_id": machine_id,
+        "start_date": synthetic_history["start_date"].isoformat(),
+        "end_date": (synthetic_history["start_date"] + timedelta(days=364)).isoformat(),
+        "electricity_rate_cad": "0.07",
+    }
+
+    run = client.post("/api/v1/backtest/run", json={**period, "adjustment_ratio": ratio, "summary_only": True, "use_cache": False})
+    sweep = client.post("/api/v1/backtest/sweep", json={**period, "adjustment_ratios": [ratio]})
+    assert run.status_code == 200, run.text
+    assert sweep.status_code == 200, sweep.text
+
+    summary = run.json()["summary"]
+    row = sweep.json()["results"][0]
+    assert row["total_profit_usd"] == pytest.approx(summary["total_profit_usd"], rel=1e-9)
+    assert row["total_cost_usd"] == pytest.approx(summary["total_cost_usd"], rel=1e-9)
+
+
+def test_next_cursor_header_exposed_to_frontend(client, synthetic_history):
+    for ratio in ("0.9", "1.1"):
+        response = client.post("/api/v1/backtest/run", json={
+            "machine_id": synthetic_history["machine_ids"][0],
+            "start_date": synthetic_history["start_date"].isoformat(),
+            "end_date": (synthetic_history["start_date"] + timedelta(days=29)).isoformat(),
+            "adjustment_ratio": ratio,
+            "electricity_rate_cad": "0.07",
+            "summary_only": True,
+        })
+        assert response.status_code == 200, response.text
+
+    from app.main import allow_origins
+
+    origin = allow_origins[0]
+    response = client.get("/api/v1/backtest/results", params={"limit": 1}, headers={"Origin": origin})
+    assert response.status_code == 200
+    assert response.headers["access-control-allow-origin"] == origin
+    assert "X-Next-Cursor" in response.headers
+    exposed = [header.strip().lower() for header in response.headers["access-control-expose-headers"].split(",")]
+    assert "x-next-cursor" in exposed
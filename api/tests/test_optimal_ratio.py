@@ -0,0 +1,62 @@
+"""
+Ratio optimal exact: grille du millième (DECIMAL(5,3)) et recherche exhaustive.
+"""
+import random
+from decimal import Decimal
+
+from app.services.efficiency_interpolation import interpolate_sorted
+from app.services.optimal_ratio import RATIO_STEP, daily_profit, solve_optimal_ratio
+
+ECONOMICS = {
+    "btc_per_th_day": 5e-7,
+    "bitcoin_price": 100000.0,
+    "electricity_tier1_rate": 0.07,
+    "electricity_tier2_rate": 0.09,
+    "electricity_tier1_limit": 1000.0,
+}
+
+
+def _profit_at(power_nominal, powers, hashrates, ratio):
+    point = interpolate_sorted(power_nominal, powers, hashrates, ratio)
+    if point is None:
+        return None
+    return int(point[1]), daily_profit(float(point[0]), int(point[1]), ECONOMICS)
+
+
+def _grid_optimum(power_nominal, powers, hashrates):
+    """Meilleur profit (non arrondi) sur tous les ratios k/1000 de [0.5, 1.5]"""
+    profits = [_profit_at(power_nominal, powers, hashrates, Decimal(k) * RATIO_STEP) for k in range(500, 1501)]
+    return max(profit for _, profit in filter(None, profits))
+
+
+def test_optimal_ratio_survives_decimal_storage():
+    powers, hashrates = [1500, 3600], [Decimal("100"), Decimal("200")]
+    best = solve_optimal_ratio(3000, powers, hashrates, ECONOMICS)
+
+    ratio = Decimal(str(best["adjustment_ratio"]))
+    stored = ratio.quantize(RATIO_STEP)
+    assert stored == ratio
+    power, profit = _profit_at(3000, powers, hashrates, stored)
+    assert power == best["power_consumption"]
+    assert round(profit, 2) == best["daily_profit"]
+    assert profit == _grid_optimum(3000, powers, hashrates)
+
+
+def test_optimal_ratio_matches_exhaustive_grid_search():
+    rng = random.Random(11)
+    for _ in range(40):
+        power_nominal = rng.randrange(1000, 4000)
+        powers = sorted(rng.sample(range(power_nominal // 3, power_nominal * 2), rng.randrange(2, 6)))
+        hashrate = Decimal(rng.randrange(20, 80))
+        hashrates = []
+        for _ in powers:
+            hashrate += Decimal(rng.randrange(0, 4000)) / 100
+            hashrates.append(hashrate)
+
+        best = solve_optimal_ratio(power_nominal, powers, hashrates, ECONOMICS)
+        if best is None:
+            continue
+        ratio = Decimal(str(best["adjustment_ratio"]))
+        assert ratio.quantize(RATIO_STEP) == ratio
+        _, profit = _profit_at(power_nominal, powers, hashrates, ratio)
+        assert profit == _grid_optimum(power_nominal, powers, hashrates)
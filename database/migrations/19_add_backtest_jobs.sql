@@ -0,0 +1,25 @@
+-- Migration 19: Table des backtests exécutés en arrière-plan
+-- Description: Suivi de l'état, de la progression (jours traités) et de l'annulation des jobs de backtest
+
+CREATE TABLE IF NOT EXISTS backtest_jobs (
+    id SERIAL PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending',  -- pending, running, completed, failed, cancelled
+    machine_id INTEGER REFERENCES machine_templates(id),
+    start_date DATE NOT NULL,
+    end_date DATE NOT NULL,
+    adjustment_ratio DECIMAL(5,3) NOT NULL,
+    electricity_rate_cad DECIMAL(10,5) NOT NULL,
+    summary_only BOOLEAN DEFAULT FALSE,
+    total_days INTEGER,
+    processed_days INTEGER DEFAULT 0,
+    cancel_requested BOOLEAN DEFAULT FALSE,
+    backtest_id INTEGER REFERENCES backtest_results(id),
+    error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE INDEX IF NOT EXISTS idx_backtest_jobs_status ON backtest_jobs(status);
+
+-- Message de confirmation
+SELECT 'Migration 19: Table backtest_jobs créée avec succès!' as status;
@@ -0,0 +1,22 @@
+-- Migration 20: Clés de cache des résultats de backtest
+-- Description: Un résultat est réutilisé tant que la requête (request_hash) et les données
+-- couvrant la période (data_version: prix, FPPS, courbe d'efficacité) sont identiques
+
+ALTER TABLE backtest_results
+ADD COLUMN IF NOT EXISTS request_hash VARCHAR(64);
+
+ALTER TABLE backtest_results
+ADD COLUMN IF NOT EXISTS data_version VARCHAR(64);
+
+ALTER TABLE backtest_jobs
+ADD COLUMN IF NOT EXISTS use_cache BOOLEAN DEFAULT TRUE;
+
+CREATE INDEX IF NOT EXISTS idx_backtest_results_cache_key ON backtest_results(request_hash, data_version);
+
+COMMENT ON COLUMN backtest_results.request_hash IS
+'SHA-256 des paramètres normalisés de la requête (machine, dates, ratio, tarif, mode)';
+COMMENT ON COLUMN backtest_results.data_version IS
+'SHA-256 des prix/FPPS de la période et de la courbe d''efficacité de la machine au moment du calcul';
+
+-- Message de confirmation
+SELECT 'Migration 20: Clés de cache ajoutées à backtest_results!' as status;
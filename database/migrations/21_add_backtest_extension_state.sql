@@ -0,0 +1,15 @@
+-- Migration 21: État nécessaire à l'extension incrémentale des backtests
+-- Description: Tarif d'électricité utilisé et accumulateur des statistiques de synthèse,
+-- pour calculer uniquement les nouveaux jours quand l'historique s'allonge
+
+ALTER TABLE backtest_results
+ADD COLUMN IF NOT EXISTS electricity_rate_cad DECIMAL(10,5);
+
+ALTER TABLE backtest_results
+ADD COLUMN IF NOT EXISTS summary_state JSON;
+
+COMMENT ON COLUMN backtest_results.summary_state IS
+'Accumulateur des profits quotidiens (nombre de jours, moyenne, M2, extrêmes, totaux) fusionné à chaque extension';
+
+-- Message de confirmation
+SELECT 'Migration 21: Colonnes d''extension ajoutées à backtest_results!' as status;
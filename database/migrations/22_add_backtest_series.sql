@@ -0,0 +1,30 @@
+-- Migration 22: Stockage compact des simulations quotidiennes
+-- Description: Une ligne par backtest contenant ses séries quotidiennes en tableaux binaires
+-- (float64 / int32 little-endian) au lieu d'une ligne daily_simulation par jour
+
+ALTER TABLE backtest_results
+ADD COLUMN IF NOT EXISTS storage_format VARCHAR(10) DEFAULT 'rows';
+
+ALTER TABLE backtest_jobs
+ADD COLUMN IF NOT EXISTS storage_format VARCHAR(10) DEFAULT 'packed';
+
+CREATE TABLE IF NOT EXISTS backtest_series (
+    backtest_id INTEGER PRIMARY KEY REFERENCES backtest_results(id) ON DELETE CASCADE,
+    days INTEGER NOT NULL,
+    day_gaps BYTEA NOT NULL,
+    power_consumed_kwh BYTEA NOT NULL,
+    revenue_usd BYTEA NOT NULL,
+    cost_usd BYTEA NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+COMMENT ON COLUMN backtest_results.storage_format IS
+'Stockage des simulations quotidiennes: rows (table daily_simulation) ou packed (table backtest_series)';
+COMMENT ON COLUMN backtest_series.day_gaps IS
+'int32 little-endian: écart en jours avec le jour précédent, le premier depuis backtest_results.start_date';
+COMMENT ON TABLE backtest_series IS
+'profit_usd et roi_daily sont dérivés à la lecture (revenu - coût), avec les mêmes formules que le moteur';
+
+-- Message de confirmation
+SELECT 'Migration 22: Table backtest_series créée!' as status;
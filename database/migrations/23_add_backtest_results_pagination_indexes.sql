@@ -0,0 +1,15 @@
+-- Migration 23: Index de pagination des résultats de backtest
+-- Description: Pagination par clé (created_at, id) décroissants pour /backtest/results,
+-- filtrée ou non par machine et par ratio, sans OFFSET
+
+CREATE INDEX IF NOT EXISTS idx_backtest_results_created
+ON backtest_results(created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_backtest_results_machine_created
+ON backtest_results(machine_id, created_at DESC, id DESC);
+
+CREATE INDEX IF NOT EXISTS idx_backtest_results_machine_ratio_created
+ON backtest_results(machine_id, adjustment_ratio, created_at DESC, id DESC);
+
+-- Message de confirmation
+SELECT 'Migration 23: Index de pagination ajoutés à backtest_results!' as status;
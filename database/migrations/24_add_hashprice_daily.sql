@@ -0,0 +1,63 @@
+-- Migration 24: Série quotidienne matérialisée du hashprice
+-- Description: Revenu par TH/s et par jour (BTC, USD, CAD), recalculé par triggers à chaque
+-- écriture dans bitcoin_prices ou fpps_data (même formule que le backtest:
+-- fpps_rate × 24 / network_difficulty, puis × prix)
+
+CREATE TABLE IF NOT EXISTS hashprice_daily (
+    date DATE PRIMARY KEY,
+    hashprice_btc DECIMAL(24,18) NOT NULL,
+    hashprice_usd DECIMAL(20,12) NOT NULL,
+    hashprice_cad DECIMAL(20,12) NOT NULL,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Recalcule (ou supprime) le hashprice d'un jour à partir des deux tables sources
+CREATE OR REPLACE FUNCTION refresh_hashprice_daily(p_date DATE)
+RETURNS VOID AS $$
+    DELETE FROM hashprice_daily WHERE date = p_date;
+    INSERT INTO hashprice_daily (date, hashprice_btc, hashprice_usd, hashprice_cad)
+    SELECT
+        bp.date,
+        f.fpps_rate * 24 / f.network_difficulty,
+        f.fpps_rate * 24 / f.network_difficulty * bp.price_usd,
+        f.fpps_rate * 24 / f.network_difficulty * bp.price_cad
+    FROM bitcoin_prices bp
+    JOIN fpps_data f ON f.date = bp.date
+    WHERE bp.date = p_date AND f.network_difficulty > 0;
+$$ LANGUAGE sql;
+
+CREATE OR REPLACE FUNCTION sync_hashprice_daily()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        PERFORM refresh_hashprice_daily(OLD.date);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND (TG_OP = 'INSERT' OR NEW.date <> OLD.date) THEN
+        PERFORM refresh_hashprice_daily(NEW.date);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS sync_hashprice_daily_prices ON bitcoin_prices;
+CREATE TRIGGER sync_hashprice_daily_prices AFTER INSERT OR UPDATE OR DELETE ON bitcoin_prices
+    FOR EACH ROW EXECUTE FUNCTION sync_hashprice_daily();
+
+DROP TRIGGER IF EXISTS sync_hashprice_daily_fpps ON fpps_data;
+CREATE TRIGGER sync_hashprice_daily_fpps AFTER INSERT OR UPDATE OR DELETE ON fpps_data
+    FOR EACH ROW EXECUTE FUNCTION sync_hashprice_daily();
+
+-- Remplissage initial à partir de l'historique existant
+INSERT INTO hashprice_daily (date, hashprice_btc, hashprice_usd, hashprice_cad)
+SELECT
+    bp.date,
+    f.fpps_rate * 24 / f.network_difficulty,
+    f.fpps_rate * 24 / f.network_difficulty * bp.price_usd,
+    f.fpps_rate * 24 / f.network_difficulty * bp.price_cad
+FROM bitcoin_prices bp
+JOIN fpps_data f ON f.date = bp.date
+WHERE f.network_difficulty > 0
+ON CONFLICT (date) DO NOTHING;
+
+-- Message de confirmation
+SELECT 'Migration 24: Table hashprice_daily et triggers créés!' as status;
@@ -0,0 +1,57 @@
+-- Migration 25: Interpolation d'efficacité en lot
+-- Description: Variante ensembliste de get_machine_efficiency_interpolated qui reçoit des tableaux
+-- alignés (machines, ratios) et retourne tous les points en une requête, via une seule jointure
+-- LATERAL sur machine_efficiency_curves (mêmes arrondis que la fonction scalaire)
+
+CREATE OR REPLACE FUNCTION get_machine_efficiency_interpolated_batch(
+    p_machine_ids INTEGER[],
+    p_adjustment_ratios NUMERIC[]
+)
+RETURNS TABLE(
+    pair_index INTEGER,
+    machine_id INTEGER,
+    adjustment_ratio NUMERIC,
+    effective_hashrate NUMERIC,
+    power_consumption INTEGER
+) AS $$
+    SELECT
+        p.pair_index::INTEGER,
+        p.machine_id,
+        p.adjustment_ratio,
+        CASE
+            WHEN b.lower_power IS NULL OR b.upper_power IS NULL THEN NULL
+            WHEN b.lower_power = b.upper_power THEN b.lower_hashrate
+            ELSE b.lower_hashrate + (b.upper_hashrate - b.lower_hashrate)
+                * ((p.target_power - b.lower_power)::DECIMAL / (b.upper_power - b.lower_power)::DECIMAL)::DECIMAL(5,3)
+        END,
+        CASE
+            WHEN b.lower_power IS NULL OR b.upper_power IS NULL THEN NULL
+            WHEN b.lower_power = b.upper_power THEN b.lower_power
+            ELSE p.target_power
+        END
+    FROM (
+        SELECT
+            pairs.pair_index,
+            pairs.machine_id,
+            pairs.adjustment_ratio,
+            (pairs.adjustment_ratio * mt.power_nominal)::INTEGER AS target_power
+        FROM unnest(p_machine_ids, p_adjustment_ratios) WITH ORDINALITY
+            AS pairs(machine_id, adjustment_ratio, pair_index)
+        LEFT JOIN machine_templates mt ON mt.id = pairs.machine_id AND mt.is_active = true
+    ) p
+    LEFT JOIN LATERAL (
+        SELECT
+            MAX(mec.power_consumption) FILTER (WHERE mec.power_consumption <= p.target_power) AS lower_power,
+            MIN(mec.power_consumption) FILTER (WHERE mec.power_consumption >= p.target_power) AS upper_power,
+            (ARRAY_AGG(mec.effective_hashrate ORDER BY mec.power_consumption DESC)
+                FILTER (WHERE mec.power_consumption <= p.target_power))[1] AS lower_hashrate,
+            (ARRAY_AGG(mec.effective_hashrate ORDER BY mec.power_consumption ASC)
+                FILTER (WHERE mec.power_consumption >= p.target_power))[1] AS upper_hashrate
+        FROM machine_efficiency_curves mec
+        WHERE mec.machine_id = p.machine_id
+    ) b ON true
+    ORDER BY p.pair_index
+$$ LANGUAGE sql STABLE;
+
+-- Message de confirmation
+SELECT 'Migration 25: Fonction get_machine_efficiency_interpolated_batch créée!' as status;
@@ -0,0 +1,42 @@
+-- Migration 26: Points d'efficacité précalculés par template
+-- Description: Hashrate et puissance interpolés pour chaque ratio au millième couvert par la courbe
+-- d'un template actif; lecture par parcours de plage sur (machine_id, adjustment_ratio).
+-- Les points d'une machine sont régénérés par l'API à chaque modification de sa courbe ou du template
+
+CREATE TABLE IF NOT EXISTS machine_efficiency_lookup (
+    machine_id INTEGER NOT NULL REFERENCES machine_templates(id) ON DELETE CASCADE,
+    adjustment_ratio DECIMAL(5,3) NOT NULL,
+    effective_hashrate DECIMAL(15,5) NOT NULL,
+    power_consumption INTEGER NOT NULL,
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (machine_id, adjustment_ratio)
+);
+
+-- Remplissage initial (nécessite la fonction get_machine_efficiency_interpolated_batch, migration 25)
+WITH grid AS (
+    SELECT mt.id AS machine_id, g.k::NUMERIC / 1000 AS adjustment_ratio
+    FROM machine_templates mt
+    JOIN (
+        SELECT machine_id, MIN(power_consumption) AS min_power, MAX(power_consumption) AS max_power
+        FROM machine_efficiency_curves
+        GROUP BY machine_id
+    ) c ON c.machine_id = mt.id
+    CROSS JOIN LATERAL generate_series(
+        GREATEST(FLOOR((c.min_power - 0.5) * 1000 / mt.power_nominal)::INTEGER, 1),
+        LEAST(CEIL((c.max_power + 0.5) * 1000 / mt.power_nominal)::INTEGER, 99999)
+    ) AS g(k)
+    WHERE mt.is_active = true
+      AND mt.power_nominal > 0
+      AND NOT EXISTS (SELECT 1 FROM machine_efficiency_lookup l WHERE l.machine_id = mt.id)
+)
+INSERT INTO machine_efficiency_lookup (machine_id, adjustment_ratio, effective_hashrate, power_consumption)
+SELECT b.machine_id, b.adjustment_ratio, b.effective_hashrate, b.power_consumption
+FROM get_machine_efficiency_interpolated_batch(
+    ARRAY(SELECT machine_id FROM grid ORDER BY machine_id, adjustment_ratio),
+    ARRAY(SELECT adjustment_ratio FROM grid ORDER BY machine_id, adjustment_ratio)
+) b
+WHERE b.effective_hashrate IS NOT NULL
+ON CONFLICT (machine_id, adjustment_ratio) DO NOTHING;
+
+-- Message de confirmation
+SELECT 'Migration 26: Table machine_efficiency_lookup créée et remplie!' as status;
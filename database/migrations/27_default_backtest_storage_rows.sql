@@ -0,0 +1,9 @@
+-- Migration 27: Format de stockage par défaut des jobs de backtest
+-- Description: Les jobs reviennent au format par lignes (daily_simulation) par défaut;
+-- le format compact (packed) n'est utilisé que sur demande explicite
+
+ALTER TABLE backtest_jobs
+ALTER COLUMN storage_format SET DEFAULT 'rows';
+
+-- Message de confirmation
+SELECT 'Migration 27: Format de stockage par défaut des jobs remis à rows!' as status;
@@ -0,0 +1,9 @@
+-- Migration 28: Index de pagination par ratio exact
+-- Description: /backtest/results?adjustment_ratio=... sans filtre de machine; seuls les
+-- filtres d'égalité (machine, ratio) sont couverts par les index (created_at, id)
+
+CREATE INDEX IF NOT EXISTS idx_backtest_results_ratio_created
+ON backtest_results(adjustment_ratio, created_at DESC, id DESC);
+
+-- Message de confirmation
+SELECT 'Migration 28: Index de pagination par ratio ajouté à backtest_results!' as status;